@@ -1,26 +1,79 @@
+from .batch import ProgramGenerationReport
+from .batch import generate_many
 from .constants import PATH_TO_INCLUDED_XML_FILES
 from .deck import Deck
 from .deck import DeckLayout
 from .deck import DeckPosition
 from .deck import DeckPositionNotFoundError
+from .deck import DeckSectionInfo
 from .deck import LabwareOrientation
 from .deck import StandardDeckNames
+from .ids import ContentDerivedIds
+from .ids import IdKind
+from .ids import IdProvider
+from .ids import RandomIds
+from .ids import SeededIds
+from .integra_xml import LIBRARY_INDEX
+from .integra_xml import LIBRARY_XML_CACHE
 from .integra_xml import IntegraLibraryObjectNotFoundError
 from .integra_xml import LibraryComponent
+from .integra_xml import LibraryComponentIdentity
+from .integra_xml import LibraryComponentNotIdentifiedError
 from .integra_xml import LibraryComponentType
+from .integra_xml import LibraryIndex
+from .integra_xml import LibraryXmlCache
+from .integra_xml import LibraryXmlCacheInfo
+from .json_backend import IncompatibleJsonBackendError
+from .json_backend import JsonBackend
+from .json_backend import ModuleJsonBackend
+from .json_backend import StdlibJsonBackend
+from .json_backend import get_json_backend
+from .json_backend import set_json_backend
+from .library_catalog import LibraryCatalog
 from .pipette import DOneTips
 from .pipette import Pipette
 from .pipette import Tip
 from .plate import Labware
+from .plate import LabwareGeometry
 from .plate import Plate
 from .plate import Reservoir
 from .plate import RowSpacingAboveLimitError
 from .plate import Tubeholder
+from .plate_map import NonUniformChannelVolumesError
+from .plate_map import PlateMapShapeError
+from .plate_map import VolumeAboveTipCapacityError
+from .plate_map import create_plate_map_steps
 from .program import InvalidTipInputFormatError
 from .program import LabwareNotInDeckLayoutError
+from .program import LabwarePlacement
 from .program import Program
+from .program_cache import ProgramCache
+from .program_cache import ProgramCacheInfo
+from .program_reader import MissingProgramElementError
+from .program_reader import MultiSectionTransferError
+from .program_reader import NoLabwareInDeckSectionError
+from .program_reader import SharedDeckPositionError
+from .program_reader import UnsupportedLabwareTypeError
+from .program_reader import UnsupportedProgramContentError
+from .program_reader import UnsupportedStepTypeError
+from .program_reader import read_program
+from .run_time import NoRunTimeToCalibrateError
+from .run_time import RunTimeEstimate
+from .run_time import RunTimeEstimator
+from .run_time import RunTimeParameters
+from .run_time import StepRunTime
+from .simulation import SectionVolumes
+from .simulation import VolumeIssue
+from .simulation import VolumeIssueType
+from .simulation import VolumeSimulationResult
+from .simulation import VolumeSimulator
+from .step_order import StepOrderReport
+from .step_order import StepWells
+from .step_order import get_step_wells
+from .step_order import reorder_steps
 from .steps import AspirateParameters
 from .steps import DispenseParameters
+from .steps import InvalidTransferWellsError
 from .steps import MultiDispense
 from .steps import PipettingLocation
 from .steps import SetInitialVolume
@@ -28,36 +81,95 @@ from .steps import SetVolume
 from .steps import Step
 from .steps import TipChangeMode
 from .steps import Transfer
+from .steps import TransferWellPair
+from .tip_usage import TipUsage
+from .tip_usage import TipUsageCounter
 
 __all__ = [
+    "LIBRARY_INDEX",
+    "LIBRARY_XML_CACHE",
     "PATH_TO_INCLUDED_XML_FILES",
     "AspirateParameters",
+    "ContentDerivedIds",
     "DOneTips",
     "Deck",
     "DeckLayout",
     "DeckPosition",
     "DeckPositionNotFoundError",
+    "DeckSectionInfo",
     "DispenseParameters",
+    "IdKind",
+    "IdProvider",
+    "IncompatibleJsonBackendError",
     "IntegraLibraryObjectNotFoundError",
     "InvalidTipInputFormatError",
+    "InvalidTransferWellsError",
+    "JsonBackend",
     "Labware",
+    "LabwareGeometry",
     "LabwareNotInDeckLayoutError",
     "LabwareOrientation",
+    "LabwarePlacement",
+    "LibraryCatalog",
     "LibraryComponent",
+    "LibraryComponentIdentity",
+    "LibraryComponentNotIdentifiedError",
     "LibraryComponentType",
+    "LibraryIndex",
+    "LibraryXmlCache",
+    "LibraryXmlCacheInfo",
+    "MissingProgramElementError",
+    "ModuleJsonBackend",
     "MultiDispense",
+    "MultiSectionTransferError",
+    "NoLabwareInDeckSectionError",
+    "NoRunTimeToCalibrateError",
+    "NonUniformChannelVolumesError",
     "Pipette",
     "PipettingLocation",
     "Plate",
+    "PlateMapShapeError",
     "Program",
+    "ProgramCache",
+    "ProgramCacheInfo",
+    "ProgramGenerationReport",
+    "RandomIds",
     "Reservoir",
     "RowSpacingAboveLimitError",
+    "RunTimeEstimate",
+    "RunTimeEstimator",
+    "RunTimeParameters",
+    "SectionVolumes",
+    "SeededIds",
     "SetInitialVolume",
     "SetVolume",
+    "SharedDeckPositionError",
     "StandardDeckNames",
+    "StdlibJsonBackend",
     "Step",
+    "StepOrderReport",
+    "StepRunTime",
+    "StepWells",
     "Tip",
     "TipChangeMode",
+    "TipUsage",
+    "TipUsageCounter",
     "Transfer",
+    "TransferWellPair",
     "Tubeholder",
+    "UnsupportedLabwareTypeError",
+    "UnsupportedProgramContentError",
+    "UnsupportedStepTypeError",
+    "VolumeAboveTipCapacityError",
+    "VolumeIssue",
+    "VolumeIssueType",
+    "VolumeSimulationResult",
+    "VolumeSimulator",
+    "create_plate_map_steps",
+    "generate_many",
+    "get_json_backend",
+    "get_step_wells",
+    "read_program",
+    "reorder_steps",
+    "set_json_backend",
 ]
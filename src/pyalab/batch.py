@@ -0,0 +1,102 @@
+import time
+from collections.abc import Iterable
+from collections.abc import Mapping
+from concurrent.futures import Future
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from pydantic import BaseModel
+
+from .integra_xml import LIBRARY_INDEX
+from .integra_xml import LIBRARY_XML_CACHE
+from .integra_xml import LibraryComponent
+from .library_catalog import get_library_catalog
+from .program import Program
+from .program_cache import ProgramCache
+
+PROGRAM_FILE_EXTENSION = ".iaa"
+
+
+class ProgramGenerationReport(BaseModel, frozen=True):
+    name: str
+    """The key of the program in the mapping passed to `generate_many`."""
+    file_path: Path
+    """Where the program was (or would have been) written."""
+    duration: float
+    """How long generating and writing the program took (seconds)."""
+    error: str | None = None
+    """The error that stopped the program from being generated, if any."""
+    from_cache: bool = False
+    """Whether the program was copied from the cache instead of being generated."""
+
+    @property
+    def succeeded(self) -> bool:
+        return self.error is None
+
+
+def _warm_library_cache(components: Iterable[LibraryComponent]) -> None:
+    _ = LIBRARY_INDEX.files
+    _ = get_library_catalog()
+    for component in components:
+        _ = LIBRARY_XML_CACHE.get_root(component)
+
+
+def _generate_program(
+    name: str, program: Program, file_path: Path, cache: ProgramCache | None
+) -> ProgramGenerationReport:
+    start = time.perf_counter()
+    error: str | None = None
+    from_cache = False
+    try:
+        from_cache = program.save_program(file_path, cache=cache)
+    except Exception as e:  # noqa: BLE001 # a failure in one program should be reported without aborting the batch
+        error = f"{type(e).__name__}: {e}"
+        file_path.unlink(missing_ok=True)
+    return ProgramGenerationReport(
+        name=name, file_path=file_path, duration=time.perf_counter() - start, error=error, from_cache=from_cache
+    )
+
+
+def generate_many(
+    programs: Mapping[str, Program], out_dir: Path, *, workers: int | None = None, cache: ProgramCache | None = None
+) -> list[ProgramGenerationReport]:
+    """Generate and save many programs, spread across a pool of worker processes.
+
+    Each program is written to `out_dir / f"{name}.iaa"` by the worker that generates it. Every worker starts with the
+    library index, catalog and the XML of all the library components used by the programs already loaded. Reports are
+    returned in the same order as `programs`, and a program that fails to generate is reported rather than stopping
+    the rest of the batch.
+
+    Args:
+        programs: The programs to generate, keyed by the name of the file to write each one to.
+        out_dir: The directory to write the programs to (created if it does not exist).
+        workers: The number of worker processes (defaults to the number of CPUs). With 1 worker the programs are
+            generated in the current process.
+        cache: Where to copy programs that were generated before from (and store new ones), for programs with
+            deterministic IDs (see `Program.write_program`).
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    components = list(
+        dict.fromkeys(component for program in programs.values() for component in program.library_components)
+    )
+    file_paths = {name: out_dir / f"{name}{PROGRAM_FILE_EXTENSION}" for name in programs}
+    if workers == 1:
+        _warm_library_cache(components)
+        return [_generate_program(name, program, file_paths[name], cache) for name, program in programs.items()]
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_warm_library_cache, initargs=(components,)) as executor:
+        futures: dict[str, Future[ProgramGenerationReport]] = {
+            name: executor.submit(_generate_program, name, program, file_paths[name], cache)
+            for name, program in programs.items()
+        }
+        reports: list[ProgramGenerationReport] = []
+        for name, future in futures.items():
+            try:
+                reports.append(future.result())
+            except Exception as e:  # noqa: BLE001 # e.g. a program that could not be sent to a worker process
+                reports.append(
+                    ProgramGenerationReport(
+                        name=name, file_path=file_paths[name], duration=0, error=f"{type(e).__name__}: {e}"
+                    )
+                )
+    return reports
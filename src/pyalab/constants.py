@@ -5,3 +5,4 @@ assert str(PATH_TO_PACKAGE_ROOT).endswith("pyalab"), (
     f"Sanity check failed, path was not to package root, it was: {PATH_TO_PACKAGE_ROOT}"
 )
 PATH_TO_INCLUDED_XML_FILES = PATH_TO_PACKAGE_ROOT / "vendor_files" / "integra_library"
+PATH_TO_LIBRARY_CATALOG = PATH_TO_PACKAGE_ROOT / "vendor_files" / "integra_library_catalog.json"
@@ -1,4 +1,5 @@
 from enum import Enum
+from functools import cached_property
 from typing import ClassVar
 from typing import Literal
 
@@ -6,9 +7,11 @@ from lxml import etree
 from lxml.etree import _Element
 from pydantic import BaseModel
 
+from .integra_xml import LIBRARY_XML_CACHE
 from .integra_xml import LibraryComponent
 from .integra_xml import LibraryComponentType
 from .integra_xml import hundredths_mm_to_mm
+from .library_catalog import library_file_digest
 from .plate import Labware
 
 
@@ -17,9 +20,58 @@ class StandardDeckNames(Enum):
     FOUR_POSITION = "4 Position Portrait Deck"
 
 
+class DeckSectionInfo(BaseModel, frozen=True):
+    index: int
+    """The position of the section within the deck XML."""
+    name: str
+    """The deck position the section belongs to (e.g. A, B, C)."""
+    width: float
+    """The width of the section (mm)."""
+    length: float
+    """The length of the section (mm)."""
+    orientation: str
+    """The default orientation of labware in the section."""
+
+
+# stored with the digest of the deck's library file, so an edited file is parsed again
+_deck_sections: dict[tuple[str, str | None], tuple[str, dict[str, tuple[DeckSectionInfo, ...]]]] = {}
+
+
 class Deck(LibraryComponent, frozen=True):
     type: ClassVar[LibraryComponentType] = LibraryComponentType.DECK
 
+    @cached_property
+    def sections(self) -> dict[str, tuple[DeckSectionInfo, ...]]:
+        """The sections of the deck, grouped by the name of the deck position they belong to.
+
+        Parsed once per deck name and version (and again if the library file is edited), and then shared by every Deck instance.
+        """
+        key = (self.name, self.xml_file_version)
+        digest = library_file_digest(self.find_xml_file())
+        cached = _deck_sections.get(key)
+        if cached is None or cached[0] != digest:
+            sections_by_name: dict[str, list[DeckSectionInfo]] = {}
+            root = LIBRARY_XML_CACHE.get_root(self)
+            for idx, section in enumerate(root.findall("./Sections/Section")):
+                name = section.findtext("Name")
+                width = section.findtext("Width")
+                length = section.findtext("Length")
+                assert name is not None
+                assert width is not None
+                assert length is not None
+                sections_by_name.setdefault(name, []).append(
+                    DeckSectionInfo(
+                        index=idx,
+                        name=name,
+                        width=hundredths_mm_to_mm(width),
+                        length=hundredths_mm_to_mm(length),
+                        orientation=section.findtext("OrientationExtended", default=""),
+                    )
+                )
+            cached = (digest, {name: tuple(infos) for name, infos in sections_by_name.items()})
+            _deck_sections[key] = cached
+        return cached[1]
+
 
 class DeckPositionNotFoundError(Exception):
     def __init__(self, *, deck_name: str, deck_position_name: str, width: int, length: int):
@@ -43,26 +95,30 @@ class DeckPosition(BaseModel, frozen=True):
     # The Rack for 1.5 ml microcentrifuge tubes Tubeholder is nearly 4 mm different than the deck section
 
     def section_index(self, *, deck: Deck, labware: Labware) -> int:
-        root = deck.load_xml()
+        key = (
+            deck.name,
+            deck.xml_file_version,
+            self,
+            labware.type,
+            labware.name,
+            labware.xml_file_version,
+        )
+        digests = (library_file_digest(deck.find_xml_file()), library_file_digest(labware.find_xml_file()))
+        cached = _section_indexes.get(key)
+        if cached is not None and cached[0] == digests:
+            return cached[1]
+
         is_portrait = self.orientation in (LabwareOrientation.A1_NE_CORNER, LabwareOrientation.A1_SW_CORNER)
         labware_search_width = labware.length if is_portrait else labware.width
         labware_search_length = labware.width if is_portrait else labware.length
-        for idx, section in enumerate(root.findall("./Sections/Section")):
-            name = section.find("Name")
-            width = section.find("Width")
-            length = section.find("Length")
-            assert width is not None
-            assert width.text is not None
-            assert length is not None
-            assert length.text is not None
-            assert name is not None
-
+        for section in deck.sections.get(self.name, ()):
             if (
-                name.text == self.name
-                and abs(hundredths_mm_to_mm(width.text) - labware_search_width) <= self._section_match_epsilon
-                and abs(hundredths_mm_to_mm(length.text) - labware_search_length) <= self._section_match_epsilon
+                abs(section.width - labware_search_width) <= self._section_match_epsilon
+                and abs(section.length - labware_search_length) <= self._section_match_epsilon
             ):
-                return idx  # TODO: confirm that Integra does not allow any duplicates inherently
+                # TODO: confirm that Integra does not allow any duplicates inherently
+                _section_indexes[key] = (digests, section.index)
+                return section.index
 
         raise DeckPositionNotFoundError(
             deck_name=deck.name, deck_position_name=self.name, width=labware.xml_width, length=labware.xml_length
@@ -70,6 +126,13 @@ class DeckPosition(BaseModel, frozen=True):
         # TODO: figure out if CreationOrderIndex is important to be changed or not
 
 
+# memoized per deck, deck position (name and orientation) and labware type, along with the digests of the deck and labware library files so edits to either are picked up
+_section_indexes: dict[
+    tuple[str, str | None, DeckPosition, LibraryComponentType, str, str | None],
+    tuple[tuple[str, str], int],
+] = {}
+
+
 class DeckLayout(BaseModel):
     deck: Deck
     labware: dict[DeckPosition, Labware]
@@ -80,38 +143,28 @@ class DeckLayout(BaseModel):
 
         root = self.deck.create_xml_for_program()
         _ = etree.SubElement(root, "NameInProcess").text = name
+        sections = root.findall("./Sections/Section")  # found once, then indexed by the memoized section index
         for deck_position, plate in self.labware.items():
             section_idx = deck_position.section_index(deck=self.deck, labware=plate)
-
-            for idx, section in enumerate(root.findall("./Sections/Section")):
-                if idx == section_idx:
-                    plate_xml = plate.create_xml_for_program()
-                    children = list(section)
-                    for index, child in enumerate(list(section)):
-                        if child.tag == "IsWaste":
-                            # Insert the new element right after <IsWaste>
-                            children.insert(index + 1, plate_xml)
-                            break
-                    else:
-                        raise NotImplementedError(
-                            "Could not find <IsWaste> element in the section...this should never happen so there's no implementation to handle it"
-                        )
-                    for child in list(section):
-                        if child.tag == "OrientationExtended":
-                            child.text = deck_position.orientation.value
-                            break
-                    else:
-                        raise NotImplementedError(
-                            "Could not find <OrientationExtended> element in the section...this should never happen so there's no implementation to handle it"
-                        )
-                    # Clear existing children and re-insert the updated list
-                    section.clear()
-                    section.extend(children)
-
-                    break
-            else:
+            if section_idx >= len(sections):
                 raise NotImplementedError(
                     f"Could not find section with index {section_idx} in the deck XML...this should never happen so there's no implementation to handle it"
                 )
+            section = sections[section_idx]
+
+            is_waste = section.find("IsWaste")
+            if is_waste is None:
+                raise NotImplementedError(
+                    "Could not find <IsWaste> element in the section...this should never happen so there's no implementation to handle it"
+                )
+            # Insert the new element right after <IsWaste>
+            section.insert(section.index(is_waste) + 1, plate.create_xml_for_program())
+
+            orientation = section.find("OrientationExtended")
+            if orientation is None:
+                raise NotImplementedError(
+                    "Could not find <OrientationExtended> element in the section...this should never happen so there's no implementation to handle it"
+                )
+            orientation.text = deck_position.orientation.value
 
         return root
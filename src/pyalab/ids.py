@@ -0,0 +1,91 @@
+import hashlib
+import uuid
+from abc import ABC
+from abc import abstractmethod
+from collections.abc import Iterable
+from datetime import datetime
+from enum import Enum
+from typing import ClassVar
+from typing import override
+
+from pydantic import AwareDatetime
+from pydantic import BaseModel
+
+PLACEHOLDER_CHANGED_DATE = "2024-12-17T16:27:27.0715524-05:00"  # TODO: make this real time by default
+
+
+class IdKind(Enum):
+    PROGRAM = "UniqueIdentifier"
+    MIGRATION = "MigrationIdentifier"
+    STEP = "Step"
+
+
+def format_changed_date(changed_date: datetime) -> str:
+    """Format a time the way Vialab writes it (with 7 digits of fractional seconds)."""
+    offset = changed_date.strftime("%z")
+    return f"{changed_date:%Y-%m-%dT%H:%M:%S}.{changed_date.microsecond:06d}0{offset[:3]}:{offset[3:]}"
+
+
+def _uuid_from_digest(digest: bytes) -> uuid.UUID:
+    return uuid.UUID(bytes=digest[:16], version=4)
+
+
+class IdProvider(BaseModel, ABC, frozen=True):
+    """Provides the identifiers and the timestamp written into a program."""
+
+    is_deterministic: ClassVar[bool] = True
+    """Whether writing the same program always gives the same identifiers."""
+    needs_content: ClassVar[bool] = False
+    """Whether `create_id` uses the `content` (otherwise the steps are written without all being serialized first)."""
+    changed_date: AwareDatetime | None = None
+    """The time written as when the program was last changed (a fixed placeholder if not provided)."""
+
+    @abstractmethod
+    def create_id(self, kind: IdKind, *, index: int, content: Iterable[bytes]) -> uuid.UUID:
+        """Create the identifier of the program (or of one of its steps).
+
+        Args:
+            kind: What the identifier is for.
+            index: The position of the step within the program (0 for the program itself).
+            content: The serialized XML that the identifier is for, without the identifier itself.
+        """
+
+    def format_changed_date(self) -> str:
+        return PLACEHOLDER_CHANGED_DATE if self.changed_date is None else format_changed_date(self.changed_date)
+
+
+class RandomIds(IdProvider, frozen=True):
+    """A new random UUID for every identifier, each time the program is written (the default)."""
+
+    is_deterministic: ClassVar[bool] = False
+
+    @override
+    def create_id(self, kind: IdKind, *, index: int, content: Iterable[bytes]) -> uuid.UUID:
+        return uuid.uuid4()
+
+
+class SeededIds(IdProvider, frozen=True):
+    """Identifiers derived from a seed and the position of each step, so the same seed always gives the same IDs."""
+
+    seed: int
+
+    @override
+    def create_id(self, kind: IdKind, *, index: int, content: Iterable[bytes]) -> uuid.UUID:
+        return _uuid_from_digest(hashlib.sha256(f"{self.seed}:{kind.value}:{index}".encode()).digest())
+
+
+class ContentDerivedIds(IdProvider, frozen=True):
+    """Identifiers derived from the XML they identify, so identical programs get identical IDs.
+
+    The identifiers of the program are derived from its header, hardware, deck layouts and the steps stored on the
+    Program (not any extra steps streamed in when writing it).
+    """
+
+    needs_content: ClassVar[bool] = True
+
+    @override
+    def create_id(self, kind: IdKind, *, index: int, content: Iterable[bytes]) -> uuid.UUID:
+        digest = hashlib.sha256(f"{kind.value}:{index}:".encode())
+        for chunk in content:
+            digest.update(chunk)
+        return _uuid_from_digest(digest.digest())
@@ -1,4 +1,8 @@
 import re
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+from copy import deepcopy
 from enum import Enum
 from pathlib import Path
 from typing import ClassVar
@@ -8,6 +12,7 @@ from lxml.etree import _Element
 from pydantic import BaseModel
 
 from .constants import PATH_TO_INCLUDED_XML_FILES
+from .library_catalog import get_library_catalog
 
 NS_XSI = "http://www.w3.org/2001/XMLSchema-instance"
 
@@ -28,10 +33,22 @@ class LibraryComponentType(Enum):
 
 
 class IntegraLibraryObjectNotFoundError(OSError):
-    def __init__(self, *, component_type: LibraryComponentType, name: str, paths_searched: list[Path]):
+    def __init__(
+        self,
+        *,
+        component_type: LibraryComponentType,
+        name: str,
+        paths_searched: list[Path],
+        version: str | None = None,
+        versions_found: list[str] | None = None,
+    ):
         self.type = component_type
         self.name = name
-        super().__init__(f"Could not find {component_type.value} with name {name} while looking in {paths_searched}")
+        self.version = version
+        version_info = "" if version is None else f" and version {version} (versions found: {versions_found})"
+        super().__init__(
+            f"Could not find {component_type.value} with name {name}{version_info} while looking in {paths_searched}"
+        )
 
 
 CONTENT_VERSIONS: dict[LibraryComponentType, str] = {
@@ -41,30 +58,248 @@ CONTENT_VERSIONS: dict[LibraryComponentType, str] = {
 }
 
 
-class LibraryComponent(BaseModel, frozen=True):
-    type: ClassVar[LibraryComponentType]
+LIBRARY_FILE_NAME_REGEX = re.compile(r"(?P<name>.+)\ V(?P<version>\d+)\.xml")
+IDENTITY_FIELDS = ("Name", "PartNumber", "DataVersion")
+
+
+class LibraryComponentIdentity(BaseModel, frozen=True):
+    """The fields that identify a library file within program XML, which embeds the contents of the file but not its name."""
+
+    type: LibraryComponentType
     name: str
-    xml_file_version: str | None = None
+    """The `<Name>` within the XML, which is often different from the name of the library file."""
+    part_number: str
+    data_version: str
 
-    def load_xml(self) -> _Element:
-        directory = PATH_TO_INCLUDED_XML_FILES / self.type.value
-        xml_files = directory.glob("*.xml")
-        regex_pattern = re.compile(rf"{self.name}\ V\d+\.xml")
-        matched_files = [file for file in xml_files if regex_pattern.match(file.name)]
-        if len(matched_files) == 0:
+    @classmethod
+    def from_xml(cls, *, component_type: LibraryComponentType, element: _Element) -> "LibraryComponentIdentity":
+        name, part_number, data_version = (element.findtext(field, default="") for field in IDENTITY_FIELDS)
+        return cls(type=component_type, name=name, part_number=part_number, data_version=data_version)
+
+
+class LibraryComponentNotIdentifiedError(LookupError):
+    def __init__(self, identity: LibraryComponentIdentity):
+        super().__init__(
+            f"Could not find a {identity.type.value} in the library with name {identity.name}, part number {identity.part_number} and data version {identity.data_version}"
+        )
+
+
+class LibraryIndex:
+    """In-memory index of the XML files in the Integra library.
+
+    The library folders are scanned once (lazily, on first use), and afterwards every lookup is a dictionary access.
+    """
+
+    def __init__(self, *, library_path: Path = PATH_TO_INCLUDED_XML_FILES):
+        super().__init__()
+        self.library_path = library_path
+        self._files: dict[tuple[LibraryComponentType, str], dict[int, Path]] | None = None
+        self._identities: dict[LibraryComponentIdentity, tuple[str, str | None]] | None = None
+        self._lock = threading.Lock()
+
+    def _build(self) -> dict[tuple[LibraryComponentType, str], dict[int, Path]]:
+        files: dict[tuple[LibraryComponentType, str], dict[int, Path]] = {}
+        for component_type in LibraryComponentType:
+            directory = self.library_path / component_type.value
+            if not directory.is_dir():
+                continue
+            for file in directory.iterdir():
+                match = LIBRARY_FILE_NAME_REGEX.fullmatch(file.name)
+                if match is None:
+                    continue  # there are a few files in the library that don't follow the naming convention
+                versions = files.setdefault((component_type, match.group("name")), {})
+                versions[int(match.group("version"))] = file
+        return {key: dict(sorted(versions.items())) for key, versions in files.items()}
+
+    @property
+    def files(self) -> dict[tuple[LibraryComponentType, str], dict[int, Path]]:
+        with self._lock:
+            if self._files is None:
+                self._files = self._build()
+            return self._files
+
+    def versions(self, *, component_type: LibraryComponentType, name: str) -> dict[int, Path]:
+        """All versions of the component found in the library (sorted from oldest to newest)."""
+        return self.files.get((component_type, name), {})
+
+    def find(self, *, component_type: LibraryComponentType, name: str, version: str | None = None) -> Path:
+        """Find the file for the component, defaulting to the newest version in the library."""
+        versions = self.versions(component_type=component_type, name=name)
+        if len(versions) == 0:
             raise IntegraLibraryObjectNotFoundError(
-                component_type=self.type, name=self.name, paths_searched=[directory]
+                component_type=component_type, name=name, paths_searched=[self.library_path / component_type.value]
+            )
+        if version is None:
+            return versions[max(versions)]
+        file = versions.get(int(version.removeprefix("V")))
+        if file is None:
+            raise IntegraLibraryObjectNotFoundError(
+                component_type=component_type,
+                name=name,
+                paths_searched=[self.library_path / component_type.value],
+                version=version,
+                versions_found=[file.name for file in versions.values()],
+            )
+        return file
+
+    def _read_identity(self, *, component_type: LibraryComponentType, file: Path) -> LibraryComponentIdentity:
+        catalog = get_library_catalog()
+        values = [catalog.lookup(file=file, field=field, library_path=self.library_path) for field in IDENTITY_FIELDS]
+        if any(value is None for value in values):
+            parser = etree.XMLParser(no_network=True, recover=False)
+            return LibraryComponentIdentity.from_xml(
+                component_type=component_type, element=etree.parse(file, parser).getroot()
             )
+        name, part_number, data_version = (value or "" for value in values)
+        return LibraryComponentIdentity(
+            type=component_type, name=name, part_number=part_number, data_version=data_version
+        )
+
+    def identify(self, identity: LibraryComponentIdentity) -> tuple[str, str | None]:
+        """Find the library file that a component embedded in program XML was copied from.
+
+        The identities of the library files are read from the catalog (parsing any file it can't answer for) the first
+        time this is called.
+
+        Returns:
+            The name and `xml_file_version` to create the component with (the version is None for the newest one).
+        """
+        files = self.files
+        with self._lock:
+            if self._identities is None:
+                identities: dict[LibraryComponentIdentity, tuple[str, str | None]] = {}
+                for (component_type, name), versions in files.items():
+                    newest = max(versions)
+                    for version, file in versions.items():
+                        identities[self._read_identity(component_type=component_type, file=file)] = (
+                            name,
+                            None if version == newest else f"V{version:02d}",
+                        )
+                self._identities = identities
+            found = self._identities.get(identity)
+        if found is None:
+            raise LibraryComponentNotIdentifiedError(identity)
+        return found
+
+    def clear(self) -> None:
+        with self._lock:
+            self._files = None
+            self._identities = None
+
 
-        assert len(matched_files) == 1  # TODO: handle multiple versions in the library...
-        file = matched_files[0]
+LIBRARY_INDEX = LibraryIndex()
+
+
+class LibraryXmlCacheInfo(BaseModel, frozen=True):
+    hits: int
+    misses: int
+    max_size: int
+    current_size: int
+
+
+class _LibraryXmlCacheEntry(BaseModel, frozen=True, arbitrary_types_allowed=True):
+    file: Path
+    mtime_ns: int
+    root: _Element
+    program_fragment: _Element | None = None
+    """The fragment embedded into program XML, built from `root` the first time it's needed."""
+
+
+type LibraryXmlCacheKey = tuple[LibraryComponentType, str, str | None]
+
+
+class LibraryXmlCache:
+    """Process-wide LRU cache of the parsed XML trees in the Integra library.
+
+    Entries are keyed by the component type, name and version, and are re-parsed whenever the modification time of the
+    underlying file changes. Each entry also holds the fragment built from the tree for program XML, so it's evicted
+    along with the tree. The cached trees and fragments are shared, so they must never be mutated...`LibraryComponent`
+    hands out copies.
+    """
+
+    def __init__(self, *, max_size: int = 256):
+        super().__init__()
+        self.max_size = max_size
+        self._entries: OrderedDict[LibraryXmlCacheKey, _LibraryXmlCacheEntry] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def _get_entry(self, key: LibraryXmlCacheKey, component: "LibraryComponent") -> _LibraryXmlCacheEntry:
+        # must be called with the lock held
+        entry = self._entries.get(key)
+        if entry is not None:
+            try:
+                mtime_ns = entry.file.stat().st_mtime_ns
+            except FileNotFoundError:
+                mtime_ns = None
+            if mtime_ns == entry.mtime_ns:
+                self._hits += 1
+                self._entries.move_to_end(key)
+                return entry
+        self._misses += 1
+        file = component.find_xml_file()
+        mtime_ns = file.stat().st_mtime_ns
         parser = etree.XMLParser(no_network=True, recover=False)
         tree = etree.parse(file, parser)
         root = tree.getroot()
         assert isinstance(root, _Element), f"Expected root to be an Element, but got type {type(root)} for {root}"
-        return root
+        entry = _LibraryXmlCacheEntry(file=file, mtime_ns=mtime_ns, root=root)
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            _ = self._entries.popitem(last=False)
+        return entry
+
+    def get_root(self, component: "LibraryComponent") -> _Element:
+        key: LibraryXmlCacheKey = (component.type, component.name, component.xml_file_version)
+        with self._lock:
+            return self._get_entry(key, component).root
+
+    def get_program_fragment(self, component: "LibraryComponent", *, build: Callable[[_Element], _Element]) -> _Element:
+        """Get the fragment of program XML for the component, building it from the parsed tree if it isn't cached yet."""
+        key: LibraryXmlCacheKey = (component.type, component.name, component.xml_file_version)
+        with self._lock:
+            entry = self._get_entry(key, component)
+            if entry.program_fragment is None:
+                entry = entry.model_copy(update={"program_fragment": build(entry.root)})
+                self._entries[key] = entry
+            assert entry.program_fragment is not None
+            return entry.program_fragment
+
+    def info(self) -> LibraryXmlCacheInfo:
+        with self._lock:
+            return LibraryXmlCacheInfo(
+                hits=self._hits, misses=self._misses, max_size=self.max_size, current_size=len(self._entries)
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._hits = 0
+            self._misses = 0
+
+
+LIBRARY_XML_CACHE = LibraryXmlCache()
+
+
+class LibraryComponent(BaseModel, frozen=True):
+    type: ClassVar[LibraryComponentType]
+    name: str
+    xml_file_version: str | None = None
+
+    def find_xml_file(self) -> Path:
+        return LIBRARY_INDEX.find(component_type=self.type, name=self.name, version=self.xml_file_version)
+
+    def load_xml(self) -> _Element:
+        # the cached tree is shared across the whole process, so give the caller their own copy to modify
+        return deepcopy(LIBRARY_XML_CACHE.get_root(self))
 
     def create_xml_for_program(self) -> _Element:
+        # the fragment is only built once per parse of the library file, and then each caller gets their own copy
+        return deepcopy(LIBRARY_XML_CACHE.get_program_fragment(self, build=self._build_xml_for_program))
+
+    def _build_xml_for_program(self, library_root: _Element) -> _Element:
         is_content = self.type in CONTENT_VERSIONS
         root = etree.Element(
             "Content"
@@ -78,12 +313,15 @@ class LibraryComponent(BaseModel, frozen=True):
                 self.type.value,  # TODO: confirm that all object types use the file directory as the xsi:type too
             )
 
-        for subelement in self.load_xml():
+        for subelement in deepcopy(library_root):  # copy so the shared tree is left intact when its children are moved
             root.append(subelement)
         return root
 
     def _extract_xml_node_text(self, node_name: str) -> str:
-        root = self.load_xml()
+        text = get_library_catalog().lookup(file=self.find_xml_file(), field=node_name)
+        if text is not None:
+            return text
+        root = LIBRARY_XML_CACHE.get_root(self)  # read-only access, so no need to copy the tree
         node = root.find(f".//{node_name}")
         assert node is not None
         text = node.text
@@ -0,0 +1,99 @@
+import importlib
+import json
+from functools import partial
+from typing import Any
+from typing import Protocol
+from typing import override
+
+# third-party JSON modules to use instead of the standard library when they are installed, along with the arguments
+# needed to make their output match `json.dumps`
+OPTIONAL_JSON_BACKENDS: list[tuple[str, dict[str, Any]]] = [
+    ("ujson", {"ensure_ascii": True, "escape_forward_slashes": False, "separators": (", ", ": ")}),
+]
+
+# representative of the values embedded in program XML...a backend must encode it exactly like the standard library
+_COMPATIBILITY_PROBE: list[Any] = [
+    {
+        "Well": {"Item1": 11, "Item2": 0},
+        "DeckSection": -1,
+        "Volume": 30000,
+        "HeightConfigType": True,
+        "LLDHeights": None,
+        "Name": 'µl GripTip / "Low retention"',
+    },
+    "TipChange_ModeA",
+    [],
+    0.5,
+]
+
+
+class IncompatibleJsonBackendError(Exception):
+    def __init__(self, backend: "JsonBackend"):
+        super().__init__(
+            f"The JSON backend {backend!r} does not produce the same output as the standard library json.dumps, which would change the generated programs"
+        )
+
+
+class JsonBackend(Protocol):
+    def dumps(self, obj: object) -> str: ...
+
+
+class StdlibJsonBackend:
+    """Encode with the standard library (the default)."""
+
+    def dumps(self, obj: object) -> str:
+        return json.dumps(obj)
+
+
+class ModuleJsonBackend:
+    """Encode with the `dumps` function of a third-party JSON module."""
+
+    def __init__(self, module_name: str, **dumps_kwargs: object):
+        super().__init__()
+        self.module_name = module_name
+        self.dumps = partial(importlib.import_module(module_name).dumps, **dumps_kwargs)
+
+    @override
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.module_name!r})"
+
+
+def is_compatible(backend: JsonBackend) -> bool:
+    """Check whether the backend encodes values byte-for-byte the same as the standard library."""
+    try:
+        return backend.dumps(_COMPATIBILITY_PROBE) == json.dumps(_COMPATIBILITY_PROBE)
+    except (TypeError, ValueError):
+        return False
+
+
+def find_json_backend() -> JsonBackend:
+    """Get the first installed optional backend that is compatible with the standard library, or the stdlib backend."""
+    for module_name, dumps_kwargs in OPTIONAL_JSON_BACKENDS:
+        try:
+            backend = ModuleJsonBackend(module_name, **dumps_kwargs)
+        except ImportError:
+            continue
+        if is_compatible(backend):
+            return backend
+    return StdlibJsonBackend()
+
+
+_backend: JsonBackend = find_json_backend()
+
+
+def get_json_backend() -> JsonBackend:
+    return _backend
+
+
+def set_json_backend(backend: JsonBackend | None) -> None:
+    """Use a different backend to encode the JSON values in program XML (or restore the default when None)."""
+    global _backend  # noqa: PLW0603 # the backend is shared by the whole process
+    if backend is None:
+        backend = find_json_backend()
+    if not is_compatible(backend):
+        raise IncompatibleJsonBackendError(backend)
+    _backend = backend
+
+
+def json_dumps(obj: object) -> str:
+    return _backend.dumps(obj)
@@ -0,0 +1,110 @@
+import hashlib
+import threading
+from pathlib import Path
+
+from lxml import etree
+from pydantic import BaseModel
+
+from .constants import PATH_TO_INCLUDED_XML_FILES
+from .constants import PATH_TO_LIBRARY_CATALOG
+
+CATALOG_FIELDS = (
+    "Name",
+    "PartNumber",
+    "DataVersion",
+    "RowGap",
+    "CollumnGap",
+    "FootprintLengthMM",
+    "FootprintWidthMM",
+    "RowCount",
+    "CollumnCount",
+    "NominalWellVolume",
+    "Channels",
+    "MinSpacing",
+    "TipID",
+    "Volume",
+    "PipetteDefaultVolume",
+)
+
+# memoized per file, modification time and size, so each library file is only read again after it changes
+_library_file_digests: dict[tuple[Path, int, int], str] = {}
+
+
+def library_file_digest(file: Path) -> str:
+    """Hash the contents of a library file."""
+    stat = file.stat()
+    key = (file, stat.st_mtime_ns, stat.st_size)
+    digest = _library_file_digests.get(key)
+    if digest is None:
+        digest = hashlib.sha256(file.read_bytes()).hexdigest()
+        _library_file_digests[key] = digest
+    return digest
+
+
+class LibraryCatalogEntry(BaseModel, frozen=True):
+    digest: str
+    """The hash of the XML file when the catalog was compiled, so any edit to the file is detected as staleness."""
+    values: dict[str, str]
+    """The text of the first node with each field name (fields absent from the file are omitted)."""
+
+
+class LibraryCatalog(BaseModel, frozen=True):
+    """Scalar metadata extracted from every file in the Integra library, so it can be read without parsing any XML.
+
+    The catalog is compiled once per library version and shipped alongside it as a JSON sidecar file.
+    """
+
+    fields: tuple[str, ...] = CATALOG_FIELDS
+    entries: dict[str, LibraryCatalogEntry]
+    """Keyed by the path of the XML file relative to the library folder."""
+
+    @classmethod
+    def compile(cls, *, library_path: Path = PATH_TO_INCLUDED_XML_FILES) -> "LibraryCatalog":
+        parser = etree.XMLParser(no_network=True, recover=False)
+        entries: dict[str, LibraryCatalogEntry] = {}
+        for file in sorted(library_path.rglob("*.xml")):
+            root = etree.parse(file, parser).getroot()
+            values: dict[str, str] = {}
+            for field in CATALOG_FIELDS:
+                node = root.find(f".//{field}")
+                if node is not None and node.text is not None:
+                    values[field] = node.text
+            entries[file.relative_to(library_path).as_posix()] = LibraryCatalogEntry(
+                digest=library_file_digest(file), values=values
+            )
+        return cls(entries=entries)
+
+    @classmethod
+    def load(cls, file_path: Path = PATH_TO_LIBRARY_CATALOG) -> "LibraryCatalog":
+        if not file_path.exists():
+            return cls(entries={})
+        return cls.model_validate_json(file_path.read_bytes())
+
+    def save(self, file_path: Path = PATH_TO_LIBRARY_CATALOG) -> None:
+        _ = file_path.write_text(self.model_dump_json(indent=2) + "\n", encoding="utf-8")
+
+    def lookup(self, *, file: Path, field: str, library_path: Path = PATH_TO_INCLUDED_XML_FILES) -> str | None:
+        """Look up the value of the field, or None if the catalog can't answer (so the XML should be parsed instead)."""
+        if not file.is_relative_to(library_path):
+            return None
+        entry = self.entries.get(file.relative_to(library_path).as_posix())
+        if entry is None or entry.digest != library_file_digest(file):
+            return None
+        return entry.values.get(field)
+
+
+_catalog: LibraryCatalog | None = None
+_catalog_lock = threading.Lock()
+
+
+def get_library_catalog() -> LibraryCatalog:
+    global _catalog  # noqa: PLW0603 # the catalog is lazily loaded once per process
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = LibraryCatalog.load()
+        return _catalog
+
+
+if __name__ == "__main__":
+    # regenerate the catalog after updating the vendor library
+    LibraryCatalog.compile().save()
@@ -25,6 +25,15 @@ class Pipette(LibraryComponent, frozen=True):
     def is_d_one(self) -> bool:
         return self.num_channels == 1
 
+    @cached_property
+    def max_volume(self) -> float:
+        """The most liquid each channel can hold (µl), whatever tip is used."""
+        return int(self._extract_xml_node_text("PipetteDefaultVolume")) / 100  # Vialab uses 0.01 µl as the base unit
+
+    def liquid_capacity(self, tip: "Tip") -> float:
+        """Get the most liquid each channel can hold with this tip (µl)...the smaller of the pipette and tip volumes."""
+        return min(self.max_volume, tip.max_volume)
+
 
 class Tip(LibraryComponent, frozen=True):
     type = LibraryComponentType.TIP
@@ -34,6 +43,11 @@ class Tip(LibraryComponent, frozen=True):
     def tip_id(self) -> int:
         return int(self._extract_xml_node_text("TipID"))
 
+    @cached_property
+    def max_volume(self) -> float:
+        """The most liquid the tip can hold (µl)."""
+        return int(self._extract_xml_node_text("Volume")) / 100  # Vialab uses 0.01 µl as the base unit for volume
+
     @override
     def load_xml(self) -> _Element:
         return super().load_xml()
@@ -4,10 +4,15 @@ from typing import override
 
 from lxml import etree
 from lxml.etree import _Element
+from pydantic import BaseModel
 from pydantic import Field
+from pydantic import SerializationInfo
+from pydantic import field_serializer
 
 from .integra_xml import LibraryComponent
 from .integra_xml import LibraryComponentType
+from .integra_xml import hundredths_mm_to_mm
+from .library_catalog import library_file_digest
 
 MAX_SPAN_FOR_VOYAGER = 33  # the 4 channel can span this wide
 
@@ -19,10 +24,38 @@ class RowSpacingAboveLimitError(ValueError):
         )
 
 
+class LabwareGeometry(BaseModel, frozen=True):
+    """The dimensions (mm) and well layout of a type of labware.
+
+    Resolved once per library name and version, and then shared by every Labware instance of that type.
+    """
+
+    row_spacing: float
+    column_spacing: float
+    length: float
+    width: float
+    row_count: int
+    column_count: int
+    well_volume: float
+    """The nominal volume of each well (µl)."""
+
+
+FINGERPRINT_CONTEXT = "fingerprint"
+"""The serialization context used when calculating `Program.fingerprint`."""
+
+# stored with the digest of the library file it was read from, so an edited file is read again
+_labware_geometries: dict[tuple[LibraryComponentType, str, str | None], tuple[str, LabwareGeometry]] = {}
+
+
 class Labware(LibraryComponent, frozen=True):
     id: uuid.UUID = Field(default_factory=uuid.uuid4)
     display_name: str = ""  # TODO: If left as blank, then set the display name to the name of the plate type # TODO: validate length and character class requirements
 
+    @field_serializer("id")
+    def _serialize_id(self, value: uuid.UUID, info: SerializationInfo) -> uuid.UUID | None:
+        # the ID only tells labware instances apart in memory and isn't written into the program, so it's left out of the Program fingerprint
+        return None if info.context == FINGERPRINT_CONTEXT else value
+
     @override
     def create_xml_for_program(self) -> _Element:
         root = super().create_xml_for_program()
@@ -37,26 +70,58 @@ class Labware(LibraryComponent, frozen=True):
             raise RowSpacingAboveLimitError(spacing)
         return spacing
 
+    @cached_property
+    def geometry(self) -> LabwareGeometry:
+        key = (self.type, self.name, self.xml_file_version)
+        digest = library_file_digest(self.find_xml_file())
+        cached = _labware_geometries.get(key)
+        if cached is not None and cached[0] == digest:
+            return cached[1]
+        geometry = LabwareGeometry(
+            # in the XML the distance is in 0.01 mm units, but our standard is mm
+            row_spacing=hundredths_mm_to_mm(self._extract_xml_node_text("RowGap")),
+            column_spacing=hundredths_mm_to_mm(self._extract_xml_node_text("CollumnGap")),
+            length=hundredths_mm_to_mm(self._extract_xml_node_text("FootprintLengthMM")),
+            width=hundredths_mm_to_mm(self._extract_xml_node_text("FootprintWidthMM")),
+            row_count=int(self._extract_xml_node_text("RowCount")),
+            column_count=int(self._extract_xml_node_text("CollumnCount")),  # sic, this is how it's spelled in the XML
+            well_volume=int(self._extract_xml_node_text("NominalWellVolume"))
+            / 100,  # Vialab uses 0.01 µl as the base unit for volume
+        )
+        _labware_geometries[key] = (digest, geometry)
+        return geometry
+
     @cached_property
     def row_spacing_in_xml(self) -> float:
-        return (
-            float(self._extract_xml_node_text("RowGap")) / 100
-        )  # in the XML the distance is in 0.01 mm units, but our standard is mm
+        return self.geometry.row_spacing
+
+    @cached_property
+    def column_spacing(self) -> float:
+        return self.geometry.column_spacing
 
     @cached_property
     def length(self) -> float:
         # Length is the horizontal distance when object is in landscape orientation (rows A, B, C lined up vertically)
-        return (
-            float(self._extract_xml_node_text("FootprintLengthMM")) / 100
-        )  # in the XML the distance is in 0.01 mm units, but our standard is mm
+        return self.geometry.length
 
     @cached_property
     def width(self) -> float:
         # Width is the vertical (in ViaLab view...or back-to-front on the ASSIST Plus) distance when object is in landscape orientation (rows A, B, C lined up horizontally)
         # Non-SBS reservoirs (e.g. INTEGRA 10 ml Multichannel Reservoir in Slot A) are represented as always being in landscape orientation
-        return (
-            float(self._extract_xml_node_text("FootprintWidthMM")) / 100
-        )  # in the XML the distance is in 0.01 mm units, but our standard is mm
+        return self.geometry.width
+
+    @cached_property
+    def row_count(self) -> int:
+        return self.geometry.row_count
+
+    @cached_property
+    def column_count(self) -> int:
+        return self.geometry.column_count
+
+    @cached_property
+    def well_volume(self) -> float:
+        """The nominal volume of each well (µl)."""
+        return self.geometry.well_volume
 
     # the XML encodes the dimension in units of 0.01 mm, but our standard units are in mm. But sometimes these values are needed for XML matching/searching
     @cached_property
@@ -0,0 +1,130 @@
+from collections.abc import Sequence
+from typing import Protocol
+
+from .pipette import Pipette
+from .pipette import Tip
+from .plate import Labware
+from .program import Program
+from .steps import MultiDispense
+from .steps import PipettingLocation
+from .steps import TipChangeMode
+from .steps.base import ul_to_xml
+
+
+class NonUniformChannelVolumesError(ValueError):
+    def __init__(self, *, column_index: int, upper_left_row_index: int, num_channels: int):
+        super().__init__(
+            f"The volumes in column {column_index} from row {upper_left_row_index} differ between the {num_channels} channels of the pipette, so they cannot be dispensed at the same time"
+        )
+
+
+class VolumeAboveTipCapacityError(ValueError):
+    def __init__(self, *, volume: float, tip: Tip, pipette: Pipette):
+        super().__init__(
+            f"The volume {volume} µl (including any extra volumes) is more than {tip.name} on a {pipette.name} can hold"
+        )
+
+
+class PlateMapShapeError(ValueError):
+    def __init__(self, *, num_rows: int, num_channels: int):
+        super().__init__(
+            f"The volume matrix must be rectangular, with a number of rows ({num_rows}) that is a multiple of the number of pipette channels ({num_channels})"
+        )
+
+
+class SupportsToList(Protocol):
+    """An array that can be converted to nested lists (e.g. a NumPy array)."""
+
+    def tolist(self) -> list[list[float]]: ...
+
+
+type VolumeMatrix = Sequence[Sequence[float]] | SupportsToList
+"""The volume (µl) to dispense into each well, indexed by row and then column."""
+
+
+def create_plate_map_steps(  # noqa: PLR0913 # the extra volumes affect how the dispenses are grouped, so they're needed here rather than set on the steps afterwards
+    program: Program,
+    *,
+    source: PipettingLocation,
+    destination: Labware,
+    volumes: VolumeMatrix,
+    reverse_pipetting_volume: float = 0,
+    pre_dispense_volume: float = 0,
+    tip_change_mode: TipChangeMode = TipChangeMode.AFTER_STEP,
+    pipette_span: float | None = None,
+) -> list[MultiDispense]:
+    """Create the fewest MultiDispense steps that fill the destination labware with the volumes in the matrix.
+
+    The wells are grouped into blocks of adjacent rows as wide as the program's pipette has channels (so a whole column
+    at a time for an 8 channel pipette on a 96 well plate, or each well on its own for a D-ONE), which must all need the
+    same volume. Blocks that need no liquid are skipped. The blocks are dispensed in column order, with as many of them
+    served by each aspiration as the tip can hold (or the pipette, if it holds less than the tip).
+
+    Args:
+        program: The program the steps will be added to (used for the pipette, tip and deck layout).
+        source: Where to aspirate the liquid from.
+        destination: The labware to dispense into (must be in the program's deck layouts).
+        volumes: The volume (µl) for each well of the destination, indexed by row and then column (lists of lists, or a
+            NumPy array).
+        reverse_pipetting_volume: The extra volume aspirated prior to the volume to be dispensed by each step.
+        pre_dispense_volume: The extra volume dispensed back into the source prior to the main dispenses of each step.
+        tip_change_mode: How tips are changed for each step.
+        pipette_span: Override the default well-to-well spacing of the labware (e.g. when aspirating from a reservoir).
+    """
+    rows = volumes.tolist() if not isinstance(volumes, Sequence) else [list(row) for row in volumes]
+    num_channels = program.pipette.num_channels
+    num_columns = len(rows[0]) if rows else 0
+    if len(rows) % num_channels != 0 or any(len(row) != num_columns for row in rows):
+        raise PlateMapShapeError(num_rows=len(rows), num_channels=num_channels)
+    # compare volumes in the units Vialab uses, so differences too small to be represented don't split a block
+    xml_volumes = [[ul_to_xml(volume) for volume in row] for row in rows]
+    tip = program.tip if isinstance(program.tip, Tip) else program.tip.first_available_position
+    xml_tip_capacity = ul_to_xml(program.pipette.liquid_capacity(tip))
+    xml_extra_volume = ul_to_xml(reverse_pipetting_volume) + ul_to_xml(pre_dispense_volume)
+    destination_section_index = program.get_section_index_for_labware(destination)
+
+    groups: list[list[tuple[PipettingLocation, float]]] = []
+    xml_volume_in_tip = xml_tip_capacity  # so that the first block starts a new group
+    for column_index in range(num_columns):
+        for upper_left_row_index in range(0, len(rows), num_channels):
+            block_volumes = {
+                xml_volumes[row_index][column_index]
+                for row_index in range(upper_left_row_index, upper_left_row_index + num_channels)
+            }
+            if len(block_volumes) != 1:
+                raise NonUniformChannelVolumesError(
+                    column_index=column_index, upper_left_row_index=upper_left_row_index, num_channels=num_channels
+                )
+            xml_volume = block_volumes.pop()
+            if xml_volume == 0:
+                continue
+            if xml_volume + xml_extra_volume > xml_tip_capacity:
+                raise VolumeAboveTipCapacityError(
+                    volume=(xml_volume + xml_extra_volume) / 100, tip=tip, pipette=program.pipette
+                )
+            if xml_volume_in_tip + xml_volume > xml_tip_capacity:
+                groups.append([])
+                xml_volume_in_tip = xml_extra_volume
+            groups[-1].append(
+                (
+                    PipettingLocation(
+                        labware=destination,
+                        deck_section_index=destination_section_index,
+                        column_index=column_index,
+                        upper_left_row_index=upper_left_row_index,
+                    ),
+                    rows[upper_left_row_index][column_index],
+                )
+            )
+            xml_volume_in_tip += xml_volume
+    return [
+        MultiDispense(
+            source=source,
+            destinations=group,
+            reverse_pipetting_volume=reverse_pipetting_volume,
+            pre_dispense_volume=pre_dispense_volume,
+            tip_change_mode=tip_change_mode,
+            pipette_span=pipette_span,
+        )
+        for group in groups
+    ]
@@ -1,24 +1,131 @@
+import hashlib
+import importlib.metadata
+import io
+import itertools
 import json
-import re
-import uuid
+from collections.abc import Iterable
+from collections.abc import Iterator
 from copy import deepcopy
 from functools import cached_property
+from functools import lru_cache
 from pathlib import Path
 from typing import Any
+from typing import BinaryIO
 from typing import override
-from xml.dom import minidom
 
 from lxml import etree
+from lxml.etree import _Element
 from pydantic import BaseModel
 from pydantic import Field
+from pydantic import PrivateAttr
 
 from .deck import DeckLayout
+from .ids import IdKind
+from .ids import IdProvider
+from .ids import RandomIds
 from .integra_xml import NS_XSI
+from .integra_xml import LibraryComponent
+from .json_backend import json_dumps
+from .library_catalog import library_file_digest
 from .pipette import DOneTips
 from .pipette import Pipette
 from .pipette import Tip
+from .plate import FINGERPRINT_CONTEXT
 from .plate import Labware
+from .program_cache import ProgramCache
+from .run_time import RunTimeEstimate
+from .run_time import RunTimeEstimator
+from .run_time import RunTimeParameters
+from .simulation import VolumeSimulationResult
+from .simulation import VolumeSimulator
+from .step_order import StepOrderReport
+from .step_order import reorder_steps
+from .steps import SetVolume
 from .steps import Step
+from .tip_usage import TipUsage
+from .tip_usage import TipUsageCounter
+
+CONFIG_VERSION = 4
+DATA_VERSION = 9
+FINGERPRINT_VERSION = 1  # bump whenever a change to pyalab changes the XML generated from the same Program
+_STEP_ID_PLACEHOLDER = "{step-id}"
+
+type _SerializedStep = tuple[bytes, bytes]
+
+
+@lru_cache(maxsize=1)
+def _pyalab_version() -> str:
+    try:
+        return importlib.metadata.version("pyalab")
+    except importlib.metadata.PackageNotFoundError:  # running from a source checkout that isn't installed
+        return "unknown"  # so only FINGERPRINT_VERSION tells versions apart
+
+
+"""The serialized XML of a step, split where its ID goes."""
+NSMAP = {"xsd": "http://www.w3.org/2001/XMLSchema", "xsi": NS_XSI}
+# lxml uses single quotes in the declaration it writes, but Vialab uses double quotes
+XML_DECLARATION = b'<?xml version="1.0" encoding="utf-8"?>\n'
+INDENT = b"  "
+
+
+class _ProgramXmlWriter:
+    """Writes pretty-printed program XML to a binary stream one top-level element at a time.
+
+    Each element is serialized while temporarily attached to a holder element carrying the same namespace map as the
+    root, so lxml leaves out the namespace declarations that the root already provides...the output is byte-identical to
+    indenting and serializing the whole document at once.
+    """
+
+    _holder_start_tag_length = len(etree.tostring(etree.Element("Holder", nsmap=NSMAP)).removesuffix(b"/>")) + 1
+    _holder_end_tag_length = len(b"</Holder>")
+
+    def __init__(self, stream: BinaryIO):
+        super().__init__()
+        self._stream = stream
+        self._root_tag = b""
+
+    @classmethod
+    def serialize(cls, element: _Element, *, level: int = 1) -> bytes:
+        """Serialize an element, indented to its level in the document (and preceded by its own line break)."""
+        # Elements with empty text are written as self-closing tags (e.g. <MigrationHistory/>), matching the files Vialab produces
+        for sub_element in element.iter():
+            if sub_element.text == "":
+                sub_element.text = None
+        etree.indent(element, space=INDENT.decode(), level=level)
+        element.tail = None
+        holder = etree.Element("Holder", nsmap=NSMAP)
+        holder.append(element)
+        serialized = etree.tostring(holder, encoding="utf-8")
+        return b"\n" + INDENT * level + serialized[cls._holder_start_tag_length : -cls._holder_end_tag_length]
+
+    def start(self, root: _Element) -> None:
+        root.text = ""  # so that lxml writes separate start and end tags
+        serialized = etree.tostring(root, encoding="utf-8")
+        self._root_tag = root.tag.encode()
+        _ = self._stream.write(XML_DECLARATION)
+        _ = self._stream.write(serialized.removesuffix(b"</" + self._root_tag + b">"))
+
+    def write_element(self, element: _Element, *, level: int = 1) -> None:
+        self.write_serialized(self.serialize(element, level=level))
+
+    def write_serialized(self, serialized: bytes) -> None:
+        """Write elements that were already serialized (see `serialize`)."""
+        _ = self._stream.write(serialized)
+
+    def write_steps(self, steps: Iterable[bytes]) -> None:
+        """Write the serialized steps (see `serialize`) within the <Steps> element."""
+        steps_iterator = iter(steps)
+        first_step = next(steps_iterator, None)
+        if first_step is None:
+            self.write_element(etree.Element("Steps"))
+            return
+        _ = self._stream.write(b"\n" + INDENT + b"<Steps>")
+        for step in itertools.chain((first_step,), steps_iterator):
+            self.write_serialized(step)
+        _ = self._stream.write(b"\n" + INDENT + b"</Steps>")
+
+    def end(self) -> None:
+        _ = self._stream.write(b"\n</" + self._root_tag + b">\n")
 
 
 class InvalidTipInputFormatError(Exception):
@@ -33,6 +140,13 @@ class LabwareNotInDeckLayoutError(Exception):
         super().__init__(f"Could not find {labware.name} (called {labware.display_name}) in the deck layout")
 
 
+class LabwarePlacement(BaseModel, frozen=True):
+    layout_index: int
+    """The index of the deck layout (within the Program) holding the labware."""
+    section_index: int
+    """The index of the section of the Deck holding the labware."""
+
+
 class Program(BaseModel):
     deck_layouts: list[DeckLayout] = Field(min_length=1)  # TODO: validate that all layouts use the same base Deck
     display_name: str  # TODO: validate length and character classes
@@ -40,6 +154,14 @@ class Program(BaseModel):
     pipette: Pipette
     tip: Tip | DOneTips
     steps: list[Step] = Field(default_factory=list)  # type: ignore[reportUnknownVariableType] # bug in pyright 1.1.400ish is causing default_factory=list to no longer work
+    id_provider: IdProvider = Field(default_factory=RandomIds)
+    """Provides the IDs and timestamp written into the program XML (e.g. `SeededIds` for reproducible files)."""
+    _labware_placements: dict[int, tuple[Labware, LabwarePlacement]] = PrivateAttr(default_factory=dict)  # type: ignore[reportUnknownVariableType] # bug in pyright 1.1.400ish is causing default_factory=dict to no longer work
+    _labware_placements_signature: tuple[int, ...] = PrivateAttr(default=())
+    _labware_placements_deck_layouts: list[DeckLayout] = PrivateAttr(default_factory=list)  # type: ignore[reportUnknownVariableType] # bug in pyright 1.1.400ish is causing default_factory=list to no longer work
+    _steps_resolved_signature: tuple[int, ...] | None = PrivateAttr(default=None)
+    _header_xml_cache: tuple[tuple[Any, ...], bytes] | None = PrivateAttr(default=None)
+    _step_xml_cache: dict[int, tuple[Step, tuple[object, ...], _SerializedStep]] = PrivateAttr(default_factory=dict)  # type: ignore[reportUnknownVariableType] # bug in pyright 1.1.400ish is causing default_factory=dict to no longer work
 
     @override
     def model_post_init(self, _: Any) -> None:
@@ -48,6 +170,17 @@ class Program(BaseModel):
         if not self.is_d_one and isinstance(self.tip, DOneTips):
             raise InvalidTipInputFormatError(pipette_is_d_one=False)
 
+    @override
+    def __getstate__(self) -> dict[Any, Any]:
+        # the cached XML is rebuilt on demand, so don't copy it when pickling (e.g. to the workers of `generate_many`)
+        state = super().__getstate__()
+        state["__pydantic_private__"] = {
+            **state["__pydantic_private__"],
+            "_header_xml_cache": None,
+            "_step_xml_cache": {},
+        }
+        return state
+
     @property
     def the_labware(self) -> Labware:
         # useful for unit testing simple programs that only have a single labware
@@ -63,7 +196,145 @@ class Program(BaseModel):
         return self.pipette.is_d_one
 
     def add_step(self, step: Step) -> None:
+        self._prepare_step(step)
+        self.steps.append(step)
+
+    def _get_labware_placements(self) -> dict[int, tuple[Labware, LabwarePlacement]]:
+        # The map is keyed by the identity of the labware objects, and it holds a reference to each of them (and to the layouts) so an ID can't be reused while the map is alive. Checking this signature is cheap, and catches both reassigning `deck_layouts` and mutating the layouts in place
+        signature = tuple(
+            object_id
+            for deck_layout in self.deck_layouts
+            for object_id in (id(deck_layout), *(id(labware) for labware in deck_layout.labware.values()))
+        )
+        if signature != self._labware_placements_signature:
+            placements: dict[int, tuple[Labware, LabwarePlacement]] = {}
+            for layout_index, deck_layout in enumerate(self.deck_layouts):
+                for deck_position, labware in deck_layout.labware.items():
+                    if id(labware) in placements:
+                        continue  # the first layout holding the labware takes precedence
+                    placements[id(labware)] = (
+                        labware,
+                        LabwarePlacement(
+                            layout_index=layout_index,
+                            section_index=deck_position.section_index(deck=deck_layout.deck, labware=labware),
+                        ),
+                    )
+            self._labware_placements = placements
+            self._labware_placements_signature = signature
+            self._labware_placements_deck_layouts = list(self.deck_layouts)
+        return self._labware_placements
+
+    def get_labware_placement(self, labware: Labware) -> LabwarePlacement:
+        placements = self._get_labware_placements()
+        placement = placements.get(id(labware))
+        if placement is not None:
+            return placement[1]
+        for iter_labware, iter_placement in placements.values():
+            if iter_labware == labware:  # e.g. a copy of the labware object
+                return iter_placement
+
+        raise LabwareNotInDeckLayoutError(labware)
+
+    def get_section_index_for_labware(self, labware: Labware) -> int:
+        return self.get_labware_placement(labware).section_index
+
+    def _refresh_step_section_indexes(self) -> None:
+        """Update the section indexes filled in when the steps were added, if the deck layouts have changed since.
+
+        Section indexes that were provided with a step are left as they are.
+        """
+        _ = self._get_labware_placements()
+        if self._steps_resolved_signature != self._labware_placements_signature:
+            for step in self.steps:
+                step.resolve_section_indexes(self.get_section_index_for_labware)
+            self._steps_resolved_signature = self._labware_placements_signature
+
+    @property
+    def library_components(self) -> list[LibraryComponent]:
+        """The pipette, tips, decks and labware that the program XML is built from."""
+        tips = (
+            [self.tip]
+            if isinstance(self.tip, Tip)
+            else [tip for tip in (self.tip.position_1, self.tip.position_2) if tip is not None]
+        )
+        components: list[LibraryComponent] = [self.pipette, *tips]
+        for deck_layout in self.deck_layouts:
+            components.append(deck_layout.deck)
+            components.extend(deck_layout.labware.values())
+        return components
+
+    def collapse_set_volume_steps(self) -> int:
+        """Merge each run of consecutive SetVolume (or SetInitialVolume) steps into a single step.
+
+        A run ends when the type of step changes, or when a well would otherwise have its volume set twice in the same
+        step, so the volumes defined by the program are unchanged. The original step objects are not modified.
+
+        Returns:
+            The number of steps removed.
+        """
+        self._refresh_step_section_indexes()
+        collapsed_steps: list[Step] = []
+        wells_in_run: set[tuple[int | None, int, int]] = set()
+        for step in self.steps:
+            if not isinstance(step, SetVolume):
+                collapsed_steps.append(step)
+                wells_in_run = set()
+                continue
+            set_volume_steps = [step.model_copy(update={"merged_steps": []}), *step.merged_steps]
+            wells = {
+                (s.section_index, s.column_index, 0 if s.row_index is None else s.row_index)  # written as row 0
+                for s in set_volume_steps
+            }
+            previous_step = collapsed_steps[-1] if collapsed_steps else None
+            if (
+                isinstance(previous_step, SetVolume)
+                and type(previous_step) is type(step)
+                and wells_in_run.isdisjoint(wells)
+            ):
+                collapsed_steps[-1] = previous_step.model_copy(
+                    update={"merged_steps": [*previous_step.merged_steps, *set_volume_steps]}
+                )
+                wells_in_run |= wells
+            else:
+                collapsed_steps.append(step)
+                wells_in_run = wells
+        number_removed = len(self.steps) - len(collapsed_steps)
+        self.steps = collapsed_steps
+        return number_removed
+
+    def calculate_tip_usage(self) -> TipUsage:
+        """Count the tips (and tip boxes) of each type that running the program will use."""
+        tip_usage_counter = TipUsageCounter(pipette=self.pipette)
+        tip_usage_counter.add_steps(self.steps)
+        return tip_usage_counter.usage
+
+    def optimize_step_order(self, parameters: RunTimeParameters | None = None) -> StepOrderReport:
+        """Reorder independent liquid transfer steps to save tips and head travel (see `reorder_steps`).
+
+        Returns:
+            The new order of the steps, and the expected savings in tips and run time.
+        """
+        self._refresh_step_section_indexes()
+        self.steps, report = reorder_steps(self.steps, pipette=self.pipette, parameters=parameters)
+        return report
+
+    def estimate_run_time(self, parameters: RunTimeParameters | None = None) -> RunTimeEstimate:
+        """Estimate how long each step of the program (and the whole program) takes to run."""
+        self._refresh_step_section_indexes()
+        estimator = RunTimeEstimator(pipette=self.pipette, parameters=parameters)
+        estimator.add_steps(self.steps)
+        return estimator.estimate
+
+    def simulate_volumes(self) -> VolumeSimulationResult:
+        """Replay the steps against the volume in each well, to catch underdraws and overflows before running it."""
+        self._refresh_step_section_indexes()
+        simulator = VolumeSimulator(pipette=self.pipette)
+        simulator.add_steps(self.steps)
+        return simulator.result
+
+    def _prepare_step(self, step: Step) -> None:
         step.set_pipette(self.pipette)
+        step.resolve_section_indexes(self.get_section_index_for_labware)
         if isinstance(self.tip, DOneTips):
             if self.tip.second_available_position is not None:
                 raise NotImplementedError("Adding steps with two different D-One tip types is not implemented yet")
@@ -71,67 +342,70 @@ class Program(BaseModel):
         else:
             step.set_tip(self.tip)
 
-        self.steps.append(step)
-
-    def get_section_index_for_labware(self, labware: Labware) -> int:
-        # TODO: support multiple deck layouts
-        first_deck_layout = self.deck_layouts[0]
-        for deck_position, iter_plate in first_deck_layout.labware.items():
-            if iter_plate == labware:
-                return deck_position.section_index(deck=first_deck_layout.deck, labware=labware)
-
-        raise LabwareNotInDeckLayoutError(labware)
+    @property
+    def _root_tip(self) -> Tip:
+        # When both positions are set when using D-ONE, it doesn't seem to matter which one is used as the first `Tip` section in the XML
+        return self.tip if isinstance(self.tip, Tip) else self.tip.first_available_position
 
-    def generate_xml(self) -> str:
-        config_version = 4
-        data_version = 9
-        root = etree.Element(
+    def _create_root_element(self, *, content: Iterable[bytes]) -> _Element:
+        return etree.Element(
             "AssistConfig",
-            nsmap={"xsd": "http://www.w3.org/2001/XMLSchema", "xsi": NS_XSI},
-            UniqueIdentifier=str(uuid.uuid4()),
-            Version=str(config_version),
+            nsmap=NSMAP,
+            UniqueIdentifier=str(self.id_provider.create_id(IdKind.PROGRAM, index=0, content=content)),
+            Version=str(CONFIG_VERSION),
         )
 
+    def _create_migration_identifier_element(self, *, content: Iterable[bytes]) -> _Element:
+        element = etree.Element("MigrationIdentifier")
+        element.text = str(self.id_provider.create_id(IdKind.MIGRATION, index=0, content=content))
+        return element
+
+    def _create_header_elements(self) -> list[_Element]:
+        elements: list[_Element] = []
         for element_name, text_value in [
-            ("MigrationIdentifier", str(uuid.uuid4())),
-            ("CreatedWith", f"PyaLab for VIALAB v3.4.0.0, config v{config_version}, data v{data_version}"),
+            ("CreatedWith", f"PyaLab for VIALAB v3.4.0.0, config v{CONFIG_VERSION}, data v{DATA_VERSION}"),
             ("CreatedBy", "UnknownUser"),
             ("MigrationHistory", ""),
-            ("DataVersion", str(data_version)),
+            ("DataVersion", str(DATA_VERSION)),
             ("DisplayNameOnPipette", self.display_name),
             ("Description", self.description),
         ]:
-            etree.SubElement(root, element_name).text = text_value
+            element = etree.Element(element_name)
+            element.text = text_value
+            elements.append(element)
+        return elements
 
-        root.append(self.pipette.create_xml_for_program())
-        tip_to_append_to_root: Tip
-        # When both positions are set when using D-ONE, it doesn't seem to matter which one is used as the first `Tip` section in the XML
-        tip_to_append_to_root = self.tip if isinstance(self.tip, Tip) else self.tip.first_available_position
-        tip_to_append_to_root_xml = tip_to_append_to_root.create_xml_for_program()
+    def _create_hardware_elements(self) -> list[_Element]:
+        elements = [self.pipette.create_xml_for_program()]
+        tip_to_append_to_root_xml = self._root_tip.create_xml_for_program()
         if self.is_d_one:
             assert isinstance(self.tip, DOneTips)
             if self.tip.position_2 is None:
                 # This seems related to telling Vialab that the tip box should be in the "1" (left) position of the D-ONE tip adapter...Vialab seems to treat the "2" (right) position the same as a normal tip box
                 _ = etree.SubElement(tip_to_append_to_root_xml, "TipSpecial", attrib={f"{{{NS_XSI}}}nil": "true"})
-        root.append(deepcopy(tip_to_append_to_root_xml))
-        tips_node = etree.SubElement(root, "Tips")
-        tips_node.append(deepcopy(tip_to_append_to_root_xml))
+        elements.append(tip_to_append_to_root_xml)
+        tips_node = etree.Element("Tips")
+        tips_node.append(
+            deepcopy(tip_to_append_to_root_xml)
+        )  # the fragment is already a copy, so only one more is needed
         if self.is_d_one:
             assert isinstance(self.tip, DOneTips)
             if self.tip.second_available_position is not None:
                 tips_node.append(self.tip.second_available_position.create_xml_for_program())
+        elements.append(tips_node)
+        return elements
 
-        # TODO: handle multiple deck layouts
-        first_deck_layout = self.deck_layouts[0]
-        root.append(first_deck_layout.create_xml_for_program(layout_num=1))
-        decks_node = etree.SubElement(root, "AllDecks")
-        decks_node.append(first_deck_layout.create_xml_for_program(layout_num=1))
-
-        steps_node = etree.SubElement(root, "Steps")
-        for step in self.steps:
-            steps_node.append(step.create_xml_for_program())
+    def _create_deck_layout_elements(self) -> list[_Element]:
+        # Each layout is built once, and the first one is cloned to also be the Deck at the root of the program
+        decks_node = etree.Element("AllDecks")
+        decks_node.extend(
+            deck_layout.create_xml_for_program(layout_num=layout_num)
+            for layout_num, deck_layout in enumerate(self.deck_layouts, start=1)
+        )
+        return [deepcopy(decks_node[0]), decks_node]
 
-        global_parameters_node = etree.SubElement(root, "GlobalParameters", attrib={"Key": "Global"})
+    def _create_footer_elements(self, *, tip_usage: TipUsage) -> list[_Element]:
+        global_parameters_node = etree.Element("GlobalParameters", attrib={"Key": "Global"})
         global_parameters_value_node = etree.SubElement(global_parameters_node, "Values")
         for key, value in [
             ("ClearanceHeight", 800),
@@ -142,12 +416,8 @@ class Program(BaseModel):
             ("BeforeTipEjectMonitoring", "true"),
             (
                 "TipTypeRequiredTips",
-                json.dumps(
-                    {
-                        str(
-                            tip_to_append_to_root.tip_id
-                        ): 0  # there seems to be no negative impact of not calculating the required tips, Vialab will do it automatically when the program is first loaded
-                    }
+                json_dumps(
+                    {str(tip_id): num_tips for tip_id, num_tips in {self._root_tip.tip_id: 0, **tip_usage.tips}.items()}
                 ),
             ),
             ("WasteAsTargetOption", "false"),
@@ -161,22 +431,168 @@ class Program(BaseModel):
                 etree.CDATA(str(value)) if '"' in str(value) else str(value)
             )
 
-        _ = etree.SubElement(root, "ChangedDate").text = (
-            "2024-12-17T16:27:27.0715524-05:00"  # TODO: make this real time
+        changed_date_node = etree.Element("ChangedDate")
+        changed_date_node.text = self.id_provider.format_changed_date()
+        last_change_user_node = etree.Element("LastChangeUser")
+        last_change_user_node.text = "UnknownUser"
+        return [global_parameters_node, changed_date_node, last_change_user_node]
+
+    def _serialize_header_and_hardware(self) -> bytes:
+        key = (self.display_name, self.description, self.pipette, self.tip)
+        if self._header_xml_cache is None or self._header_xml_cache[0] != key:
+            serialized = b"".join(
+                _ProgramXmlWriter.serialize(element)
+                for element in (*self._create_header_elements(), *self._create_hardware_elements())
+            )
+            self._header_xml_cache = (key, serialized)
+        return self._header_xml_cache[1]
+
+    @staticmethod
+    def _serialize_step(step: Step) -> _SerializedStep:
+        serialized = _ProgramXmlWriter.serialize(step.create_xml_for_program(step_id=_STEP_ID_PLACEHOLDER), level=2)
+        before_id, _, after_id = serialized.partition(_STEP_ID_PLACEHOLDER.encode())
+        return before_id, after_id
+
+    def _serialize_steps(self) -> Iterator[tuple[Step, _SerializedStep]]:
+        """Serialize the steps of the program, reusing the XML of any step that hasn't changed since last time."""
+        step_xml_cache: dict[int, tuple[Step, tuple[object, ...], _SerializedStep]] = {}
+        for step in self.steps:
+            # the cache holds a reference to each step, so the ID of a step can't be reused while its entry is alive
+            cached = self._step_xml_cache.get(id(step))
+            if cached is None or cached[0] is not step or cached[1] != step.revision:
+                cached = (step, step.revision, self._serialize_step(step))
+            step_xml_cache[id(step)] = cached
+            yield step, cached[2]
+        self._step_xml_cache = step_xml_cache  # only the steps still in the program are kept
+
+    def clear_xml_cache(self) -> None:
+        """Discard the cached XML of the header, hardware and steps, so all of it is rebuilt the next time it's written.
+
+        Changes to the fields of the Program and its steps (including modifying their lists in place) are detected
+        automatically, so this is only needed to free the memory the cached XML takes up.
+        """
+        self._header_xml_cache = None
+        self._step_xml_cache = {}
+
+    @property
+    def fingerprint(self) -> str:
+        """A hash of everything the program XML is generated from.
+
+        This covers the hardware, deck layouts, steps, the `id_provider` and the contents of every library file used,
+        but not `Labware.id` (which is never written into the XML).
+        """
+        model = self.model_dump(mode="json", serialize_as_any=True, context=FINGERPRINT_CONTEXT)
+        library_files = sorted(
+            {
+                (
+                    component.type.value,
+                    component.name,
+                    str(component.xml_file_version),
+                    file.name,
+                    library_file_digest(file),
+                )
+                for component in self.library_components
+                for file in (component.find_xml_file(),)
+            }
         )
-        _ = etree.SubElement(root, "LastChangeUser").text = "UnknownUser"
+        fingerprinted = [
+            FINGERPRINT_VERSION,
+            _pyalab_version(),
+            type(self.id_provider).__name__,
+            [step.type for step in self.steps],
+            model,
+            library_files,
+        ]
+        return hashlib.sha256(json.dumps(fingerprinted, sort_keys=True).encode()).hexdigest()
+
+    def write_program(
+        self, stream: BinaryIO, *, steps: Iterable[Step] | None = None, cache: ProgramCache | None = None
+    ) -> bool:
+        """Write the program XML to a binary stream, one top-level element (or step) at a time.
+
+        The serialized XML of the header, hardware and each step is cached on the Program, so writing it again only
+        rebuilds what has changed since (see `clear_xml_cache`). The IDs of the program and its steps are filled in by
+        the `id_provider` on every write.
+
+        Any `steps` passed in are written after the steps already in the Program. They are prepared the same way as in
+        `add_step`, but never stored (or cached), so a generator of steps can be streamed without the whole protocol
+        being held in memory.
 
-        xml_string = etree.tostring(root, xml_declaration=True, encoding="utf-8")
-        xml_str = minidom.parseString(xml_string).toprettyxml(indent="  ")  # noqa: S318 # it is safe to parse this string because it is generated by the program
-        xml_str_cleaned = re.sub(r"\n\s*\n", "\n", xml_str)
-        return xml_str_cleaned.replace(
-            '<?xml version="1.0" ?>', '<?xml version="1.0" encoding="utf-8"?>'
-        )  # TODO: figure out why the encoding argument to `tostring` isn't working as expected
+        If a `cache` is passed in, a program with the same `fingerprint` that was written before is copied from it
+        instead of being generated (and a new one is stored in it). The cache is only used when the `id_provider` is
+        deterministic and there are no extra `steps`.
+
+        Returns:
+            Whether the XML was copied from the cache.
+        """
+        if cache is None or steps is not None or not self.id_provider.is_deterministic:
+            self._write_program(stream, steps=steps)
+            return False
+        fingerprint = self.fingerprint
+        cached = cache.get(fingerprint)
+        if cached is not None:
+            _ = stream.write(cached)
+            return True
+        buffer = io.BytesIO()
+        self._write_program(buffer)
+        cache.put(fingerprint, buffer.getvalue())
+        _ = stream.write(buffer.getvalue())
+        return False
+
+    def _write_program(self, stream: BinaryIO, *, steps: Iterable[Step] | None = None) -> None:
+        self._refresh_step_section_indexes()
+        header_and_hardware = self._serialize_header_and_hardware()
+        deck_layouts = b"".join(_ProgramXmlWriter.serialize(element) for element in self._create_deck_layout_elements())
+        stored_steps: Iterable[tuple[Step, _SerializedStep]] = self._serialize_steps()
+        content: tuple[bytes, ...] = ()
+        if self.id_provider.needs_content:  # otherwise each step is serialized just before it's written
+            stored_steps = list(stored_steps)
+            content = (
+                header_and_hardware,
+                deck_layouts,
+                *itertools.chain.from_iterable(serialized for _, serialized in stored_steps),
+            )
+
+        writer = _ProgramXmlWriter(stream)
+        writer.start(self._create_root_element(content=content))
+        writer.write_element(self._create_migration_identifier_element(content=content))
+        writer.write_serialized(header_and_hardware)
+        writer.write_serialized(deck_layouts)
+
+        def prepared(extra_steps: Iterable[Step]) -> Iterator[tuple[Step, _SerializedStep]]:
+            for step in extra_steps:
+                self._prepare_step(step)
+                yield step, self._serialize_step(step)
+
+        def identified(serialized_steps: Iterable[tuple[Step, _SerializedStep]]) -> Iterator[bytes]:
+            for index, (step, (before_id, after_id)) in enumerate(serialized_steps):
+                _ = tip_usage_counter.add_step(step)
+                step_id = self.id_provider.create_id(IdKind.STEP, index=index, content=(before_id, after_id))
+                yield before_id + str(step_id).encode() + after_id
+
+        tip_usage_counter = TipUsageCounter(pipette=self.pipette)
+        all_steps = itertools.chain(stored_steps, () if steps is None else prepared(steps))
+        writer.write_steps(identified(all_steps))
+        for element in self._create_footer_elements(tip_usage=tip_usage_counter.usage):
+            writer.write_element(element)
+        writer.end()
+
+    def generate_xml(self, *, cache: ProgramCache | None = None) -> str:
+        stream = io.BytesIO()
+        _ = self.write_program(stream, cache=cache)
+        return stream.getvalue().decode("utf-8")
 
     def dump_xml(self, file_path: Path) -> None:
         # TODO: deprecate this
-        xml_str = self.generate_xml()
-        _ = file_path.write_text(xml_str)
+        _ = self.save_program(file_path)
+
+    def save_program(
+        self, file_path: Path, *, steps: Iterable[Step] | None = None, cache: ProgramCache | None = None
+    ) -> bool:
+        """Write the program XML to a file (see `write_program`).
 
-    def save_program(self, file_path: Path) -> None:
-        self.dump_xml(file_path)
+        Returns:
+            Whether the XML was copied from the cache.
+        """
+        with file_path.open("wb") as file:
+            return self.write_program(file, steps=steps, cache=cache)
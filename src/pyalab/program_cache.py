@@ -0,0 +1,107 @@
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any
+from typing import override
+
+from pydantic import BaseModel
+
+DEFAULT_MAX_BYTES = 1024**3
+_ENTRY_SUFFIX = ".iaa"
+
+
+class ProgramCacheInfo(BaseModel, frozen=True):
+    hits: int
+    misses: int
+    evictions: int
+    max_bytes: int
+
+
+class ProgramCache:
+    """On-disk cache of generated program XML, keyed by `Program.fingerprint`.
+
+    The fingerprint covers the contents of the library files a program uses, so updating the vendor library never
+    serves a stale program...the entries it replaces are just no longer looked up, and age out. Once the entries take up
+    more than `max_bytes`, the least recently used ones are evicted. Entries are written to a temporary file and then
+    moved into place, so the same directory can be shared by many processes (e.g. the workers of `generate_many`).
+    """
+
+    def __init__(self, directory: Path, *, max_bytes: int = DEFAULT_MAX_BYTES):
+        super().__init__()
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @override
+    def __getstate__(self) -> dict[str, Any]:
+        # the lock can't be pickled, and each process keeps its own counts
+        return {"directory": self.directory, "max_bytes": self.max_bytes}
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__init__(state["directory"], max_bytes=state["max_bytes"])
+
+    def _entry_path(self, fingerprint: str) -> Path:
+        return self.directory / f"{fingerprint}{_ENTRY_SUFFIX}"
+
+    def get(self, fingerprint: str) -> bytes | None:
+        """Get the XML of the program with this fingerprint, or None if it isn't in the cache."""
+        entry_path = self._entry_path(fingerprint)
+        try:
+            data = entry_path.read_bytes()
+            now = time.time_ns()
+            os.utime(entry_path, ns=(now, now))  # mark the entry as recently used
+        except FileNotFoundError:
+            with self._lock:
+                self._misses += 1
+            return None
+        with self._lock:
+            self._hits += 1
+        return data
+
+    def put(self, fingerprint: str, data: bytes) -> None:
+        """Store the XML of the program with this fingerprint, then evict entries until the cache fits in `max_bytes`."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=self.directory, suffix=".tmp", delete=False) as file:
+            _ = file.write(data)
+        entry_path = self._entry_path(fingerprint)
+        _ = Path(file.name).replace(entry_path)
+        now = time.time_ns()
+        os.utime(entry_path, ns=(now, now))
+        self._evict()
+
+    def _evict(self) -> None:
+        entries: list[tuple[int, int, Path]] = []
+        for entry_path in self.directory.glob(f"*{_ENTRY_SUFFIX}"):
+            try:
+                stat = entry_path.stat()
+            except FileNotFoundError:  # evicted by another process in the meantime
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, entry_path))
+        total_bytes = sum(size for _, size, _ in entries)
+        for _, size, entry_path in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            entry_path.unlink(missing_ok=True)
+            total_bytes -= size
+            with self._lock:
+                self._evictions += 1
+
+    def info(self) -> ProgramCacheInfo:
+        with self._lock:
+            return ProgramCacheInfo(
+                hits=self._hits, misses=self._misses, evictions=self._evictions, max_bytes=self.max_bytes
+            )
+
+    def clear(self) -> None:
+        """Remove every entry from the cache, and reset the counts."""
+        for entry_path in self.directory.glob(f"*{_ENTRY_SUFFIX}"):
+            entry_path.unlink(missing_ok=True)
+        with self._lock:
+            self._hits = 0
+            self._misses = 0
+            self._evictions = 0
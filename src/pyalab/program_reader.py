@@ -0,0 +1,357 @@
+import json
+from pathlib import Path
+from typing import Any
+from typing import BinaryIO
+
+from lxml import etree
+from lxml.etree import _Element
+
+from .deck import Deck
+from .deck import DeckLayout
+from .deck import DeckPosition
+from .deck import LabwareOrientation
+from .integra_xml import LIBRARY_INDEX
+from .integra_xml import NS_XSI
+from .integra_xml import LibraryComponentIdentity
+from .integra_xml import LibraryComponentType
+from .pipette import DOneTips
+from .pipette import Pipette
+from .pipette import Tip
+from .plate import Labware
+from .plate import Plate
+from .plate import Reservoir
+from .plate import Tubeholder
+from .program import Program
+from .steps import AspirateParameters
+from .steps import DispenseParameters
+from .steps import MultiDispense
+from .steps import PipettingLocation
+from .steps import SetInitialVolume
+from .steps import SetVolume
+from .steps import Step
+from .steps import TipChangeMode
+from .steps import Transfer
+from .steps import TransferWellPair
+from .steps.base import mm_to_xml
+
+LABWARE_CLASSES: dict[str, type[Labware]] = {
+    labware_class.type.value: labware_class for labware_class in (Plate, Reservoir, Tubeholder)
+}
+ROOT_TAG = "AssistConfig"
+LABWARE_NAME_SUFFIX = "!1"
+DEFAULT_LAYOUT_NAME = "Labware Layout {layout_num}"
+READ_VALUE_GROUPS = frozenset(("ManualVolume", "Source", "Target", "Pipetting", "Aspiration", "Dispense", "Tips"))
+"""The value groups of a step that hold anything the step models can represent (the rest are skipped)."""
+
+type _ValueGroups = dict[str, dict[str, str]]
+
+
+class UnsupportedProgramContentError(Exception):
+    def __init__(self, description: str):
+        super().__init__(f"The program contains {description}, which pyalab can't represent yet")
+
+
+class UnsupportedStepTypeError(UnsupportedProgramContentError):
+    def __init__(self, step_type: str):
+        super().__init__(f"a step of type {step_type!r}")
+
+
+class UnsupportedLabwareTypeError(UnsupportedProgramContentError):
+    def __init__(self, labware_type: str):
+        super().__init__(f"labware of type {labware_type!r}")
+
+
+class SharedDeckPositionError(UnsupportedProgramContentError):
+    def __init__(self, deck_position: DeckPosition):
+        super().__init__(
+            f"more than one labware in deck position {deck_position.name} with orientation {deck_position.orientation.value}"
+        )
+
+
+class MultiSectionTransferError(UnsupportedProgramContentError):
+    def __init__(self):
+        super().__init__("a Transfer step between more than one pair of deck sections")
+
+
+class MissingProgramElementError(Exception):
+    def __init__(self, element_name: str):
+        super().__init__(f"Could not find the <{element_name}> element in the program")
+
+
+class NoLabwareInDeckSectionError(Exception):
+    def __init__(self, section_index: int):
+        super().__init__(f"A step uses deck section {section_index}, but no labware is placed in that section")
+
+
+def _identify(component_type: LibraryComponentType, element: _Element) -> tuple[str, str | None]:
+    return LIBRARY_INDEX.identify(LibraryComponentIdentity.from_xml(component_type=component_type, element=element))
+
+
+def _parse_value_groups(step_element: _Element) -> _ValueGroups:
+    return {
+        key: {value.get("Key", ""): value.text or "" for value in group.iter("Value")}
+        for group in step_element.iter("ValueGroup")
+        if (key := group.get("Key", "")) in READ_VALUE_GROUPS
+    }
+
+
+def _pipette_span(*, spacing: int, labware: Labware) -> float | None:
+    """Get the explicit pipette span of a step, or None if it uses the default spacing of the labware."""
+    return None if spacing == mm_to_xml(labware.row_spacing_in_xml) else spacing / 100
+
+
+def _liquid_movement(value_groups: _ValueGroups) -> dict[str, Any]:
+    """Read the aspirate and dispense parameters and tip change mode shared by the liquid transfer steps."""
+    pipetting = value_groups["Pipetting"]
+    pipetting_configuration = json.loads(pipetting["TipTypePipettingConfiguration"])[0]
+    aspiration_heights = json.loads(value_groups["Aspiration"]["Heights"])
+    dispense_heights = json.loads(value_groups["Dispense"]["Heights"])
+    return {
+        "aspirate_parameters": AspirateParameters(
+            start_height=aspiration_heights[0]["StartHeight"] / 100,
+            liquid_speed=pipetting_configuration["AspirationSpeed"],
+            post_delay=int(pipetting["AspirationDelay"]),
+        ),
+        "dispense_parameters": DispenseParameters(
+            start_height=dispense_heights[0]["StartHeight"] / 100,
+            liquid_speed=pipetting_configuration["DispenseSpeed"],
+            post_delay=int(pipetting["DispenseDelay"]),
+        ),
+        "tip_change_mode": TipChangeMode(json.loads(value_groups["Tips"]["TipChange"])),
+    }
+
+
+class _ProgramXmlReader:
+    """Rebuilds a Program from the elements of the program XML as each one finishes parsing."""
+
+    def __init__(self):
+        super().__init__()
+        self._display_name = ""
+        self._description = ""
+        self._pipette: Pipette | None = None
+        self._tips: list[tuple[Tip, bool]] = []  # and whether the tip box is in the "1" position of the D-ONE adapter
+        self._deck_layouts: list[DeckLayout] = []
+        self._labware_by_section: dict[int, Labware] = {}
+        self._steps: list[Step] = []
+
+    def read_header(self, element: _Element) -> None:
+        text = element.text or ""
+        if element.tag == "DisplayNameOnPipette":
+            self._display_name = text
+        else:
+            self._description = text
+
+    def read_pipette(self, element: _Element) -> None:
+        name, version = _identify(LibraryComponentType.PIPETTE, element)
+        self._pipette = Pipette(name=name, xml_file_version=version)
+
+    def read_tips(self, element: _Element) -> None:
+        for tip_element in element.iterfind("Tip"):
+            name, version = _identify(LibraryComponentType.TIP, tip_element)
+            is_position_1 = any(child.get(f"{{{NS_XSI}}}nil") == "true" for child in tip_element.iterfind("TipSpecial"))
+            self._tips.append((Tip(name=name, xml_file_version=version), is_position_1))
+
+    def read_deck_layout(self, element: _Element) -> None:
+        name, version = _identify(LibraryComponentType.DECK, element)
+        labware: dict[DeckPosition, Labware] = {}
+        for section_index, section in enumerate(element.iterfind("./Sections/Section")):
+            content = section.find("Content")
+            if content is None or section.findtext("IsWaste") == "true":
+                continue  # the waste block is part of the deck itself
+            content_type = content.get(f"{{{NS_XSI}}}type", "")
+            labware_class = LABWARE_CLASSES.get(content_type)
+            if labware_class is None:
+                raise UnsupportedLabwareTypeError(content_type)
+            labware_name, labware_version = _identify(labware_class.type, content)
+            deck_position = DeckPosition.model_validate(
+                {
+                    "name": section.findtext("Name"),
+                    "orientation": LabwareOrientation(section.findtext("OrientationExtended")),
+                }
+            )
+            if deck_position in labware:
+                raise SharedDeckPositionError(deck_position)
+            labware[deck_position] = labware_class(
+                name=labware_name,
+                xml_file_version=labware_version,
+                display_name=content.findtext("NameInProcess", default="").removesuffix(LABWARE_NAME_SUFFIX),
+            )
+            _ = self._labware_by_section.setdefault(section_index, labware[deck_position])
+        layout_name = element.findtext("NameInProcess", default="")
+        if layout_name == DEFAULT_LAYOUT_NAME.format(layout_num=len(self._deck_layouts) + 1):
+            layout_name = ""
+        self._deck_layouts.append(
+            DeckLayout(deck=Deck(name=name, xml_file_version=version), labware=labware, name=layout_name)
+        )
+
+    def read_step(self, element: _Element) -> None:
+        step_type = element.findtext("Type", default="")
+        value_groups = _parse_value_groups(element)
+        if step_type in (SetVolume.type, SetInitialVolume.type):
+            self._steps.append(self._read_set_volume(value_groups, is_initial=step_type == SetInitialVolume.type))
+        elif step_type == Transfer.type:
+            self._steps.append(self._read_transfer(value_groups))
+        elif step_type == MultiDispense.type:
+            self._steps.append(self._read_multi_dispense(value_groups))
+        else:
+            raise UnsupportedStepTypeError(step_type)
+
+    def _labware_in(self, section_index: int) -> Labware:
+        labware = self._labware_by_section.get(section_index)
+        if labware is None:
+            raise NoLabwareInDeckSectionError(section_index)
+        return labware
+
+    def _location(self, *, well: dict[str, int], section_index: int) -> PipettingLocation:
+        return PipettingLocation(
+            labware=self._labware_in(section_index),
+            deck_section_index=section_index,
+            column_index=well["Item1"],
+            upper_left_row_index=well["Item2"],
+        )
+
+    def _read_set_volume(self, value_groups: _ValueGroups, *, is_initial: bool) -> SetVolume:
+        assert self._pipette is not None, "The pipette must be read before the steps"
+        step_class = SetInitialVolume if is_initial else SetVolume
+        set_volume_steps: list[SetVolume] = []
+        for volume_info in json.loads(value_groups["ManualVolume"]["ManualVolume"]):
+            labware = self._labware_in(volume_info["Section"])
+            set_volume_steps.extend(
+                step_class(
+                    labware=labware,
+                    section_index=volume_info["Section"],
+                    column_index=well["Item1"],
+                    row_index=well["Item2"] if self._pipette.is_d_one else None,
+                    volume=volume_info["Volume"] / 100,
+                    pipette_span=None
+                    if self._pipette.is_d_one
+                    else _pipette_span(spacing=volume_info["Spacing"], labware=labware),
+                )
+                for well in volume_info["WellCoordinates"]
+            )
+        first_step, *merged_steps = set_volume_steps
+        first_step.merged_steps = merged_steps
+        return first_step
+
+    def _read_transfer(self, value_groups: _ValueGroups) -> Transfer:
+        source_info, destination_info = (
+            json.loads(value_groups[group_name]["MultiSelection"]) for group_name in ("Source", "Target")
+        )
+        if len(source_info) != 1 or len(destination_info) != 1:
+            raise MultiSectionTransferError
+        source_section_index = source_info[0]["DeckSection"]
+        destination_section_index = destination_info[0]["DeckSection"]
+        well_pairs = [
+            TransferWellPair(
+                source_column_index=source_well["Item1"],
+                source_row_index=source_well["Item2"],
+                destination_column_index=destination_well["Item1"],
+                destination_row_index=destination_well["Item2"],
+            )
+            for source_well, destination_well in zip(source_info[0]["Wells"], destination_info[0]["Wells"], strict=True)
+        ]
+        wells: dict[str, Any] = (
+            well_pairs[0].model_dump() if len(well_pairs) == 1 else {"well_pairs": well_pairs}
+        )  # a single pair is written the same way as a single column transfer
+        return Transfer.model_validate(
+            {
+                "source": self._labware_in(source_section_index),
+                "destination": self._labware_in(destination_section_index),
+                "source_section_index": source_section_index,
+                "destination_section_index": destination_section_index,
+                **wells,
+                "volume": json.loads(value_groups["Pipetting"]["DispenseVolume"])[0]["Volume"] / 100,
+                **_liquid_movement(value_groups),
+            }
+        )
+
+    def _read_multi_dispense(self, value_groups: _ValueGroups) -> MultiDispense:
+        (source_info,) = json.loads(value_groups["Source"]["MultiSelection"])
+        source = self._location(well=source_info["Wells"][0], section_index=source_info["DeckSection"])
+        pipetting = value_groups["Pipetting"]
+        pipetting_configuration = json.loads(pipetting["TipTypePipettingConfiguration"])[0]
+        return MultiDispense(
+            source=source,
+            destinations=[
+                (
+                    self._location(well=dispense_info["Well"], section_index=dispense_info["DeckSection"]),
+                    dispense_info["Volume"] / 100,
+                )
+                for dispense_info in json.loads(pipetting["DispenseVolume"])
+            ],
+            reverse_pipetting_volume=pipetting_configuration["LastDispenseVolume"] / 100,
+            pre_dispense_volume=pipetting_configuration["FirstDispenseVolume"] / 100,
+            pipette_span=_pipette_span(spacing=source_info["Spacing"], labware=source.labware),
+            **_liquid_movement(value_groups),
+        )
+
+    def create_program(self) -> Program:
+        if self._pipette is None:
+            raise MissingProgramElementError("Pipette")
+        if not self._tips:
+            raise MissingProgramElementError("Tips")
+        if not self._deck_layouts:
+            raise MissingProgramElementError("AllDecks")
+        tip: Tip | DOneTips
+        if not self._pipette.is_d_one:
+            tip = self._tips[0][0]
+        elif len(self._tips) > 1:
+            tip = DOneTips(position_1=self._tips[0][0], position_2=self._tips[1][0])
+        else:
+            first_tip, is_position_1 = self._tips[0]
+            tip = DOneTips(position_1=first_tip) if is_position_1 else DOneTips(position_2=first_tip)
+        program = Program(
+            deck_layouts=self._deck_layouts,
+            display_name=self._display_name,
+            description=self._description,
+            pipette=self._pipette,
+            tip=tip,
+        )
+        for step in self._steps:
+            program.add_step(step)
+        return program
+
+
+def _discard(element: _Element) -> None:
+    """Free the memory used by an element that has been read, along with any earlier siblings."""
+    element.clear()
+    while element.getprevious() is not None:
+        parent = element.getparent()
+        assert parent is not None
+        del parent[0]
+
+
+def read_program(source: Path | BinaryIO) -> Program:
+    """Rebuild a Program from the XML of a program file (e.g. one created in Vialab, or by pyalab).
+
+    The XML is parsed incrementally, and each element is discarded as soon as it has been read, so memory use stays
+    flat no matter how large the file is. The pipette, tips, deck and labware embedded in the file are identified by
+    the name, part number and data version of the library file they were copied from, rather than being parsed.
+
+    Only the step types that pyalab can create (setting volumes, Transfer and MultiDispense) are supported.
+    """
+    if isinstance(source, Path):
+        with source.open("rb") as file:
+            return read_program(file)
+    reader = _ProgramXmlReader()
+    # keyed by the tag of the parent element and the element itself
+    element_readers = {
+        (ROOT_TAG, "DisplayNameOnPipette"): reader.read_header,
+        (ROOT_TAG, "Description"): reader.read_header,
+        (ROOT_TAG, "Pipette"): reader.read_pipette,
+        (ROOT_TAG, "Tips"): reader.read_tips,
+        ("AllDecks", "Deck"): reader.read_deck_layout,
+        ("Steps", "Step"): reader.read_step,
+    }
+    # lxml only reports the tags of interest, so the many small elements within them cost nothing to skip
+    tags = {tag for _, tag in element_readers}
+    for _, element in etree.iterparse(source, events=("end",), tag=tags, remove_comments=True):
+        parent = element.getparent()
+        assert parent is not None
+        element_reader = element_readers.get((str(parent.tag), str(element.tag)))
+        if element_reader is not None:
+            element_reader(element)
+        elif parent.tag != ROOT_TAG:
+            continue  # e.g. the description of a labware, which is read along with the rest of the labware
+        _discard(element)
+    return reader.create_program()
@@ -0,0 +1,231 @@
+from collections.abc import Iterable
+from collections.abc import Sequence
+
+from pydantic import BaseModel
+
+from .pipette import Pipette
+from .pipette import Tip
+from .steps import MultiDispense
+from .steps import SetVolume
+from .steps import Step
+from .steps import TipChangeMode
+from .steps import Transfer
+from .steps.base import AXIS_SPEED
+from .steps.base import MIX_ACTIVE
+from .steps.base import MIX_CYCLES
+from .steps.base import MIX_SPEED
+from .steps.base import MIX_VOLUME
+from .steps.base import LiquidMovementParameters
+from .steps.params import PipettingLocation
+from .tip_usage import TipUsageCounter
+
+MAX_SPEED_SETTING = 10  # the fastest of the Integra speed numbers
+
+
+class NoRunTimeToCalibrateError(ValueError):
+    def __init__(self):
+        super().__init__("At least one run with a non-zero estimated run time is needed to calibrate the parameters")
+
+
+class RunTimeParameters(BaseModel, frozen=True):
+    """The timings of the instrument used to estimate how long steps take to run.
+
+    The defaults are rough approximations, so fit them to measured runs of the instrument (see `calibrated`).
+    """
+
+    full_tip_seconds: float = 2
+    """The time to aspirate (or dispense) as much as the tip can hold at the fastest liquid speed (seconds).
+
+    If the pipette holds less than its tips, this is the time for the pipette's volume instead.
+    """
+    max_xy_axis_speed: float = 250
+    """The speed the head moves across the deck at the fastest axis speed (mm/s)."""
+    max_z_axis_speed: float = 100
+    """The speed the head moves up and down at the fastest axis speed (mm/s)."""
+    z_travel: float = 30
+    """The distance the head moves down to each well (and back up again) (mm)."""
+    deck_section_travel: float = 150
+    """The distance the head moves between deck sections, or between the deck and the tip box (mm)."""
+    tip_change_seconds: float = 8
+    """The time to eject the tips and pick up new ones, not including the travel to the tip box (seconds)."""
+    manual_step_seconds: float = 0
+    """The time allowed for a manual step, such as setting the volume of the labware (seconds)."""
+    scale: float = 1
+    """A multiplier applied to every estimated time, to account for anything the model misses."""
+
+    def calibrated(self, runs: Sequence[tuple["RunTimeEstimate", float]]) -> "RunTimeParameters":
+        """Fit the scale to the measured run times (seconds) of programs that were estimated using these parameters.
+
+        The scale is fitted by least squares, so that the estimates are proportional to the measured times.
+        """
+        sum_of_squares = sum(estimate.total**2 for estimate, _ in runs)
+        if sum_of_squares == 0:
+            raise NoRunTimeToCalibrateError
+        ratio = sum(estimate.total * measured for estimate, measured in runs) / sum_of_squares
+        return self.model_copy(update={"scale": self.scale * ratio})
+
+
+class StepRunTime(BaseModel, frozen=True):
+    """The estimated time to run a step, broken down by what the instrument is doing (seconds)."""
+
+    step_index: int
+    step_type: str
+    tip_changes: float = 0
+    movement: float = 0
+    liquid_handling: float = 0
+    mixing: float = 0
+    delays: float = 0
+    manual: float = 0
+
+    @property
+    def total(self) -> float:
+        return self.tip_changes + self.movement + self.liquid_handling + self.mixing + self.delays + self.manual
+
+
+class RunTimeEstimate(BaseModel, frozen=True):
+    steps: list[StepRunTime]
+
+    @property
+    def total(self) -> float:
+        return sum(step.total for step in self.steps)
+
+
+class RunTimeEstimator:
+    """Estimate how long steps take to run, one step at a time.
+
+    The position of the head is tracked between steps, so the travel between wells depends on the order of the steps.
+    Tips are changed (including the trip to the tip box) as counted by `TipUsageCounter`.
+    """
+
+    def __init__(self, *, pipette: Pipette, parameters: RunTimeParameters | None = None):
+        super().__init__()
+        self._pipette = pipette
+        self._parameters = RunTimeParameters() if parameters is None else parameters
+        self._tip_usage_counter = TipUsageCounter(pipette=pipette)
+        self._xy_speed = self._parameters.max_xy_axis_speed * AXIS_SPEED / MAX_SPEED_SETTING
+        self._z_speed = self._parameters.max_z_axis_speed * AXIS_SPEED / MAX_SPEED_SETTING
+        self._head_location: tuple[int, int] | None = None  # deck section and column index, or None at the tip box
+        self._step_run_times: list[StepRunTime] = []
+
+    def add_step(self, step: Step) -> StepRunTime:
+        times: dict[str, float] = dict.fromkeys(
+            ("tip_changes", "movement", "liquid_handling", "mixing", "delays", "manual"), 0.0
+        )
+        num_pick_ups = self._tip_usage_counter.add_step(step)
+        if isinstance(step, SetVolume):
+            times["manual"] += self._parameters.manual_step_seconds
+        elif isinstance(step, Transfer):
+            self._add_transfer(step, num_pick_ups=num_pick_ups, times=times)
+        elif isinstance(step, MultiDispense):
+            self._add_multi_dispense(step, num_pick_ups=num_pick_ups, times=times)
+        step_run_time = StepRunTime(
+            step_index=len(self._step_run_times),
+            step_type=step.type,
+            **{name: seconds * self._parameters.scale for name, seconds in times.items()},
+        )
+        self._step_run_times.append(step_run_time)
+        return step_run_time
+
+    def add_steps(self, steps: Iterable[Step]) -> None:
+        for step in steps:
+            _ = self.add_step(step)
+
+    @property
+    def estimate(self) -> RunTimeEstimate:
+        return RunTimeEstimate(steps=list(self._step_run_times))
+
+    def _change_tips(self) -> float:
+        self._head_location = None
+        return self._parameters.tip_change_seconds + self._parameters.deck_section_travel / self._xy_speed
+
+    def _move_to(self, location: PipettingLocation) -> float:
+        """Move the head to the well, and down into it and back up again."""
+        if self._head_location is None or self._head_location[0] != location.deck_section_index:
+            distance = self._parameters.deck_section_travel
+        else:
+            distance = abs(location.column_index - self._head_location[1]) * location.labware.column_spacing
+        self._head_location = (location.deck_section_index, location.column_index)
+        return distance / self._xy_speed + 2 * self._parameters.z_travel / self._z_speed
+
+    def _move_liquid(self, *, tip: Tip, volume: float, liquid_speed: int) -> float:
+        capacity = self._pipette.liquid_capacity(tip)  # the pipette may hold less than the tip
+        return volume / capacity * self._parameters.full_tip_seconds * MAX_SPEED_SETTING / liquid_speed
+
+    def _mix(self, *, tip: Tip) -> float:
+        if not MIX_ACTIVE:
+            return 0
+        return MIX_CYCLES * 2 * self._move_liquid(tip=tip, volume=MIX_VOLUME, liquid_speed=MIX_SPEED)
+
+    def _visit(
+        self,
+        *,
+        tip: Tip,
+        location: PipettingLocation,
+        volume: float,
+        parameters: LiquidMovementParameters,
+        times: dict[str, float],
+    ) -> None:
+        """Move to a well, aspirate or dispense the volume, and mix."""
+        times["movement"] += self._move_to(location)
+        times["liquid_handling"] += self._move_liquid(tip=tip, volume=volume, liquid_speed=parameters.liquid_speed)
+        times["delays"] += parameters.post_delay
+        times["mixing"] += self._mix(tip=tip)
+
+    def _add_transfer(self, step: Transfer, *, num_pick_ups: int, times: dict[str, float]) -> None:
+        assert step.source_section_index is not None, "Source section index must be set prior to estimating"
+        assert step.destination_section_index is not None, "Destination section index must be set prior to estimating"
+        pairs = step.well_pairs_to_transfer
+        if step.tip_change_mode == TipChangeMode.MODE_A:
+            pairs_with_new_tips = range(len(pairs) - num_pick_ups, len(pairs))
+        else:
+            pairs_with_new_tips = range(num_pick_ups)  # at most one pick up, before the first pair
+        for pair_index, pair in enumerate(pairs):
+            if pair_index in pairs_with_new_tips:
+                times["tip_changes"] += self._change_tips()
+            self._visit(
+                tip=step.tip,
+                location=PipettingLocation(
+                    labware=step.source,
+                    deck_section_index=step.source_section_index,
+                    column_index=pair.source_column_index,
+                    upper_left_row_index=pair.source_row_index,
+                ),
+                volume=step.volume,
+                parameters=step.aspirate_parameters,
+                times=times,
+            )
+            self._visit(
+                tip=step.tip,
+                location=PipettingLocation(
+                    labware=step.destination,
+                    deck_section_index=step.destination_section_index,
+                    column_index=pair.destination_column_index,
+                    upper_left_row_index=pair.destination_row_index,
+                ),
+                volume=step.volume,
+                parameters=step.dispense_parameters,
+                times=times,
+            )
+
+    def _add_multi_dispense(self, step: MultiDispense, *, num_pick_ups: int, times: dict[str, float]) -> None:
+        def visit(location: PipettingLocation, volume: float, parameters: LiquidMovementParameters) -> None:
+            self._visit(
+                tip=step.tip,
+                location=location,
+                volume=volume,
+                parameters=parameters,
+                times=times,
+            )
+
+        if num_pick_ups > 0:
+            times["tip_changes"] += self._change_tips()
+        visit(
+            step.source,
+            sum(volume for _, volume in step.destinations) + step.pre_dispense_volume + step.reverse_pipetting_volume,
+            step.aspirate_parameters,
+        )
+        times["liquid_handling"] += self._move_liquid(
+            tip=step.tip, volume=step.pre_dispense_volume, liquid_speed=step.dispense_parameters.liquid_speed
+        )
+        for destination, volume in step.destinations:
+            visit(destination, volume, step.dispense_parameters)
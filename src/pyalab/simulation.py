@@ -0,0 +1,255 @@
+import math
+from array import array
+from collections.abc import Iterable
+from enum import Enum
+
+from pydantic import BaseModel
+
+from .pipette import Pipette
+from .plate import Labware
+from .steps import MultiDispense
+from .steps import SetVolume
+from .steps import Step
+from .steps import Transfer
+from .steps.params import PipettingLocation
+
+VOLUME_TOLERANCE = 1e-6  # µl, so that floating point error from summing volumes isn't flagged as an issue
+_POSITION_TOLERANCE = 1e-9  # so that floating point error in the pipette span doesn't shift a channel back a row
+
+
+class VolumeIssueType(Enum):
+    UNDERDRAW = "underdraw"
+    """More liquid was aspirated from the well than it contained."""
+    OVERFLOW = "overflow"
+    """The well was filled above its nominal volume."""
+    OUT_OF_BOUNDS = "out_of_bounds"
+    """A channel of the pipette was positioned outside the wells of the labware."""
+
+
+class VolumeIssue(BaseModel, frozen=True):
+    step_index: int
+    """The index of the step that caused the issue."""
+    issue_type: VolumeIssueType
+    deck_section_index: int
+    row_index: int
+    column_index: int
+    volume: float
+    """The volume in the well after the liquid was moved (µl), or the volume to move for an out of bounds well."""
+
+
+class VolumeSimulationResult(BaseModel, frozen=True):
+    final_volumes: dict[int, list[list[float]]]
+    """The volume in each well (µl) at the end of the steps, indexed by row then column, and keyed by deck section index."""
+    issues: list[VolumeIssue]
+    """Every underdraw, overflow or out of bounds well, in the order they occurred."""
+
+    @property
+    def succeeded(self) -> bool:
+        return not self.issues
+
+
+class SectionVolumes:
+    """The volume in each well (µl) of the labware in a single deck section, stored row-major in a compact array."""
+
+    def __init__(self, *, labware: Labware):
+        super().__init__()
+        self.row_count = labware.row_count
+        self.column_count = labware.column_count
+        self.well_volume = labware.well_volume
+        self.volumes = array("d", [0.0]) * (self.row_count * self.column_count)
+
+    def well_index(self, *, row_index: int, column_index: int) -> int | None:
+        """Get the position of the well in the array, or None if the well is outside the labware."""
+        if 0 <= row_index < self.row_count and 0 <= column_index < self.column_count:
+            return row_index * self.column_count + column_index
+        return None
+
+    def to_rows(self) -> list[list[float]]:
+        return [
+            self.volumes[start : start + self.column_count].tolist()
+            for start in range(0, len(self.volumes), self.column_count)
+        ]
+
+
+class VolumeSimulator:
+    """Replay steps against the volume in each well, one step at a time, flagging underdraws and overflows.
+
+    Wells are empty until their volume is set by a `SetInitialVolume`/`SetVolume` step. Each channel of the pipette
+    aspirates (and dispenses) the volume of the step, with the channels spread down the column by the pipette span. So
+    all channels of a multichannel pipette draw from the single well of a reservoir.
+    """
+
+    def __init__(self, *, pipette: Pipette):
+        super().__init__()
+        self._num_channels = pipette.num_channels
+        self._is_d_one = pipette.is_d_one
+        self._sections: dict[int, SectionVolumes] = {}
+        self._issues: list[VolumeIssue] = []
+        self._step_index = -1
+
+    def add_step(self, step: Step) -> None:
+        self._step_index += 1
+        if isinstance(step, SetVolume):
+            for set_volume_step in (step, *step.merged_steps):
+                self._set_volume(set_volume_step)
+        elif isinstance(step, Transfer):
+            self._transfer(step)
+        elif isinstance(step, MultiDispense):
+            self._multi_dispense(step)
+
+    def add_steps(self, steps: Iterable[Step]) -> None:
+        for step in steps:
+            self.add_step(step)
+
+    @property
+    def result(self) -> VolumeSimulationResult:
+        return VolumeSimulationResult(
+            final_volumes={
+                section_index: section.to_rows() for section_index, section in sorted(self._sections.items())
+            },
+            issues=list(self._issues),
+        )
+
+    def _section(self, *, labware: Labware, section_index: int) -> SectionVolumes:
+        section = self._sections.get(section_index)
+        if section is None:
+            section = SectionVolumes(labware=labware)
+            self._sections[section_index] = section
+        return section
+
+    def _channel_rows(self, *, labware: Labware, row_index: int, pipette_span: float) -> list[int]:
+        row_spacing = labware.row_spacing_in_xml
+        return [
+            row_index + math.floor(channel * pipette_span / row_spacing + _POSITION_TOLERANCE)
+            for channel in range(self._num_channels)
+        ]
+
+    def _add_issue(
+        self, *, issue_type: VolumeIssueType, section_index: int, row_index: int, column_index: int, volume: float
+    ) -> None:
+        self._issues.append(
+            VolumeIssue(
+                step_index=self._step_index,
+                issue_type=issue_type,
+                deck_section_index=section_index,
+                row_index=row_index,
+                column_index=column_index,
+                volume=volume,
+            )
+        )
+
+    def _set_volume(self, step: SetVolume) -> None:
+        assert step.section_index is not None, "section_index must be set prior to simulating"
+        section = self._section(labware=step.labware, section_index=step.section_index)
+        # only the D-One can set the volume of a single well, otherwise the entire column is set to the same volume
+        rows = [0 if step.row_index is None else step.row_index] if self._is_d_one else list(range(section.row_count))
+        for row_index in rows:
+            well_index = section.well_index(row_index=row_index, column_index=step.column_index)
+            if well_index is None:
+                self._add_issue(
+                    issue_type=VolumeIssueType.OUT_OF_BOUNDS,
+                    section_index=step.section_index,
+                    row_index=row_index,
+                    column_index=step.column_index,
+                    volume=step.volume,
+                )
+                continue
+            section.volumes[well_index] = step.volume
+            if step.volume > section.well_volume + VOLUME_TOLERANCE:
+                self._add_issue(
+                    issue_type=VolumeIssueType.OVERFLOW,
+                    section_index=step.section_index,
+                    row_index=row_index,
+                    column_index=step.column_index,
+                    volume=step.volume,
+                )
+
+    def _move_volume(
+        self, *, section: SectionVolumes, section_index: int, rows: list[int], column_index: int, volume: float
+    ) -> None:
+        """Add the volume to each well (or remove it, if the volume is negative)."""
+        for row_index in rows:
+            well_index = section.well_index(row_index=row_index, column_index=column_index)
+            if well_index is None:
+                self._add_issue(
+                    issue_type=VolumeIssueType.OUT_OF_BOUNDS,
+                    section_index=section_index,
+                    row_index=row_index,
+                    column_index=column_index,
+                    volume=volume,
+                )
+                continue
+            new_volume = section.volumes[well_index] + volume
+            section.volumes[well_index] = new_volume
+            if volume < 0 and new_volume < -VOLUME_TOLERANCE:
+                issue_type = VolumeIssueType.UNDERDRAW
+            elif volume > 0 and new_volume > section.well_volume + VOLUME_TOLERANCE:
+                issue_type = VolumeIssueType.OVERFLOW
+            else:
+                continue
+            self._add_issue(
+                issue_type=issue_type,
+                section_index=section_index,
+                row_index=row_index,
+                column_index=column_index,
+                volume=new_volume,
+            )
+
+    def _transfer(self, step: Transfer) -> None:
+        assert step.source_section_index is not None, "Source section index must be set prior to simulating"
+        assert step.destination_section_index is not None, "Destination section index must be set prior to simulating"
+        source = self._section(labware=step.source, section_index=step.source_section_index)
+        destination = self._section(labware=step.destination, section_index=step.destination_section_index)
+        for pair in step.well_pairs_to_transfer:
+            self._move_volume(
+                section=source,
+                section_index=step.source_section_index,
+                rows=self._channel_rows(
+                    labware=step.source,
+                    row_index=pair.source_row_index,
+                    pipette_span=step.source.row_spacing_in_xml,
+                ),
+                column_index=pair.source_column_index,
+                volume=-step.volume,
+            )
+            self._move_volume(
+                section=destination,
+                section_index=step.destination_section_index,
+                rows=self._channel_rows(
+                    labware=step.destination,
+                    row_index=pair.destination_row_index,
+                    pipette_span=step.destination.row_spacing_in_xml,
+                ),
+                column_index=pair.destination_column_index,
+                volume=step.volume,
+            )
+
+    def _multi_dispense(self, step: MultiDispense) -> None:
+        def move_volume(location: PipettingLocation, volume: float) -> None:
+            self._move_volume(
+                section=self._section(labware=location.labware, section_index=location.deck_section_index),
+                section_index=location.deck_section_index,
+                rows=self._channel_rows(
+                    labware=location.labware,
+                    row_index=location.upper_left_row_index,
+                    pipette_span=location.labware.row_spacing_in_xml
+                    if step.pipette_span is None
+                    else step.pipette_span,
+                ),
+                column_index=location.column_index,
+                volume=volume,
+            )
+
+        # the reverse pipetting volume stays in the tip and is discarded with it, but the pre-dispense goes back into the source
+        move_volume(
+            step.source,
+            -(
+                sum(volume for _, volume in step.destinations)
+                + step.reverse_pipetting_volume
+                + step.pre_dispense_volume
+            ),
+        )
+        if step.pre_dispense_volume > 0:
+            move_volume(step.source, step.pre_dispense_volume)
+        for destination, volume in step.destinations:
+            move_volume(destination, volume)
@@ -0,0 +1,241 @@
+import itertools
+from collections.abc import Sequence
+
+from pydantic import BaseModel
+
+from .pipette import Pipette
+from .run_time import RunTimeEstimator
+from .run_time import RunTimeParameters
+from .steps import MultiDispense
+from .steps import Step
+from .steps import TipChangeMode
+from .steps import Transfer
+from .steps.builders import LiquidTransferStep
+from .tip_usage import TipUsageCounter
+
+type WellColumn = tuple[int, int]
+"""A deck section and column index.
+
+Every row of a column is treated as the same well, so the dependencies between steps err on the side of caution.
+"""
+
+
+class StepWells(BaseModel, frozen=True):
+    """The wells that a liquid transfer step reads (aspirates from) and writes (dispenses into)."""
+
+    reads: frozenset[WellColumn]
+    writes: frozenset[WellColumn]
+    source: WellColumn
+    """The first well aspirated from."""
+    last_location: WellColumn
+    """The last well dispensed into, where the head finishes the step."""
+
+    def conflicts_with(self, other: "StepWells") -> bool:
+        """Whether the order of the two steps matters.
+
+        Steps that only aspirate from the same wells can be swapped, since the total volume removed is the same.
+        """
+        return not (
+            self.writes.isdisjoint(other.writes)
+            and self.writes.isdisjoint(other.reads)
+            and self.reads.isdisjoint(other.writes)
+        )
+
+
+def get_step_wells(step: Step) -> StepWells | None:
+    """Get the wells a step reads and writes, or None for a step that can't be reordered."""
+    if isinstance(step, Transfer):
+        assert step.source_section_index is not None, "Source section index must be set prior to reordering"
+        assert step.destination_section_index is not None, "Destination section index must be set prior to reordering"
+        pairs = step.well_pairs_to_transfer
+        reads = [(step.source_section_index, pair.source_column_index) for pair in pairs]
+        writes = [(step.destination_section_index, pair.destination_column_index) for pair in pairs]
+    elif isinstance(step, MultiDispense):
+        reads = [(step.source.deck_section_index, step.source.column_index)]
+        writes = [(destination.deck_section_index, destination.column_index) for destination, _ in step.destinations]
+    else:
+        return None
+    return StepWells(reads=frozenset(reads), writes=frozenset(writes), source=reads[0], last_location=writes[-1])
+
+
+class StepOrderReport(BaseModel, frozen=True):
+    new_order: list[int]
+    """The original index of each step, in the new order."""
+    tips_before: int
+    tips_after: int
+    run_time_before: float
+    """The estimated run time of the original order (seconds)."""
+    run_time_after: float
+    """The estimated run time of the new order (seconds)."""
+
+    @property
+    def tips_saved(self) -> int:
+        return self.tips_before - self.tips_after
+
+    @property
+    def run_time_saved(self) -> float:
+        return self.run_time_before - self.run_time_after
+
+
+class _LoadedTips(BaseModel, frozen=True):
+    """Tips left on the pipette by a step that doesn't change them."""
+
+    tip_id: int
+    sources: frozenset[WellColumn]
+    """The wells the tips have aspirated from."""
+
+
+def _inherited_sources(step: LiquidTransferStep, loaded_tips: _LoadedTips | None) -> frozenset[WellColumn]:
+    """Get the wells that the tips a step starts with have already aspirated from (none for fresh tips)."""
+    if loaded_tips is None or loaded_tips.tip_id != step.tip_id:
+        return frozenset()
+    return loaded_tips.sources
+
+
+def _loaded_tips_after(step: Step, wells: StepWells | None, loaded_tips: _LoadedTips | None) -> _LoadedTips | None:
+    if not isinstance(step, LiquidTransferStep):
+        return loaded_tips  # the tips stay on the pipette
+    if step.tip_change_mode != TipChangeMode.NO_CHANGE:
+        return None
+    reads = frozenset[WellColumn]() if wells is None else wells.reads
+    return _LoadedTips(tip_id=step.tip_id, sources=_inherited_sources(step, loaded_tips) | reads)
+
+
+class _ReorderableStep(BaseModel, frozen=True):
+    index: int
+    step: LiquidTransferStep
+    wells: StepWells
+    inherited_sources: frozenset[WellColumn]
+    """The wells the tips the step started with had aspirated from, in the original order."""
+
+    def would_be_contaminated_by(self, loaded_tips: _LoadedTips | None) -> bool:
+        """Whether starting with these tips would carry a liquid into the step that the original order didn't."""
+        return not _inherited_sources(self.step, loaded_tips) <= self.inherited_sources | {self.wells.source}
+
+
+def _schedule_segment(
+    segment: Sequence[_ReorderableStep], *, loaded_tips: _LoadedTips | None
+) -> list[_ReorderableStep] | None:
+    """Order the steps to use the tips already on the pipette, then the same source, then the nearest column.
+
+    A step is only placed after every earlier step that it conflicts with, so the liquid handling is unchanged. It's
+    also never placed where it would start with tips that aspirated a liquid it didn't carry over in the original order.
+
+    Returns:
+        The steps in their new order, or None if that left no step that could be placed next.
+    """
+    remaining_dependencies = [
+        {earlier.index for earlier in segment[:position] if earlier.wells.conflicts_with(item.wells)}
+        for position, item in enumerate(segment)
+    ]
+    unscheduled = dict(enumerate(segment))
+    scheduled: list[_ReorderableStep] = []
+    previous: _ReorderableStep | None = None
+
+    def priority(position: int) -> tuple[bool, bool, bool, int, int]:
+        item = unscheduled[position]
+        if previous is None:
+            return (False, False, False, 0, item.index)
+        source_section, source_column = item.wells.source
+        head_section, head_column = previous.wells.last_location
+        return (
+            loaded_tips is None or item.step.tip_id != loaded_tips.tip_id,
+            item.wells.source != previous.wells.source,
+            source_section != head_section,
+            abs(source_column - head_column),
+            item.index,
+        )
+
+    while unscheduled:
+        ready = [
+            position
+            for position, item in unscheduled.items()
+            if not remaining_dependencies[position] and not item.would_be_contaminated_by(loaded_tips)
+        ]
+        if not ready:
+            return None
+        position = min(ready, key=priority)
+        previous = unscheduled.pop(position)
+        scheduled.append(previous)
+        for dependencies in remaining_dependencies:
+            dependencies.discard(previous.index)
+        loaded_tips = _loaded_tips_after(previous.step, previous.wells, loaded_tips)
+    return scheduled
+
+
+def _count_tips(steps: Sequence[Step], *, pipette: Pipette) -> int:
+    tip_usage_counter = TipUsageCounter(pipette=pipette)
+    tip_usage_counter.add_steps(steps)
+    return sum(tip_usage_counter.usage.tips.values())
+
+
+def _estimate_run_time(steps: Sequence[Step], *, pipette: Pipette, parameters: RunTimeParameters | None) -> float:
+    estimator = RunTimeEstimator(pipette=pipette, parameters=parameters)
+    estimator.add_steps(steps)
+    return estimator.estimate.total
+
+
+def reorder_steps(
+    steps: Sequence[Step], *, pipette: Pipette, parameters: RunTimeParameters | None = None
+) -> tuple[list[Step], StepOrderReport]:
+    """Reorder independent liquid transfer steps to save tips and head travel.
+
+    Steps that aren't a Transfer or MultiDispense (e.g. setting volumes) stay where they are, and no step is moved
+    past one. Within each run of liquid transfer steps, a step is never moved before an earlier step that aspirates
+    from or dispenses into the same column. A step only takes over the tips left on the pipette by a `NO_CHANGE` step if
+    those tips have aspirated nothing but its own source and the liquids they carried into it in the original order. If
+    the new order isn't estimated to save tips or time (or no such order is found), the original order is kept.
+
+    Returns:
+        The steps in their new order, and a report of the expected savings.
+    """
+    segments: list[list[_ReorderableStep]] = [[]]
+    fixed_indexes: list[int] = []
+    original_loaded_tips: _LoadedTips | None = None
+    for index, step in enumerate(steps):
+        wells = get_step_wells(step)
+        if isinstance(step, LiquidTransferStep) and wells is not None:
+            segments[-1].append(
+                _ReorderableStep(
+                    index=index,
+                    step=step,
+                    wells=wells,
+                    inherited_sources=_inherited_sources(step, original_loaded_tips),
+                )
+            )
+        else:
+            fixed_indexes.append(index)
+            segments.append([])
+        original_loaded_tips = _loaded_tips_after(step, wells, original_loaded_tips)
+
+    new_order: list[int] = []
+    loaded_tips: _LoadedTips | None = None
+    for segment, fixed_index in itertools.zip_longest(segments, fixed_indexes):
+        scheduled = _schedule_segment(segment, loaded_tips=loaded_tips)
+        if scheduled is None:
+            new_order = list(range(len(steps)))
+            break
+        for item in scheduled:
+            new_order.append(item.index)
+            loaded_tips = _loaded_tips_after(item.step, item.wells, loaded_tips)
+        if fixed_index is not None:
+            new_order.append(fixed_index)
+            loaded_tips = _loaded_tips_after(steps[fixed_index], None, loaded_tips)
+    reordered_steps = [steps[index] for index in new_order]
+
+    tips_before = _count_tips(steps, pipette=pipette)
+    run_time_before = _estimate_run_time(steps, pipette=pipette, parameters=parameters)
+    tips_after = _count_tips(reordered_steps, pipette=pipette)
+    run_time_after = _estimate_run_time(reordered_steps, pipette=pipette, parameters=parameters)
+    if tips_after > tips_before or run_time_after > run_time_before:
+        new_order = list(range(len(steps)))
+        reordered_steps = list(steps)
+        tips_after = tips_before
+        run_time_after = run_time_before
+    return reordered_steps, StepOrderReport(
+        new_order=new_order,
+        tips_before=tips_before,
+        tips_after=tips_after,
+        run_time_before=run_time_before,
+        run_time_after=run_time_after,
+    )
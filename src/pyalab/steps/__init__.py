@@ -6,4 +6,6 @@ from .params import PipettingLocation
 from .params import TipChangeMode
 from .set_volume import SetInitialVolume
 from .set_volume import SetVolume
+from .transfer import InvalidTransferWellsError
 from .transfer import Transfer
+from .transfer import TransferWellPair
@@ -1,10 +1,14 @@
-import json
 import uuid
 from abc import ABC
 from abc import abstractmethod
+from collections.abc import Callable
+from collections.abc import Sequence
+from copy import deepcopy
 from enum import Enum
+from functools import lru_cache
 from typing import Any
 from typing import ClassVar
+from typing import override
 
 from inflection import camelize
 from lxml import etree
@@ -12,14 +16,25 @@ from lxml.etree import _Element
 from pydantic import BaseModel
 from pydantic import Field
 
+from pyalab.json_backend import json_dumps
 from pyalab.pipette import Pipette
 from pyalab.pipette import Tip
+from pyalab.plate import Labware
 
 WORKING_DIRECTION_KWARGS: dict[str, Any] = {
     "DeckId": "00000000-0000-0000-0000-000000000000",  # TODO: figure out if this has any meaning
     "WorkingDirectionExtended": 0,  # TODO: figure out what this is
     "WorkingDirectionOld": "false",  # TODO: figure out what this is
 }
+AXIS_SPEED = 10
+"""The speed the head moves along each axis (Integra Numbers, 1-10)."""
+# TODO: implement mixing
+MIX_ACTIVE = False
+MIX_CYCLES = 3
+MIX_SPEED = 8
+"""The speed the liquid moves while mixing (Integra Numbers, 1-10)."""
+MIX_VOLUME = 50
+"""The volume to mix (µl)."""
 
 
 class MixLocation(Enum):
@@ -55,7 +70,49 @@ def alias_generator(name: str) -> str:
     return ALIASES.get(name, name)
 
 
-class WellRowCol(BaseModel, frozen=True):
+type WellInSection = tuple[dict[str, Any], dict[str, Any]]
+"""The alias dumps of a well (`WellRowCol`) and the deck section (`DeckSection`) it is in."""
+
+
+def unique_deck_sections(wells: Sequence[WellInSection]) -> list[dict[str, Any]]:
+    """Get the deck sections of the wells, in the order they are first used."""
+    deck_sections: dict[tuple[tuple[str, Any], ...], dict[str, Any]] = {}
+    for _, deck_section_info in wells:
+        _ = deck_sections.setdefault(tuple(deck_section_info.items()), deck_section_info)
+    return list(deck_sections.values())
+
+
+def _value_text(value: str) -> str | etree.CDATA:
+    is_c_data_needed = any(char in value for char in SPECIAL_CHARS)
+    return etree.CDATA(value) if is_c_data_needed else value
+
+
+def _create_value_group(*, group_name: str, values: list[tuple[str, str]]) -> _Element:
+    group_node = etree.Element("ValueGroup", attrib={"Key": group_name})
+    values_node = etree.SubElement(group_node, "Values")
+    for name, value in values:
+        etree.SubElement(values_node, "Value", attrib={"Key": name}).text = _value_text(value)
+    return group_node
+
+
+# value groups that are identical between steps, keyed by the group name and whatever else the group depends on
+_value_group_templates: dict[tuple[Any, ...], _Element] = {}
+
+
+class AliasDumpedModel(BaseModel, frozen=True):
+    """A small frozen model that is frequently dumped by alias into the JSON values of a step."""
+
+    def dump_by_alias(self) -> dict[str, Any]:
+        """Get `model_dump(by_alias=True)`, cached by the value of the model."""
+        return dict(_dump_by_alias(self))
+
+
+@lru_cache(maxsize=4096)
+def _dump_by_alias(model: AliasDumpedModel) -> dict[str, Any]:
+    return model.model_dump(by_alias=True)
+
+
+class WellRowCol(AliasDumpedModel, frozen=True):
     column_index: int = Field(ge=0)
     row_index: int = Field(ge=0)
     model_config = {
@@ -64,7 +121,7 @@ class WellRowCol(BaseModel, frozen=True):
     }
 
 
-class DeckSection(BaseModel, frozen=True):
+class DeckSection(AliasDumpedModel, frozen=True):
     deck_section: int
     sub_section: int
     model_config = {
@@ -73,7 +130,7 @@ class DeckSection(BaseModel, frozen=True):
     }
 
 
-class Section(BaseModel, frozen=True):
+class Section(AliasDumpedModel, frozen=True):
     """Some steps call it Section instead of DeckSection."""
 
     section: int
@@ -84,7 +141,7 @@ class Section(BaseModel, frozen=True):
     }
 
 
-class WellOffsets(BaseModel, frozen=True):
+class WellOffsets(AliasDumpedModel, frozen=True):
     deck_section: int
     sub_section: int
     offset_x: int
@@ -112,6 +169,28 @@ class Step(BaseModel, ABC):
     type: ClassVar[str]
     _tip: Tip | None = None
     _pipette: Pipette | None = None
+    _revision: int = 0
+    _revised_private_attributes: ClassVar[frozenset[str]] = frozenset(("_tip", "_pipette"))
+    _resolved_section_index_fields: frozenset[str] = frozenset()
+    """The section index fields that were filled in from the Program's deck layouts, rather than provided."""
+
+    @override
+    def __setattr__(self, name: str, value: Any) -> None:
+        super().__setattr__(name, value)
+        if name in type(self).model_fields or name in self._revised_private_attributes:
+            self._revision += 1
+            # a section index assigned from outside is treated as provided from then on
+            self._resolved_section_index_fields -= {name}
+
+    @property
+    def revision(self) -> tuple[object, ...]:
+        """Changes whenever a field of the step (or the pipette or tip it uses) is assigned, or a list field is modified.
+
+        Used to tell whether the XML of the step needs to be rebuilt. Steps with list fields include the items of each
+        list as they are, which catches modifying the list in place (e.g. appending to the `well_pairs` of a Transfer).
+        Comparing the revisions of an unchanged step is then just an identity check of each item.
+        """
+        return (self._revision,)
 
     def set_pipette(self, pipette: Pipette) -> None:
         self._pipette = pipette
@@ -133,13 +212,28 @@ class Step(BaseModel, ABC):
     def tip_id(self) -> int:
         return self.tip.tip_id
 
-    def create_xml_for_program(self) -> _Element:
+    def resolve_section_indexes(self, get_section_index: Callable[[Labware], int]) -> None:
+        """Fill in any deck section indexes that were not explicitly provided (updating any filled in before)."""
+
+    def _resolve_section_index(
+        self, field_name: str, labware: Labware, get_section_index: Callable[[Labware], int]
+    ) -> None:
+        current_value = getattr(self, field_name)
+        if current_value is not None and field_name not in self._resolved_section_index_fields:
+            return
+        section_index = get_section_index(labware)
+        if section_index != current_value:
+            setattr(self, field_name, section_index)
+        self._resolved_section_index_fields |= {field_name}
+
+    def create_xml_for_program(self, *, step_id: str | None = None) -> _Element:
+        """Create the XML of the step, with a new random ID unless one is provided."""
         root = etree.Element("Step")
         for name, value in [
             ("Type", self.type),
             ("IsEnabled", "true"),
-            ("ID", str(uuid.uuid4())),
-            ("IsNew", json.dumps(obj=False)),
+            ("ID", str(uuid.uuid4()) if step_id is None else step_id),
+            ("IsNew", json_dumps(obj=False)),
             (
                 "DeckID",
                 "00000000-0000-0000-0000-000000000000",
@@ -149,147 +243,178 @@ class Step(BaseModel, ABC):
 
         self._value_groups_node = etree.SubElement(root, "ValueGroups")
         self._add_value_groups()
+        del self._value_groups_node  # lxml nodes can't be pickled, so don't keep a reference to them on the step
         return root
 
     @abstractmethod
     def _add_value_groups(self) -> None: ...
 
     def _add_value_group(self, *, group_name: str, values: list[tuple[str, str]]) -> None:
-        group_node = etree.SubElement(self._value_groups_node, "ValueGroup", attrib={"Key": group_name})
-        values_node = etree.SubElement(group_node, "Values")
-        for name, value in values:
-            is_c_data_needed = any(char in value for char in SPECIAL_CHARS)
-            etree.SubElement(values_node, "Value", attrib={"Key": name}).text = (
-                etree.CDATA(value) if is_c_data_needed else value
-            )
+        self._value_groups_node.append(_create_value_group(group_name=group_name, values=values))
+
+    def _add_templated_value_group(
+        self,
+        *,
+        group_name: str,
+        template_key: tuple[Any, ...],
+        create_values: Callable[[], list[tuple[str, str]]],
+        varying_values: dict[str, str] | None = None,
+    ) -> None:
+        """Add a value group that is (mostly) the same for every step by cloning a template of it.
+
+        The template is built from `create_values` the first time each `template_key` is used. Any `varying_values`
+        replace the text of the values with the same name in the clone.
+        """
+        key = (group_name, *template_key)
+        template = _value_group_templates.get(key)
+        if template is None:
+            template = _create_value_group(group_name=group_name, values=create_values())
+            _value_group_templates[key] = template
+        group_node = deepcopy(template)
+        if varying_values is not None:
+            for value_node in group_node.iter("Value"):
+                value = varying_values.get(value_node.get("Key", ""))
+                if value is not None:
+                    value_node.text = _value_text(value)
+        self._value_groups_node.append(group_node)
 
     def _add_lld_value_group(self) -> None:
-        self._add_value_group(
+        self._add_templated_value_group(
             group_name="LLD",
-            values=[
-                ("UseLLD", json.dumps(obj=False)),
-                ("LLDErrorHandling", json.dumps(LldErrorHandlingMode.PAUSE_AND_REPEAT.value)),
-                ("LLDHeights", json.dumps(None)),
+            template_key=(),
+            create_values=lambda: [
+                ("UseLLD", json_dumps(obj=False)),
+                ("LLDErrorHandling", json_dumps(LldErrorHandlingMode.PAUSE_AND_REPEAT.value)),
+                ("LLDHeights", json_dumps(None)),
             ],
         )
 
     def _add_various_value_group(self) -> None:
-        self._add_value_group(
+        self._add_templated_value_group(
             group_name="Various",
-            values=[
-                ("SpeedX", str(10)),
-                ("SpeedY", str(10)),
-                ("SpeedZ", str(10)),
-                ("IsStepActive", json.dumps(obj=True)),
+            template_key=(),
+            create_values=lambda: [
+                ("SpeedX", str(AXIS_SPEED)),
+                ("SpeedY", str(AXIS_SPEED)),
+                ("SpeedZ", str(AXIS_SPEED)),
+                ("IsStepActive", json_dumps(obj=True)),
             ],
         )
 
-    def _add_mix_group(
-        self, *, mix_location: MixLocation, well_info: dict[str, Any], deck_section_info: dict[str, Any]
-    ):
+    def _add_mix_group(self, *, mix_location: MixLocation, wells: Sequence[WellInSection]):
+        self._add_templated_value_group(
+            group_name=mix_location.value,
+            template_key=(self.tip_id,),
+            create_values=lambda: self._create_mix_values(mix_location=mix_location),
+            varying_values=self._create_mix_well_values(wells=wells),
+        )
+
+    def _create_mix_values(self, *, mix_location: MixLocation) -> list[tuple[str, str]]:
         values = [
-            ("MixActive", json.dumps(obj=False)),
+            ("MixActive", json_dumps(obj=MIX_ACTIVE)),
             (
                 "TipTypeMixConfiguration",
-                json.dumps(
+                json_dumps(
                     obj=[
                         {
-                            "MixSpeed": 8,
+                            "MixSpeed": MIX_SPEED,
                             "TipID": self.tip_id,
                         }
                     ]
                 ),
             ),
-            ("MixPause", json.dumps(obj=0)),
-            (
-                "SectionMixVolume",
-                json.dumps(
-                    obj=[
-                        {
-                            "Well": well_info,
-                            **deck_section_info,
-                            "Volume": 5000,  # TODO: implement mixing volume
-                            "TipID": self.tip_id,
-                            "Multiplier": 1,
-                            "TotalVolume": 5000,  # TODO: figure out when/if this needs to differ from Volume
-                        }
-                    ]
-                ),
+            ("MixPause", json_dumps(obj=0)),
+            ("SectionMixVolume", ""),  # varies with the wells
+            ("MixCycles", json_dumps(obj=MIX_CYCLES)),
+            ("BlowOut", json_dumps(obj=False)),
+            ("TipTravel", json_dumps(obj=False)),
+            ("SectionHeightConfig", ""),  # varies with the wells
+            ("VolumeConfigType", json_dumps(obj=True)),
+            ("Heights", ""),  # varies with the wells
+            ("MixBeforeEachAspiration", json_dumps(obj=False)),
+        ]
+        if mix_location == MixLocation.DESTINATION:
+            values.append(("SkipFirst", json_dumps(obj=False)))
+        return values
+
+    def _create_mix_well_values(self, *, wells: Sequence[WellInSection]) -> dict[str, str]:
+        return {
+            "SectionMixVolume": json_dumps(
+                obj=[
+                    {
+                        "Well": well_info,
+                        **deck_section_info,
+                        "Volume": ul_to_xml(MIX_VOLUME),
+                        "TipID": self.tip_id,
+                        "Multiplier": 1,
+                        "TotalVolume": ul_to_xml(
+                            MIX_VOLUME
+                        ),  # TODO: figure out when/if this needs to differ from Volume
+                    }
+                    for well_info, deck_section_info in wells
+                ]
             ),
-            ("MixCycles", json.dumps(obj=3)),
-            ("BlowOut", json.dumps(obj=False)),
-            ("TipTravel", json.dumps(obj=False)),
-            (
-                "SectionHeightConfig",
-                json.dumps(
-                    obj=[
-                        {
-                            **deck_section_info,
-                            "HeightConfigType": True,
-                            "WellBottomOffset": 0,
-                        }
-                    ]
-                ),
+            "SectionHeightConfig": json_dumps(
+                obj=[
+                    {
+                        **deck_section_info,
+                        "HeightConfigType": True,
+                        "WellBottomOffset": 0,
+                    }
+                    for deck_section_info in unique_deck_sections(wells)
+                ]
             ),
-            ("VolumeConfigType", json.dumps(obj=True)),
-            (
-                "Heights",
-                json.dumps(
-                    obj=[
-                        {
-                            "Well": well_info,
-                            **deck_section_info,
-                            "StartHeight": 325,
-                            "EndHeight": 0,
-                            "TipID": self.tip_id,
-                        }
-                    ]
-                ),
+            "Heights": json_dumps(
+                obj=[
+                    {
+                        "Well": well_info,
+                        **deck_section_info,
+                        "StartHeight": 325,
+                        "EndHeight": 0,
+                        "TipID": self.tip_id,
+                    }
+                    for well_info, deck_section_info in wells
+                ]
             ),
-            ("MixBeforeEachAspiration", json.dumps(obj=False)),
-        ]
-        if mix_location == MixLocation.DESTINATION:
-            values.append(("SkipFirst", json.dumps(obj=False)))
-        self._add_value_group(
-            group_name=mix_location.value,
-            values=values,
-        )
+        }
 
-    def _create_height_config_value_tuples(self, *, deck_section_info: dict[str, Any]) -> list[tuple[str, str]]:
+    def _create_height_config_value_tuples(
+        self, *, deck_section_infos: Sequence[dict[str, Any]]
+    ) -> list[tuple[str, str]]:
         return [
             (
                 "SectionHeightConfig",
-                json.dumps(
+                json_dumps(
                     [
                         {
                             **deck_section_info,
                             "HeightConfigType": True,
                             "WellBottomOffset": 0,
                         }
+                        for deck_section_info in deck_section_infos
                     ]
                 ),
             ),
             (
                 "TipTypeHeightConfiguration",
-                json.dumps(
+                json_dumps(
                     [
                         {
                             **deck_section_info,
                             "WellBottomOffset": 200,
                             "TipID": self.tip_id,
                         }
+                        for deck_section_info in deck_section_infos
                     ]
                 ),
             ),
         ]
 
-    def _create_heights_value_tuple(
-        self, *, well_info: dict[str, Any], deck_section_info: dict[str, Any], start_height: float
-    ) -> tuple[str, str]:
+    def _create_heights_value_tuple(self, *, wells: Sequence[WellInSection], start_height: float) -> tuple[str, str]:
         end_height = start_height  # TODO: implement moving aspirate/dispense
         return (
             "Heights",
-            json.dumps(
+            json_dumps(
                 [
                     {
                         "Well": well_info,
@@ -298,17 +423,28 @@ class Step(BaseModel, ABC):
                         "EndHeight": mm_to_xml(end_height),
                         "TipID": self.tip_id,
                     }
+                    for well_info, deck_section_info in wells
                 ]
             ),
         )
 
-    def _add_location_group(self, *, location: Location, well_info: list[dict[str, Any]], deck_section: DeckSection):
+    def _add_location_group(
+        self, *, location: Location, well_info: list[dict[str, Any]], deck_sections: Sequence[DeckSection]
+    ):
         values = [
-            ("MultiSelection", json.dumps(well_info)),
+            ("MultiSelection", json_dumps(well_info)),
             (
                 "WellOffsets",
-                json.dumps(
-                    [WellOffsets(offset_x=0, offset_y=0, **deck_section.model_dump()).model_dump(by_alias=True)]
+                json_dumps(
+                    [
+                        WellOffsets(
+                            deck_section=deck_section.deck_section,
+                            sub_section=deck_section.sub_section,
+                            offset_x=0,
+                            offset_y=0,
+                        ).dump_by_alias()
+                        for deck_section in deck_sections
+                    ]
                 ),
             ),
         ]
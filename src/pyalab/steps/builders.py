@@ -1,7 +1,8 @@
-import json
 from abc import ABC
+from collections.abc import Sequence
 from typing import Any
 
+from pyalab.json_backend import json_dumps
 from pyalab.plate import Labware
 
 from .base import Step
@@ -22,32 +23,39 @@ class StepWithPipetteSpan(Step, ABC):
 class LiquidTransferStep(StepWithPipetteSpan, ABC):
     tip_change_mode: TipChangeMode
 
+    @property
+    def number_of_reactions(self) -> int:
+        """The number of separate aspirate/dispense cycles in the step."""
+        return 1
+
     def _add_tips_value_group(self) -> None:
-        self._add_value_group(
+        self._add_templated_value_group(
             group_name="Tips",
-            values=[
-                ("PreWetting", json.dumps(obj=False)),
-                ("PreWettingCycles", json.dumps(obj=3)),
-                ("TipChange", json.dumps(self.tip_change_mode.value)),
-                ("TipEjectionType", json.dumps(obj=True)),
+            template_key=(self.tip_change_mode,),
+            create_values=lambda: [
+                ("PreWetting", json_dumps(obj=False)),
+                ("PreWettingCycles", json_dumps(obj=3)),
+                ("TipChange", json_dumps(self.tip_change_mode.value)),
+                ("TipEjectionType", json_dumps(obj=True)),
             ],
         )
 
-    def _add_tip_touch_target_group(self, deck_section_model_dict: dict[str, Any]) -> None:
+    def _add_tip_touch_target_group(self, deck_section_infos: Sequence[dict[str, Any]]) -> None:
         self._add_value_group(
             group_name="TipTouchTarget",
             values=[
-                ("TipTouchActive", json.dumps(obj=False)),
+                ("TipTouchActive", json_dumps(obj=False)),
                 (
                     "SectionTipTouch",
-                    json.dumps(
+                    json_dumps(
                         obj=[
                             {
-                                **deck_section_model_dict,
+                                **deck_section_info,
                                 "Type": False,
                                 "Height": 1406,  # TODO: implement tip touch
                                 "Distance": 225,
                             }
+                            for deck_section_info in deck_section_infos
                         ]
                     ),
                 ),
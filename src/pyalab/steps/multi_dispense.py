@@ -1,16 +1,19 @@
-import json
 from typing import Any
 from typing import override
 
 from pydantic import Field
 
+from pyalab.json_backend import json_dumps
+
 from .base import WORKING_DIRECTION_KWARGS
 from .base import DeckSection
 from .base import Location
 from .base import MixLocation
+from .base import WellInSection
 from .base import WellRowCol
 from .base import mm_to_xml
 from .base import ul_to_xml
+from .base import unique_deck_sections
 from .builders import LiquidTransferStep
 from .params import AspirateParameters
 from .params import DispenseParameters
@@ -28,8 +31,8 @@ class MultiDispense(LiquidTransferStep):
     type = "RepeatDispense"
     source: PipettingLocation
     """The source labware to aspirate from."""
-    destinations: list[tuple[PipettingLocation, Volume]]
-    """The destinations and volumes to dispense."""
+    destinations: list[tuple[PipettingLocation, Volume]] = Field(min_length=1)
+    """The destinations and volumes to dispense, in the order to dispense them (all served by a single aspiration)."""
     reverse_pipetting_volume: float = 0
     """The volume to aspirate prior to any volume planned to be dispensed."""
     pre_dispense_volume: float = 0
@@ -41,25 +44,21 @@ class MultiDispense(LiquidTransferStep):
     # TODO: implement variable dispense heights for each dispense
     tip_change_mode: TipChangeMode = TipChangeMode.AFTER_STEP
 
+    @property
+    @override
+    def revision(self) -> tuple[object, ...]:
+        return (*super().revision, tuple(self.destinations))
+
     @override
     def _add_value_groups(self) -> None:
-        # TODO: support multiple dispenses
-        assert len(self.destinations) == 1, "Only single destination transfers are supported at this time."
         source_deck_section_model = DeckSection(
             deck_section=self.source.deck_section_index,
             sub_section=-1,  # TODO: figure out what subsection means
         )
-        source_deck_section = source_deck_section_model.model_dump(by_alias=True)
-        destination_deck_section_model = DeckSection(
-            deck_section=self.destinations[0][0].deck_section_index, sub_section=-1
-        )
-        destination_deck_section = destination_deck_section_model.model_dump(by_alias=True)
-        source_well = WellRowCol(column_index=self.source.column_index, row_index=0).model_dump(
-            by_alias=True
-        )  # TODO: handle row index
-        destination_well = WellRowCol(column_index=self.destinations[0][0].column_index, row_index=0).model_dump(
-            by_alias=True
-        )  # TODO: handle row index
+        source_deck_section = source_deck_section_model.dump_by_alias()
+        source_well = WellRowCol(
+            column_index=self.source.column_index, row_index=self.source.upper_left_row_index
+        ).dump_by_alias()
         source_info: list[dict[str, Any]] = [
             {
                 "Wells": [source_well],
@@ -68,48 +67,64 @@ class MultiDispense(LiquidTransferStep):
                 **WORKING_DIRECTION_KWARGS,
             }
         ]
-        target_info: list[dict[str, Any]] = [
-            {
-                "Wells": [destination_well],
-                **destination_deck_section,
-                "Spacing": mm_to_xml(self._pipette_span(self.destinations[0][0].labware)),
-                **WORKING_DIRECTION_KWARGS,
-            }
-        ]
+        destination_wells: list[WellInSection] = []
+        destination_deck_section_models: dict[int, DeckSection] = {}
+        # Vialab groups the selected wells by the deck section (and spacing) they are in
+        target_info_by_section: dict[tuple[int, int], dict[str, Any]] = {}
+        for destination, _ in self.destinations:
+            deck_section_model = destination_deck_section_models.setdefault(
+                destination.deck_section_index, DeckSection(deck_section=destination.deck_section_index, sub_section=-1)
+            )
+            deck_section = deck_section_model.dump_by_alias()
+            well = WellRowCol(
+                column_index=destination.column_index, row_index=destination.upper_left_row_index
+            ).dump_by_alias()
+            destination_wells.append((well, deck_section))
+            spacing = mm_to_xml(self._pipette_span(destination.labware))
+            target_info_by_section.setdefault(
+                (destination.deck_section_index, spacing),
+                {"Wells": [], **deck_section, "Spacing": spacing, **WORKING_DIRECTION_KWARGS},
+            )["Wells"].append(well)
+        destination_deck_sections = unique_deck_sections(destination_wells)
         # pylint:disable=duplicate-code # This seems decently DRY...there's just a bit of similarity between steps...which might disappear as more values are parametrized
         self._add_location_group(
-            location=Location.SOURCE, well_info=source_info, deck_section=source_deck_section_model
+            location=Location.SOURCE, well_info=source_info, deck_sections=[source_deck_section_model]
         )
         self._add_location_group(
-            location=Location.DESTINATION, well_info=target_info, deck_section=destination_deck_section_model
+            location=Location.DESTINATION,
+            well_info=list(target_info_by_section.values()),
+            deck_sections=list(destination_deck_section_models.values()),
         )
 
         self._add_value_group(
             group_name="Pipetting",
             values=[
                 ("ExtraVolumePercentage", str(0)),
-                ("NumberOfReactions", str(1)),  # TODO: handle multiple transfers in a single Step
+                ("NumberOfReactions", str(1)),
                 (
                     "DispenseVolume",
-                    json.dumps(
+                    json_dumps(
                         [
                             {
-                                "Well": destination_well,
-                                **destination_deck_section,
+                                "Well": well,
+                                **deck_section,
                                 # pylint:enable=duplicate-code
-                                "Volume": ul_to_xml(self.destinations[0][1]),
+                                "Volume": ul_to_xml(volume),
                                 "TipID": self.tip_id,
                                 "Multiplier": 1,
                                 "TotalVolume": ul_to_xml(
-                                    self.destinations[0][1]
+                                    volume
                                 ),  # TODO: figure out when/if this needs to differ from Volume
                             }
+                            for (well, deck_section), (_, volume) in zip(
+                                destination_wells, self.destinations, strict=True
+                            )
                         ]
                     ),
                 ),
                 (
                     "TipTypePipettingConfiguration",
-                    json.dumps(
+                    json_dumps(
                         [
                             {
                                 "FirstDispenseVolume": ul_to_xml(self.pre_dispense_volume),
@@ -125,27 +140,26 @@ class MultiDispense(LiquidTransferStep):
                 ),
                 ("AspirationDelay", str(self.aspirate_parameters.post_delay)),
                 ("DispenseDelay", str(self.dispense_parameters.post_delay)),
-                ("KeepPostDispense", json.dumps(obj=True)),
-                ("LastDispenseType", json.dumps(obj=True)),
+                ("KeepPostDispense", json_dumps(obj=True)),
+                ("LastDispenseType", json_dumps(obj=True)),
                 # pylint:disable=duplicate-code # This seems decently DRY...there's just a bit of similarity between steps...which might disappear as more values are parametrized
                 ("LastAspirationBackTo", '"Common_No"'),
-                ("VolumeConfigType", json.dumps(obj=False)),  # TODO: figure out what this means
-                ("DispenseType", json.dumps(obj=True)),  # TODO: figure out what this means
-                ("SlowLiquidExitAsp", json.dumps(obj=False)),
-                ("SlowLiquidExitDisp", json.dumps(obj=False)),
+                ("VolumeConfigType", json_dumps(obj=False)),  # TODO: figure out what this means
+                ("DispenseType", json_dumps(obj=True)),  # TODO: figure out what this means
+                ("SlowLiquidExitAsp", json_dumps(obj=False)),
+                ("SlowLiquidExitDisp", json_dumps(obj=False)),
             ],
         )
         self._add_value_group(
             group_name="Aspiration",
             values=[
                 self._create_heights_value_tuple(
-                    well_info=source_well,
-                    deck_section_info=source_deck_section,
+                    wells=[(source_well, source_deck_section)],
                     start_height=self.aspirate_parameters.start_height,
                 ),
-                ("TipTravel", json.dumps(obj=False)),
+                ("TipTravel", json_dumps(obj=False)),
                 *self._create_height_config_value_tuples(
-                    deck_section_info=source_deck_section,
+                    deck_section_infos=[source_deck_section],
                 ),
             ],
         )
@@ -153,25 +167,20 @@ class MultiDispense(LiquidTransferStep):
             group_name="Dispense",
             values=[
                 self._create_heights_value_tuple(
-                    well_info=destination_well,
-                    deck_section_info=destination_deck_section,
+                    wells=destination_wells,
                     start_height=self.dispense_parameters.start_height,
                 ),
-                ("TipTravel", json.dumps(obj=False)),
+                ("TipTravel", json_dumps(obj=False)),
                 *self._create_height_config_value_tuples(
-                    deck_section_info=destination_deck_section,
+                    deck_section_infos=destination_deck_sections,
                 ),
             ],
         )
         self._add_tips_value_group()
-        self._add_mix_group(
-            mix_location=MixLocation.SOURCE, well_info=source_well, deck_section_info=source_deck_section
-        )
-        self._add_mix_group(
-            mix_location=MixLocation.DESTINATION, well_info=destination_well, deck_section_info=destination_deck_section
-        )
+        self._add_mix_group(mix_location=MixLocation.SOURCE, wells=[(source_well, source_deck_section)])
+        self._add_mix_group(mix_location=MixLocation.DESTINATION, wells=destination_wells)
 
-        self._add_tip_touch_target_group(destination_deck_section)
+        self._add_tip_touch_target_group(destination_deck_sections)
 
         self._add_various_value_group()
 
@@ -1,9 +1,10 @@
-import json
+from collections.abc import Callable
 from typing import Any
 from typing import override
 
 from pydantic import Field
 
+from pyalab.json_backend import json_dumps
 from pyalab.plate import Labware
 
 from .base import Section
@@ -13,7 +14,6 @@ from .base import ul_to_xml
 from .builders import StepWithPipetteSpan
 
 
-# TODO: add ability during program generation to collapse consecutive SetVolume steps into a single step.  If there are descriptions, then maybe stop the collapse and create a new step so distinct descriptions are preserved
 class SetVolume(StepWithPipetteSpan):
     """Specify the volume of liquid in the labware.
 
@@ -24,7 +24,7 @@ class SetVolume(StepWithPipetteSpan):
     labware: Labware
     """The plate to set the volume for."""
     section_index: int | None = None
-    """The section of the Deck holding the plate."""
+    """The section of the Deck holding the plate (looked up from the Program's deck layouts if not provided)."""
     column_index: int
     """The column within the plate to set the volume for."""
     row_index: int | None = None
@@ -34,37 +34,59 @@ class SetVolume(StepWithPipetteSpan):
     """
     volume: float = Field(ge=0)
     """The specified volume (µl)."""
+    merged_steps: list["SetVolume"] = Field(default_factory=list)  # type: ignore[reportUnknownVariableType] # bug in pyright 1.1.400ish is causing default_factory=list to no longer work
+    """Other steps of the same type whose volumes are set as part of this step (see `Program.collapse_set_volume_steps`)."""
 
+    @property
     @override
-    def _add_value_groups(self) -> None:
-        assert self.section_index is not None, "section_index must be set prior to creating XML"
-        well = WellRowCol(
-            column_index=self.column_index,
-            row_index=0 if self.row_index is None else self.row_index,
-        )
-        deck_section = Section(
-            section=self.section_index,
-            sub_section=-1,  # TODO: figure out what subsection means
+    def revision(self) -> tuple[object, ...]:
+        return (
+            *super().revision,
+            tuple(self.merged_steps),
+            *(revision for step in self.merged_steps for revision in step.revision),
         )
-        volume_info: list[dict[str, Any]] = [
-            {
-                "WellCoordinates": [
-                    well.model_dump(by_alias=True),
-                ],
-                "Volume": ul_to_xml(self.volume),
-                **deck_section.model_dump(by_alias=True),
-                "Spacing": mm_to_xml(
-                    self.labware.row_spacing_in_xml if self.pipette.is_d_one else self._pipette_span(self.labware)
-                ),
-                "ColorIndex": 1,  # TODO: figure out if/when this changes
-                "DeckId": "00000000-0000-0000-0000-000000000000",  # TODO: figure out if this has any meaning
-            }
-        ]
+
+    @override
+    def resolve_section_indexes(self, get_section_index: Callable[[Labware], int]) -> None:
+        self._resolve_section_index("section_index", self.labware, get_section_index)
+        for step in self.merged_steps:
+            step.resolve_section_indexes(get_section_index)
+
+    @override
+    def _add_value_groups(self) -> None:
+        # wells with the same section, volume and spacing share a single entry
+        volume_info_by_group: dict[tuple[int, int, int], dict[str, Any]] = {}
+        for step in (self, *self.merged_steps):
+            assert step.section_index is not None, "section_index must be set prior to creating XML"
+            well = WellRowCol(
+                column_index=step.column_index,
+                row_index=0 if step.row_index is None else step.row_index,
+            )
+            deck_section = Section(
+                section=step.section_index,
+                sub_section=-1,  # TODO: figure out what subsection means
+            )
+            volume = ul_to_xml(step.volume)
+            spacing = mm_to_xml(
+                step.labware.row_spacing_in_xml if self.pipette.is_d_one else step._pipette_span(step.labware)  # noqa: SLF001 # the merged steps are the same class
+            )
+            volume_info_by_group.setdefault(
+                (step.section_index, volume, spacing),
+                {
+                    "WellCoordinates": [],
+                    "Volume": volume,
+                    **deck_section.dump_by_alias(),
+                    "Spacing": spacing,
+                    "ColorIndex": 1,  # TODO: figure out if/when this changes
+                    "DeckId": "00000000-0000-0000-0000-000000000000",  # TODO: figure out if this has any meaning
+                },
+            )["WellCoordinates"].append(well.dump_by_alias())
+        volume_info = list(volume_info_by_group.values())
 
         self._add_value_group(
             group_name="ManualVolume",
             values=[
-                ("ManualVolume", json.dumps(volume_info)),
+                ("ManualVolume", json_dumps(volume_info)),
                 ("MessageType", "null"),
                 ("Message1", "null"),
                 ("Message2", "null"),
@@ -1,15 +1,19 @@
-import json
+from collections.abc import Callable
 from typing import Any
 from typing import override
 
+from pydantic import BaseModel
 from pydantic import Field
 
+from pyalab.json_backend import json_dumps
+from pyalab.plate import Labware
 from pyalab.plate import Plate
 
 from .base import WORKING_DIRECTION_KWARGS
 from .base import DeckSection
 from .base import Location
 from .base import MixLocation
+from .base import WellInSection
 from .base import WellRowCol
 from .base import mm_to_xml
 from .base import ul_to_xml
@@ -19,8 +23,28 @@ from .params import DispenseParameters
 from .params import TipChangeMode
 
 
+class InvalidTransferWellsError(Exception):
+    def __init__(self):
+        super().__init__(
+            "A Transfer must be given either a source_column_index and destination_column_index, or a non-empty list of well_pairs (but not both)"
+        )
+
+
+class TransferWellPair(BaseModel, frozen=True):
+    """A source well and the destination well to transfer it into."""
+
+    source_column_index: int
+    """The column index to aspirate from."""
+    source_row_index: int = 0  # don't change from zero unless using a D-One pipette
+    """The row index to aspirate from."""
+    destination_column_index: int
+    """The column index to dispense into."""
+    destination_row_index: int = 0  # don't change from zero unless using a D-One pipette
+    """The row index to dispense into."""
+
+
 class Transfer(LiquidTransferStep):
-    """Simple transfer from one column to another."""
+    """Transfer from one or more columns (or wells) to others, as a single step."""
 
     type = "Transfer"
     source: Plate
@@ -28,19 +52,21 @@ class Transfer(LiquidTransferStep):
     destination: Plate
     """The destination plate to dispense into."""
     source_section_index: int | None = None
-    """The section index on the Deck of the source plate."""
-    source_column_index: int
-    """The column index to aspirate from."""
+    """The section index on the Deck of the source plate (looked up from the Program's deck layouts if not provided)."""
+    source_column_index: int | None = None
+    """The column index to aspirate from (when transferring a single column)."""
     source_row_index: int = 0  # don't change from zero unless using a D-One pipette
     """The row index to aspirate from."""
     destination_section_index: int | None = None
-    """The section index on the Deck of the destination plate."""
-    destination_column_index: int
-    """The column index to dispense into."""
+    """The section index on the Deck of the destination plate (looked up from the Program's deck layouts if not provided)."""
+    destination_column_index: int | None = None
+    """The column index to dispense into (when transferring a single column)."""
     destination_row_index: int = 0  # don't change from zero unless using a D-One pipette
     """The row index to dispense into."""
+    well_pairs: list[TransferWellPair] = Field(default_factory=list)  # type: ignore[reportUnknownVariableType] # bug in pyright 1.1.400ish is causing default_factory=list to no longer work
+    """The source and destination wells to transfer between, in order (instead of a single column index)."""
     volume: float
-    """The volume to transfer (µl)."""
+    """The volume to transfer into each destination (µl)."""
     aspirate_parameters: AspirateParameters = Field(default_factory=AspirateParameters)
     """The parameters for aspirating the liquid."""
     dispense_parameters: DispenseParameters = Field(default_factory=DispenseParameters)
@@ -48,6 +74,43 @@ class Transfer(LiquidTransferStep):
 
     tip_change_mode: TipChangeMode = TipChangeMode.MODE_A  # for now this is basically a class attribute that shouldn't be altered, but pyright complained about that. it's possible it actually is something that can be varied in a Transfer Step...TBD
 
+    @override
+    def model_post_init(self, _: Any) -> None:
+        has_single_column = self.source_column_index is not None and self.destination_column_index is not None
+        has_no_single_column = self.source_column_index is None and self.destination_column_index is None
+        if not ((has_single_column and not self.well_pairs) or (has_no_single_column and self.well_pairs)):
+            raise InvalidTransferWellsError
+
+    @property
+    def well_pairs_to_transfer(self) -> list[TransferWellPair]:
+        if self.well_pairs:
+            return self.well_pairs
+        assert self.source_column_index is not None
+        assert self.destination_column_index is not None
+        return [
+            TransferWellPair(
+                source_column_index=self.source_column_index,
+                source_row_index=self.source_row_index,
+                destination_column_index=self.destination_column_index,
+                destination_row_index=self.destination_row_index,
+            )
+        ]
+
+    @property
+    @override
+    def number_of_reactions(self) -> int:
+        return len(self.well_pairs_to_transfer)
+
+    @property
+    @override
+    def revision(self) -> tuple[object, ...]:
+        return (*super().revision, tuple(self.well_pairs))
+
+    @override
+    def resolve_section_indexes(self, get_section_index: Callable[[Labware], int]) -> None:
+        self._resolve_section_index("source_section_index", self.source, get_section_index)
+        self._resolve_section_index("destination_section_index", self.destination, get_section_index)
+
     @override
     def _add_value_groups(self) -> None:
         assert self.source_section_index is not None, "Source section index must be set prior to creating XML"
@@ -56,18 +119,25 @@ class Transfer(LiquidTransferStep):
             deck_section=self.source_section_index,
             sub_section=-1,  # TODO: figure out what subsection means
         )
-        source_deck_section = source_deck_section_model.model_dump(by_alias=True)
+        source_deck_section = source_deck_section_model.dump_by_alias()
         destination_deck_section_model = DeckSection(deck_section=self.destination_section_index, sub_section=-1)
-        destination_deck_section = destination_deck_section_model.model_dump(by_alias=True)
-        source_well = WellRowCol(column_index=self.source_column_index, row_index=self.source_row_index).model_dump(
-            by_alias=True
-        )
-        destination_well = WellRowCol(
-            column_index=self.destination_column_index, row_index=self.destination_row_index
-        ).model_dump(by_alias=True)
+        destination_deck_section = destination_deck_section_model.dump_by_alias()
+        well_pairs = self.well_pairs_to_transfer
+        source_wells = [
+            WellRowCol(column_index=pair.source_column_index, row_index=pair.source_row_index).dump_by_alias()
+            for pair in well_pairs
+        ]
+        destination_wells = [
+            WellRowCol(column_index=pair.destination_column_index, row_index=pair.destination_row_index).dump_by_alias()
+            for pair in well_pairs
+        ]
+        source_wells_in_section: list[WellInSection] = [(well, source_deck_section) for well in source_wells]
+        destination_wells_in_section: list[WellInSection] = [
+            (well, destination_deck_section) for well in destination_wells
+        ]
         source_info: list[dict[str, Any]] = [
             {
-                "Wells": [source_well],
+                "Wells": source_wells,
                 **source_deck_section,
                 "Spacing": mm_to_xml(
                     self.source.row_spacing()
@@ -77,7 +147,7 @@ class Transfer(LiquidTransferStep):
         ]
         target_info: list[dict[str, Any]] = [
             {
-                "Wells": [destination_well],
+                "Wells": destination_wells,
                 **destination_deck_section,
                 "Spacing": mm_to_xml(
                     self.destination.row_spacing()
@@ -87,20 +157,20 @@ class Transfer(LiquidTransferStep):
         ]
         # pylint:disable=duplicate-code # This seems decently DRY...there's just a bit of similarity between steps...which might disappear as more values are parametrized
         self._add_location_group(
-            location=Location.SOURCE, well_info=source_info, deck_section=source_deck_section_model
+            location=Location.SOURCE, well_info=source_info, deck_sections=[source_deck_section_model]
         )
         self._add_location_group(
-            location=Location.DESTINATION, well_info=target_info, deck_section=destination_deck_section_model
+            location=Location.DESTINATION, well_info=target_info, deck_sections=[destination_deck_section_model]
         )
 
         self._add_value_group(
             group_name="Pipetting",
             values=[
                 ("ExtraVolumePercentage", str(0)),
-                ("NumberOfReactions", str(1)),  # TODO: handle multiple transfers in a single Step
+                ("NumberOfReactions", str(self.number_of_reactions)),
                 (
                     "DispenseVolume",
-                    json.dumps(
+                    json_dumps(
                         [
                             {
                                 "Well": destination_well,
@@ -113,48 +183,48 @@ class Transfer(LiquidTransferStep):
                                     self.volume
                                 ),  # TODO: figure out when/if this needs to differ from Volume
                             }
+                            for destination_well in destination_wells
                         ]
                     ),
                 ),
                 (
                     "TipTypePipettingConfiguration",
-                    json.dumps(
+                    json_dumps(
                         [
                             {
                                 "FirstDispenseVolume": 0,
                                 "LastDispenseVolume": 0,
                                 "Airgap": False,
                                 "AirgapVolume": 0,
-                                "AspirationSpeed": 8,
-                                "DispenseSpeed": 8,
+                                "AspirationSpeed": self.aspirate_parameters.liquid_speed,
+                                "DispenseSpeed": self.dispense_parameters.liquid_speed,
                                 "TipID": self.tip_id,
                             }
                         ]
                     ),
                 ),
-                ("AspirationDelay", str(0)),
-                ("DispenseDelay", str(0)),
-                ("KeepPostDispense", json.dumps(obj=False)),
+                ("AspirationDelay", str(self.aspirate_parameters.post_delay)),
+                ("DispenseDelay", str(self.dispense_parameters.post_delay)),
+                ("KeepPostDispense", json_dumps(obj=False)),
                 # pylint:disable=duplicate-code # This seems decently DRY...there's just a bit of similarity between steps...which might disappear as more values are parametrized
-                ("LastDispenseType", json.dumps(obj=True)),
+                ("LastDispenseType", json_dumps(obj=True)),
                 ("LastAspirationBackTo", '"Common_No"'),
-                ("VolumeConfigType", json.dumps(obj=True)),
-                ("DispenseType", json.dumps(obj=False)),
-                ("SlowLiquidExitAsp", json.dumps(obj=False)),
-                ("SlowLiquidExitDisp", json.dumps(obj=False)),
+                ("VolumeConfigType", json_dumps(obj=True)),
+                ("DispenseType", json_dumps(obj=False)),
+                ("SlowLiquidExitAsp", json_dumps(obj=False)),
+                ("SlowLiquidExitDisp", json_dumps(obj=False)),
             ],
         )
         self._add_value_group(
             group_name="Aspiration",
             values=[
                 self._create_heights_value_tuple(
-                    well_info=source_well,
-                    deck_section_info=source_deck_section,
+                    wells=source_wells_in_section,
                     start_height=self.aspirate_parameters.start_height,
                 ),
-                ("TipTravel", json.dumps(obj=False)),
+                ("TipTravel", json_dumps(obj=False)),
                 *self._create_height_config_value_tuples(
-                    deck_section_info=source_deck_section,
+                    deck_section_infos=[source_deck_section],
                 ),
             ],
         )
@@ -162,25 +232,20 @@ class Transfer(LiquidTransferStep):
             group_name="Dispense",
             values=[
                 self._create_heights_value_tuple(
-                    well_info=destination_well,
-                    deck_section_info=destination_deck_section,
+                    wells=destination_wells_in_section,
                     start_height=self.dispense_parameters.start_height,
                 ),
-                ("TipTravel", json.dumps(obj=False)),
+                ("TipTravel", json_dumps(obj=False)),
                 *self._create_height_config_value_tuples(
-                    deck_section_info=destination_deck_section,
+                    deck_section_infos=[destination_deck_section],
                 ),
             ],
         )
         self._add_tips_value_group()
-        self._add_mix_group(
-            mix_location=MixLocation.SOURCE, well_info=source_well, deck_section_info=source_deck_section
-        )
-        self._add_mix_group(
-            mix_location=MixLocation.DESTINATION, well_info=destination_well, deck_section_info=destination_deck_section
-        )
+        self._add_mix_group(mix_location=MixLocation.SOURCE, wells=source_wells_in_section)
+        self._add_mix_group(mix_location=MixLocation.DESTINATION, wells=destination_wells_in_section)
 
-        self._add_tip_touch_target_group(destination_deck_section)
+        self._add_tip_touch_target_group([destination_deck_section])
 
         self._add_various_value_group()
 
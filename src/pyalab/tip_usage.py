@@ -0,0 +1,61 @@
+import math
+from collections.abc import Iterable
+
+from pydantic import BaseModel
+
+from .pipette import Pipette
+from .steps import Step
+from .steps import TipChangeMode
+from .steps.builders import LiquidTransferStep
+
+TIPS_PER_BOX = 96  # TODO: handle 384 tip boxes
+
+
+class TipUsage(BaseModel, frozen=True):
+    tips: dict[int, int]
+    """The number of tips of each type used by the program, keyed by tip ID."""
+    tips_per_box: int = TIPS_PER_BOX
+    """The number of tips in each box."""
+
+    @property
+    def tip_boxes(self) -> dict[int, int]:
+        """The number of boxes of each type of tip needed to run the program, keyed by tip ID."""
+        return {tip_id: math.ceil(num_tips / self.tips_per_box) for tip_id, num_tips in self.tips.items()}
+
+
+class TipUsageCounter:
+    """Count the tips picked up by a sequence of steps, one step at a time.
+
+    Tips stay on the pipette between steps when the tip change mode is `NO_CHANGE`, and are ejected at the end of a
+    step for `AFTER_STEP`. Each pick up uses a tip for every channel of the pipette.
+
+    What Vialab does for `MODE_A` hasn't been confirmed. It is assumed to change tips for every reaction (e.g. each
+    well pair of a Transfer, which uses this mode by default), so the count for those steps may be too high.
+    """
+
+    def __init__(self, *, pipette: Pipette):
+        super().__init__()
+        self._tips_per_pick_up = pipette.num_channels
+        self._tips: dict[int, int] = {}
+        self._loaded_tip_id: int | None = None
+
+    def add_step(self, step: Step) -> int:
+        """Count the tips the step uses, returning the number of times tips are picked up during it."""
+        if not isinstance(step, LiquidTransferStep):
+            return 0
+        tip_id = step.tip_id
+        num_pick_ups = step.number_of_reactions if step.tip_change_mode == TipChangeMode.MODE_A else 1
+        if self._loaded_tip_id == tip_id:
+            num_pick_ups -= 1  # the first reaction uses the tips already on the pipette
+        if num_pick_ups > 0:
+            self._tips[tip_id] = self._tips.get(tip_id, 0) + num_pick_ups * self._tips_per_pick_up
+        self._loaded_tip_id = tip_id if step.tip_change_mode == TipChangeMode.NO_CHANGE else None
+        return num_pick_ups
+
+    def add_steps(self, steps: Iterable[Step]) -> None:
+        for step in steps:
+            _ = self.add_step(step)
+
+    @property
+    def usage(self) -> TipUsage:
+        return TipUsage(tips=dict(self._tips))
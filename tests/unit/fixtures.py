@@ -2,6 +2,7 @@ import random
 import uuid
 from pathlib import Path
 from tempfile import TemporaryDirectory
+from typing import override
 
 import pytest
 from syrupy.assertion import SnapshotAssertion
@@ -10,14 +11,27 @@ from pyalab import Deck
 from pyalab import DeckLayout
 from pyalab import DeckPosition
 from pyalab import DOneTips
+from pyalab import IdProvider
 from pyalab import LabwareOrientation
 from pyalab import Pipette
 from pyalab import Plate
 from pyalab import Program
+from pyalab import RandomIds
 from pyalab import StandardDeckNames
+from pyalab import Step
 from pyalab import Tip
 
 
+class NonLiquidStep(Step):
+    """A step that doesn't move any liquid."""
+
+    type = "NonLiquid"
+
+    @override
+    def _add_value_groups(self) -> None:
+        pass
+
+
 class ProgramSnapshot:
     @pytest.fixture(autouse=True)
     def _setup(self, snapshot_xml: SnapshotAssertion):
@@ -27,7 +41,7 @@ class ProgramSnapshot:
 def generate_xml_str(program: Program) -> str:
     with TemporaryDirectory() as temp_dir:
         file_path = Path(temp_dir) / f"{uuid.uuid1()}.iaa"
-        program.save_program(file_path)
+        _ = program.save_program(file_path)
         return file_path.read_text()
 
 
@@ -54,3 +68,20 @@ def arbitrary_d_one_program_framework() -> Program:
             position_2=Tip(name="300 µl GripTip Sterile Filter"),
         ),
     )
+
+
+def arbitrary_eight_channel_program_framework(id_provider: IdProvider | None = None) -> Program:
+    pcr_plate = Plate(name="BIO-RAD Hard-Shell 96-Well Skirted PCR Plates", display_name="PCR Plate")
+    return Program(
+        display_name="arbitrary",
+        deck_layouts=[
+            DeckLayout(
+                deck=Deck(name=StandardDeckNames.THREE_POSITION.value),
+                labware={DeckPosition(name="B", orientation=LabwareOrientation.A1_NW_CORNER): pcr_plate},
+            )
+        ],
+        description="arbitrary",
+        pipette=Pipette(name="VOYAGER EIGHT 300 µl"),  # arbitrary
+        tip=Tip(name="300 µl GripTip Sterile Filter Low retention"),  # arbitrary
+        id_provider=RandomIds() if id_provider is None else id_provider,
+    )
@@ -1,3 +1,4 @@
+import json
 from typing import Any
 
 import pytest
@@ -11,6 +12,7 @@ from pyalab import LabwareOrientation
 from pyalab import MultiDispense
 from pyalab import Pipette
 from pyalab import PipettingLocation
+from pyalab import Plate
 from pyalab import Program
 from pyalab import SetInitialVolume
 from pyalab import StandardDeckNames
@@ -20,6 +22,7 @@ from pyalab import TipChangeMode
 from ..constants import GENERIC_96_DEEP_WELL_PLATE
 from ..constants import GENERIC_RESERVOIR
 from ..fixtures import ProgramSnapshot
+from ..fixtures import arbitrary_d_one_program_framework
 from ..fixtures import generate_xml_str
 
 
@@ -58,6 +61,17 @@ class TestMultiDispenseProgramSnapshots(ProgramSnapshot):
                 9,
                 id="arbitrary1",
             ),
+            pytest.param(
+                0,
+                [(5, 20), (6, 25), (7, 30.5)],
+                None,
+                None,
+                None,
+                None,
+                None,
+                None,
+                id="multiple-destinations",
+            ),
         ],
     )
     def test_arbitrary_params(  # noqa: PLR0913 # this is a lot of arguments to parametrize, but it makes it more efficient to not generate a bunch of separate snapshot files
@@ -215,3 +229,99 @@ class TestMultiDispenseProgramSnapshots(ProgramSnapshot):
         )
 
         assert generate_xml_str(program) == self.snapshot_xml
+
+
+class TestMultipleDestinationSections:
+    @pytest.fixture(autouse=True)
+    def _setup(self):
+        self.source_plate = GENERIC_96_DEEP_WELL_PLATE
+        self.destination_plate = Plate(name="BIO-RAD Hard-Shell 96-Well Skirted PCR Plates", display_name="PCR Plate")
+        program = Program(
+            deck_layouts=[
+                DeckLayout(
+                    deck=Deck(name=StandardDeckNames.THREE_POSITION.value),
+                    labware={
+                        DeckPosition(name="B", orientation=LabwareOrientation.A1_NW_CORNER): self.source_plate,
+                        DeckPosition(name="C", orientation=LabwareOrientation.A1_NW_CORNER): self.destination_plate,
+                    },
+                )
+            ],
+            display_name="arbitrary",
+            description="arbitrary description",
+            pipette=Pipette(name="VOYAGER EIGHT 300 µl"),
+            tip=Tip(name="300 µl GripTip Sterile Filter Low retention"),
+        )
+        self.source_section_index = program.get_section_index_for_labware(self.source_plate)
+        self.destination_section_index = program.get_section_index_for_labware(self.destination_plate)
+
+        def location(labware: Plate, section_index: int, column_index: int) -> PipettingLocation:
+            return PipettingLocation(
+                labware=labware, deck_section_index=section_index, column_index=column_index, upper_left_row_index=0
+            )
+
+        step = MultiDispense(
+            source=location(self.source_plate, self.source_section_index, 0),
+            destinations=[
+                (location(self.destination_plate, self.destination_section_index, 1), 10),
+                (location(self.source_plate, self.source_section_index, 2), 20),
+                (location(self.destination_plate, self.destination_section_index, 3), 30),
+            ],
+        )
+        program.add_step(step)
+        step_xml = step.create_xml_for_program()
+        self.values = {
+            (group.get("Key"), value.get("Key")): json.loads(value.text)
+            for group in step_xml.iter("ValueGroup")
+            for value in group.iter("Value")
+            if value.text is not None and value.text.startswith("[")
+        }
+
+    def test_Then_destination_wells_grouped_by_deck_section(self):
+        actual = self.values[("Target", "MultiSelection")]
+
+        assert [(info["DeckSection"], [well["Item1"] for well in info["Wells"]]) for info in actual] == [
+            (self.destination_section_index, [1, 3]),
+            (self.source_section_index, [2]),
+        ]
+
+    def test_Then_one_dispense_volume_and_height_per_destination(self):
+        assert [
+            (entry["DeckSection"], entry["Well"]["Item1"], entry["Volume"])
+            for entry in self.values[("Pipetting", "DispenseVolume")]
+        ] == [
+            (self.destination_section_index, 1, 1000),
+            (self.source_section_index, 2, 2000),
+            (self.destination_section_index, 3, 3000),
+        ]
+        assert [entry["Well"]["Item1"] for entry in self.values[("Dispense", "Heights")]] == [1, 2, 3]
+
+    def test_Then_section_level_settings_once_per_deck_section(self):
+        expected = [self.destination_section_index, self.source_section_index]
+
+        assert [entry["DeckSection"] for entry in self.values[("Dispense", "SectionHeightConfig")]] == expected
+        assert [entry["DeckSection"] for entry in self.values[("TipTouchTarget", "SectionTipTouch")]] == expected
+        assert [entry["DeckSection"] for entry in self.values[("Target", "WellOffsets")]] == expected
+
+
+def test_Given_d_one_locations_in_other_rows__Then_their_rows_in_xml():
+    program = arbitrary_d_one_program_framework()
+    plate = program.deck_layouts[0].labware[DeckPosition(name="B", orientation=LabwareOrientation.A1_NW_CORNER)]
+    section_index = program.get_section_index_for_labware(plate)
+
+    def location(column_index: int, row_index: int) -> PipettingLocation:
+        return PipettingLocation(
+            labware=plate, deck_section_index=section_index, column_index=column_index, upper_left_row_index=row_index
+        )
+
+    step = MultiDispense(source=location(0, 2), destinations=[(location(1, 3), 10), (location(1, 5), 20)])
+    program.add_step(step)
+
+    step_xml = step.create_xml_for_program()
+
+    def wells(group_name: str) -> list[tuple[int, int]]:
+        text = step_xml.findtext(f"./ValueGroups/ValueGroup[@Key='{group_name}']/Values/Value[@Key='MultiSelection']")
+        assert text is not None
+        return [(well["Item1"], well["Item2"]) for info in json.loads(text) for well in info["Wells"]]
+
+    assert wells("Source") == [(0, 2)]
+    assert wells("Target") == [(1, 3), (1, 5)]
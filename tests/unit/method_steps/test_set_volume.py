@@ -14,7 +14,9 @@ from pyalab import Program
 from pyalab import SetInitialVolume
 from pyalab import SetVolume
 from pyalab import StandardDeckNames
+from pyalab import Step
 from pyalab import Tip
+from pyalab import Transfer
 
 from ..constants import GENERIC_RESERVOIR
 from ..fixtures import ProgramSnapshot
@@ -119,3 +121,91 @@ class TestDOneSetVolume(ProgramSnapshot):
         )
 
         assert generate_xml_str(program) == self.snapshot_xml
+
+
+class TestCollapseSetVolumeSteps(ProgramSnapshot):
+    @pytest.fixture(autouse=True)
+    def _setup_program(self):
+        self.plate = Plate(name="BIO-RAD Hard-Shell 96-Well Skirted PCR Plates", display_name="PCR Plate")
+        self.program = Program(
+            deck_layouts=[
+                DeckLayout(
+                    deck=Deck(name=StandardDeckNames.THREE_POSITION.value),
+                    labware={DeckPosition(name="B", orientation=LabwareOrientation.A1_NW_CORNER): self.plate},
+                )
+            ],
+            display_name="arbitrary",
+            description="arbitrary",
+            pipette=Pipette(name="VOYAGER EIGHT 300 µl"),  # arbitrary
+            tip=Tip(name="300 µl GripTip Sterile Filter Low retention"),  # arbitrary
+        )
+
+    def test_Given_full_plate_of_initial_volumes__When_collapsed__Then_snapshot_matches(self):
+        for column_index, volume in enumerate([100] * 6 + [50] * 6):
+            self.program.add_step(SetInitialVolume(labware=self.plate, column_index=column_index, volume=volume))
+
+        actual = self.program.collapse_set_volume_steps()
+
+        assert actual == 11  # noqa: PLR2004 # all but the first step were merged into it
+        assert generate_xml_str(self.program) == self.snapshot_xml
+
+    def test_Given_step_type_changes__Then_merging_stops(self):
+        first_step = SetInitialVolume(labware=self.plate, column_index=0, volume=100)
+        steps: list[Step] = [
+            first_step,
+            SetInitialVolume(labware=self.plate, column_index=1, volume=100),
+            SetVolume(labware=self.plate, column_index=2, volume=100),
+            SetVolume(labware=self.plate, column_index=3, volume=100),
+            Transfer(
+                source=self.plate, source_column_index=0, destination=self.plate, destination_column_index=4, volume=5
+            ),
+            SetVolume(labware=self.plate, column_index=5, volume=100),
+        ]
+        for step in steps:
+            self.program.add_step(step)
+
+        actual = self.program.collapse_set_volume_steps()
+
+        assert actual == 2  # noqa: PLR2004 # one SetInitialVolume and one SetVolume merged
+        assert [type(step) for step in self.program.steps] == [SetInitialVolume, SetVolume, Transfer, SetVolume]
+        collapsed_step = self.program.steps[0]
+        assert isinstance(collapsed_step, SetVolume)
+        assert [step.column_index for step in (collapsed_step, *collapsed_step.merged_steps)] == [0, 1]
+        assert first_step.merged_steps == []
+
+    def test_Given_same_well_set_twice__Then_new_step_started(self):
+        for column_index in (0, 1, 0, 2):
+            self.program.add_step(SetVolume(labware=self.plate, column_index=column_index, volume=column_index))
+
+        actual = self.program.collapse_set_volume_steps()
+
+        assert actual == 2  # noqa: PLR2004 # the second time column 0 is set starts a new step
+        assert [
+            [step.column_index for step in (collapsed, *collapsed.merged_steps)]
+            for collapsed in self.program.steps
+            if isinstance(collapsed, SetVolume)
+        ] == [[0, 1], [0, 2]]
+
+    def test_Given_d_one_step_without_row_then_same_well_with_row_0__Then_not_merged(self):
+        program = arbitrary_d_one_program_framework()
+        plate = program.deck_layouts[0].labware[DeckPosition(name="B", orientation=LabwareOrientation.A1_NW_CORNER)]
+        program.add_step(SetInitialVolume(labware=plate, column_index=0, volume=100))
+        program.add_step(SetInitialVolume(labware=plate, column_index=0, row_index=0, volume=50))
+
+        actual = program.collapse_set_volume_steps()
+
+        assert actual == 0
+        assert len(program.steps) == 2  # noqa: PLR2004 # both steps set well A1
+
+    def test_Given_merged_steps_without_section_indexes__When_added__Then_resolved(self):
+        step = SetVolume(
+            labware=self.plate,
+            column_index=0,
+            volume=10,
+            merged_steps=[SetVolume(labware=self.plate, column_index=1, volume=10)],
+        )
+
+        self.program.add_step(step)
+
+        assert step.merged_steps[0].section_index == step.section_index
+        assert step.section_index is not None
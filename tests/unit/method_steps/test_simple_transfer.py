@@ -1,11 +1,16 @@
+import json
+import uuid
 from typing import Any
 
 import pytest
+from lxml import etree
+from pytest_mock import MockerFixture
 
 from pyalab import Deck
 from pyalab import DeckLayout
 from pyalab import DeckPosition
 from pyalab import DispenseParameters
+from pyalab import InvalidTransferWellsError
 from pyalab import LabwareOrientation
 from pyalab import Pipette
 from pyalab import Plate
@@ -14,6 +19,7 @@ from pyalab import SetInitialVolume
 from pyalab import StandardDeckNames
 from pyalab import Tip
 from pyalab import Transfer
+from pyalab import TransferWellPair
 from pyalab.steps.params import AspirateParameters
 
 from ..fixtures import ProgramSnapshot
@@ -172,3 +178,102 @@ class TestDOneSimpleTransfer(ProgramSnapshot):
         )
 
         assert generate_xml_str(program) == self.snapshot_xml
+
+
+class TestMultiColumnTransfer(ProgramSnapshot):
+    @pytest.fixture(autouse=True)
+    def _setup_plates(self):
+        self.source_plate = Plate(name="BIO-RAD Hard-Shell 96-Well Skirted PCR Plates", display_name="Source Plate")
+        self.destination_plate = Plate(
+            name="BIO-RAD Hard-Shell 96-Well Skirted PCR Plates", display_name="Destination Plate"
+        )
+        self.program = Program(
+            deck_layouts=[
+                DeckLayout(
+                    deck=Deck(name=StandardDeckNames.THREE_POSITION.value),
+                    labware={
+                        DeckPosition(name="B", orientation=LabwareOrientation.A1_NW_CORNER): self.source_plate,
+                        DeckPosition(name="C", orientation=LabwareOrientation.A1_NW_CORNER): self.destination_plate,
+                    },
+                )
+            ],
+            display_name="plate-copy",
+            description="Copy a 96-well plate in a single step",
+            pipette=Pipette(name="VOYAGER EIGHT 300 µl"),
+            tip=Tip(name="300 µl GripTip Sterile Filter Low retention"),
+        )
+
+    def test_Given_plate_copy__Then_snapshot_matches(self):
+        for column_index in range(12):
+            self.program.add_step(SetInitialVolume(labware=self.source_plate, column_index=column_index, volume=100))
+        self.program.add_step(
+            Transfer(
+                source=self.source_plate,
+                destination=self.destination_plate,
+                well_pairs=[
+                    TransferWellPair(source_column_index=column_index, destination_column_index=column_index)
+                    for column_index in range(12)
+                ],
+                volume=20,
+            )
+        )
+
+        assert generate_xml_str(self.program) == self.snapshot_xml
+
+    def test_Given_single_column_pair__Then_same_xml_as_column_indexes(self, mocker: MockerFixture):
+        _ = mocker.patch.object(uuid, "uuid4", return_value=uuid.UUID(int=0))
+        transfer_kwargs: dict[str, Any] = {
+            "source": self.source_plate,
+            "destination": self.destination_plate,
+            "volume": 20,
+        }
+        well_pair = TransferWellPair(source_column_index=3, destination_column_index=5)
+        with_column_indexes = Transfer(source_column_index=3, destination_column_index=5, **transfer_kwargs)
+        with_well_pairs = Transfer(well_pairs=[well_pair], **transfer_kwargs)
+        for step in (with_column_indexes, with_well_pairs):
+            self.program.add_step(step)
+
+        actual = etree.tostring(with_well_pairs.create_xml_for_program())
+
+        assert actual == etree.tostring(with_column_indexes.create_xml_for_program())
+
+    def test_Given_liquid_speeds_and_delays__Then_in_xml(self):
+        transfer = Transfer(
+            source=self.source_plate,
+            destination=self.destination_plate,
+            source_column_index=0,
+            destination_column_index=0,
+            volume=20,
+            aspirate_parameters=AspirateParameters(liquid_speed=3, post_delay=2),
+            dispense_parameters=DispenseParameters(liquid_speed=5, post_delay=1),
+        )
+        self.program.add_step(transfer)
+
+        pipetting = transfer.create_xml_for_program().find("./ValueGroups/ValueGroup[@Key='Pipetting']/Values")
+
+        assert pipetting is not None
+        configuration = json.loads(pipetting.findtext("./Value[@Key='TipTypePipettingConfiguration']", default=""))
+        assert (configuration[0]["AspirationSpeed"], configuration[0]["DispenseSpeed"]) == (3, 5)
+        assert pipetting.findtext("./Value[@Key='AspirationDelay']") == "2"
+        assert pipetting.findtext("./Value[@Key='DispenseDelay']") == "1"
+
+    @pytest.mark.parametrize(
+        "wells_kwargs",
+        [
+            pytest.param({}, id="nothing"),
+            pytest.param({"source_column_index": 1}, id="only source"),
+            pytest.param({"destination_column_index": 1}, id="only destination"),
+            pytest.param(
+                {
+                    "source_column_index": 1,
+                    "destination_column_index": 1,
+                    "well_pairs": [TransferWellPair(source_column_index=1, destination_column_index=1)],
+                },
+                id="both",
+            ),
+            pytest.param({"source_column_index": 1, "well_pairs": []}, id="empty pairs"),
+        ],
+    )
+    def test_Given_invalid_wells__Then_error(self, wells_kwargs: dict[str, Any]):
+        with pytest.raises(InvalidTransferWellsError, match="either a source_column_index"):
+            _ = Transfer(source=self.source_plate, destination=self.destination_plate, volume=20, **wells_kwargs)
@@ -0,0 +1,85 @@
+import pytest
+from lxml import etree
+from pytest_mock import MockerFixture
+
+from pyalab import Deck
+from pyalab import DeckLayout
+from pyalab import DeckPosition
+from pyalab import LabwareOrientation
+from pyalab import Pipette
+from pyalab import Plate
+from pyalab import Program
+from pyalab import StandardDeckNames
+from pyalab import Step
+from pyalab import Tip
+from pyalab import Transfer
+from pyalab.steps import base
+
+
+class TestValueGroupTemplates:
+    @pytest.fixture(autouse=True)
+    def _setup(self, mocker: MockerFixture):
+        _ = mocker.patch.dict(
+            base._value_group_templates,  # noqa: SLF001 # isolate the templates from other tests
+            clear=True,
+        )
+        self.spied_create_mix_values = mocker.spy(Step, "_create_mix_values")
+        self.plate = Plate(name="BIO-RAD Hard-Shell 96-Well Skirted PCR Plates", display_name="PCR Plate")
+        self.program = Program(
+            deck_layouts=[
+                DeckLayout(
+                    deck=Deck(name=StandardDeckNames.THREE_POSITION.value),
+                    labware={DeckPosition(name="B", orientation=LabwareOrientation.A1_NW_CORNER): self.plate},
+                )
+            ],
+            display_name="arbitrary",
+            description="arbitrary",
+            pipette=Pipette(name="VOYAGER EIGHT 300 µl"),  # arbitrary
+            tip=Tip(name="300 µl GripTip Sterile Filter Low retention"),  # arbitrary
+        )
+
+    def _create_transfer(self, destination_column_index: int) -> Transfer:
+        transfer = Transfer(
+            source=self.plate,
+            source_column_index=0,
+            destination=self.plate,
+            destination_column_index=destination_column_index,
+            volume=10,
+        )
+        self.program.add_step(transfer)
+        return transfer
+
+    def test_Given_many_steps__Then_static_groups_only_built_once(self):
+        for destination_column_index in range(1, 12):
+            _ = self._create_transfer(destination_column_index).create_xml_for_program()
+
+        assert self.spied_create_mix_values.call_count == 2  # noqa: PLR2004 # once each for source and destination mixing
+        assert {key[0] for key in base._value_group_templates} == {  # noqa: SLF001 # confirm which groups were templated
+            "LLD",
+            "Various",
+            "Tips",
+            "SourceMix",
+            "TargetMix",
+        }
+
+    def test_Given_step_xml_modified__Then_later_steps_unaffected(self):
+        first_step_xml = self._create_transfer(1).create_xml_for_program()
+        for value_node in first_step_xml.iter("Value"):
+            value_node.text = "modified"
+
+        second_step_xml = self._create_transfer(1).create_xml_for_program()
+
+        assert "modified" not in etree.tostring(second_step_xml, encoding="unicode")
+
+    def test_Given_different_wells__Then_mix_groups_have_each_steps_wells(self):
+        step_xmls = [self._create_transfer(column_index).create_xml_for_program() for column_index in (1, 2)]
+
+        actual = [
+            step_xml.findtext("./ValueGroups/ValueGroup[@Key='TargetMix']//Value[@Key='Heights']")
+            for step_xml in step_xmls
+        ]
+
+        assert actual[0] is not None
+        assert '"Item1": 1' in actual[0]
+        assert actual[1] is not None
+        assert '"Item1": 2' in actual[1]
@@ -1,8 +1,12 @@
+import io
+import pickle
 import uuid
 from pathlib import Path
 from tempfile import TemporaryDirectory
 
 import pytest
+from lxml import etree
+from pytest_mock import MockerFixture
 
 from pyalab import Deck
 from pyalab import DeckLayout
@@ -10,13 +14,22 @@ from pyalab import DeckPosition
 from pyalab import Labware
 from pyalab import LabwareNotInDeckLayoutError
 from pyalab import LabwareOrientation
+from pyalab import LabwarePlacement
+from pyalab import MultiDispense
 from pyalab import Pipette
+from pyalab import PipettingLocation
 from pyalab import Plate
 from pyalab import Program
 from pyalab import Reservoir
+from pyalab import SetInitialVolume
+from pyalab import SetVolume
 from pyalab import StandardDeckNames
+from pyalab import Step
 from pyalab import Tip
+from pyalab import Transfer
+from pyalab import TransferWellPair
 from pyalab import Tubeholder
+from pyalab import read_program
 
 from ..constants import GENERIC_TUBE_HOLDER
 from ..fixtures import ProgramSnapshot
@@ -114,3 +127,381 @@ class TestOddLabwareProgramSnapshots(ProgramSnapshot):
             xml_str = file_path.read_text()
 
         assert xml_str == self.snapshot_xml
+
+
+class TestLabwarePlacements:
+    @pytest.fixture(autouse=True)
+    def _setup(self, mocker: MockerFixture):
+        self.plate = Plate(name="BIO-RAD Hard-Shell 96-Well Skirted PCR Plates", display_name="PCR Plate")
+        self.tube_holder = GENERIC_TUBE_HOLDER
+        self.deck = Deck(name=StandardDeckNames.THREE_POSITION.value)
+        self.program = Program(
+            deck_layouts=[
+                DeckLayout(
+                    deck=self.deck,
+                    labware={
+                        DeckPosition(name="B", orientation=LabwareOrientation.A1_NW_CORNER): self.plate,
+                        DeckPosition(name="C", orientation=LabwareOrientation.A1_NW_CORNER): self.tube_holder,
+                    },
+                )
+            ],
+            display_name="arbitrary",
+            description="arbitrary",
+            pipette=Pipette(name="VOYAGER EIGHT 300 µl"),  # arbitrary
+            tip=Tip(name="300 µl GripTip Sterile Filter Low retention"),  # arbitrary
+        )
+        self.spied_section_index = mocker.spy(DeckPosition, "section_index")
+
+    def test_Given_repeated_lookups__Then_section_indexes_only_resolved_once(self):
+        actual = [self.program.get_section_index_for_labware(self.plate) for _ in range(5)]
+
+        assert actual == [6] * 5
+        assert self.spied_section_index.call_count == len(self.program.deck_layouts[0].labware)
+
+    def test_Given_copy_of_labware__Then_found(self):
+        actual = self.program.get_section_index_for_labware(self.plate.model_copy())
+
+        assert actual == 6  # noqa: PLR2004 # the section index of landscape B on the 3 position deck
+
+    def test_Given_deck_layouts_reassigned__Then_map_rebuilt(self):
+        _ = self.program.get_section_index_for_labware(self.plate)
+
+        self.program.deck_layouts = [
+            DeckLayout(
+                deck=self.deck,
+                labware={DeckPosition(name="C", orientation=LabwareOrientation.A1_NW_CORNER): self.plate},
+            )
+        ]
+
+        assert self.program.get_section_index_for_labware(self.plate) == 14  # noqa: PLR2004 # the section index of landscape C on the 3 position deck
+        with pytest.raises(LabwareNotInDeckLayoutError, match=self.tube_holder.name):
+            _ = self.program.get_section_index_for_labware(self.tube_holder)
+
+    def test_Given_deck_layout_mutated_in_place__Then_map_rebuilt(self):
+        _ = self.program.get_section_index_for_labware(self.plate)
+        other_plate = Plate(name="BIO-RAD Hard-Shell 96-Well Skirted PCR Plates", display_name="other")
+
+        self.program.deck_layouts[0].labware[DeckPosition(name="B", orientation=LabwareOrientation.A1_NE_CORNER)] = (
+            other_plate
+        )
+
+        assert self.program.get_section_index_for_labware(other_plate) == 7  # noqa: PLR2004 # the section index of portrait B on the 3 position deck
+
+    def test_Given_labware_only_in_second_layout__Then_placement_in_that_layout(self):
+        other_plate = Plate(name="BIO-RAD Hard-Shell 96-Well Skirted PCR Plates", display_name="other")
+        self.program.deck_layouts.append(
+            DeckLayout(
+                deck=self.deck,
+                labware={
+                    DeckPosition(name="B", orientation=LabwareOrientation.A1_NW_CORNER): self.plate,
+                    DeckPosition(name="C", orientation=LabwareOrientation.A1_NW_CORNER): other_plate,
+                },
+            )
+        )
+
+        assert self.program.get_labware_placement(self.plate) == LabwarePlacement(layout_index=0, section_index=6)
+        assert self.program.get_labware_placement(other_plate) == LabwarePlacement(layout_index=1, section_index=14)
+
+    def test_Given_two_layouts__When_xml_generated__Then_each_layout_built_once_and_all_written(
+        self, mocker: MockerFixture
+    ):
+        other_plate = Plate(name="BIO-RAD Hard-Shell 96-Well Skirted PCR Plates", display_name="other")
+        self.program.deck_layouts.append(
+            DeckLayout(
+                deck=self.deck,
+                labware={DeckPosition(name="C", orientation=LabwareOrientation.A1_NW_CORNER): other_plate},
+                name="Second",
+            )
+        )
+        spied_deck_layout_xml = mocker.spy(DeckLayout, "create_xml_for_program")
+
+        xml = self.program.generate_xml()
+
+        assert [call.kwargs["layout_num"] for call in spied_deck_layout_xml.call_args_list] == [1, 2]
+        root = etree.fromstring(xml.encode())
+        assert root.findtext("./Deck/NameInProcess") == "Labware Layout 1"
+        assert [deck.findtext("NameInProcess") for deck in root.iterfind("./AllDecks/Deck")] == [
+            "Labware Layout 1",
+            "Second",
+        ]
+        assert [
+            (deck_layout.name, len(deck_layout.labware))
+            for deck_layout in read_program(io.BytesIO(xml.encode())).deck_layouts
+        ] == [("", 2), ("Second", 1)]
+
+    def test_Given_steps_without_section_indexes__When_added__Then_resolved(self):
+        set_volume = SetInitialVolume(labware=self.plate, column_index=0, volume=100)
+        transfer = Transfer(
+            source=self.plate, source_column_index=0, destination=self.plate, destination_column_index=1, volume=10
+        )
+
+        self.program.add_step(set_volume)
+        self.program.add_step(transfer)
+
+        assert set_volume.section_index == 6  # noqa: PLR2004 # the section index of landscape B on the 3 position deck
+        assert (transfer.source_section_index, transfer.destination_section_index) == (6, 6)
+
+    def test_Given_steps_added__When_deck_layouts_reassigned__Then_filled_in_section_indexes_updated(self):
+        set_volume = SetInitialVolume(labware=self.plate, column_index=0, volume=100)
+        explicit_set_volume = SetInitialVolume(labware=self.plate, section_index=3, column_index=1, volume=100)
+        self.program.add_step(set_volume)
+        self.program.add_step(explicit_set_volume)
+
+        self.program.deck_layouts = [
+            DeckLayout(
+                deck=self.deck,
+                labware={DeckPosition(name="C", orientation=LabwareOrientation.A1_NW_CORNER): self.plate},
+            )
+        ]
+        xml = self.program.generate_xml()
+
+        assert set_volume.section_index == 14  # noqa: PLR2004 # the section index of landscape C on the 3 position deck
+        assert explicit_set_volume.section_index == 3  # noqa: PLR2004 # arbitrary explicit value
+        assert '"Section": 14' in xml
+
+    def test_Given_filled_in_section_index_assigned__When_deck_layouts_reassigned__Then_kept(self):
+        transfer = Transfer(
+            source=self.plate, source_column_index=0, destination=self.plate, destination_column_index=1, volume=10
+        )
+        self.program.add_step(transfer)
+        transfer.destination_section_index = 4
+
+        self.program.deck_layouts = [
+            DeckLayout(
+                deck=self.deck,
+                labware={DeckPosition(name="C", orientation=LabwareOrientation.A1_NW_CORNER): self.plate},
+            )
+        ]
+        _ = self.program.estimate_run_time()
+
+        assert (transfer.source_section_index, transfer.destination_section_index) == (14, 4)
+
+    def test_Given_steps_with_explicit_section_indexes__When_added__Then_unchanged(self):
+        set_volume = SetInitialVolume(labware=self.plate, section_index=3, column_index=0, volume=100)
+        transfer = Transfer(
+            source=self.plate,
+            source_section_index=3,
+            source_column_index=0,
+            destination=self.plate,
+            destination_section_index=4,
+            destination_column_index=1,
+            volume=10,
+        )
+
+        self.program.add_step(set_volume)
+        self.program.add_step(transfer)
+
+        assert set_volume.section_index == 3  # noqa: PLR2004 # arbitrary explicit value
+        assert (transfer.source_section_index, transfer.destination_section_index) == (3, 4)
+        self.spied_section_index.assert_not_called()
+
+
+class TestWriteProgram:
+    @pytest.fixture(autouse=True)
+    def _setup(self, mocker: MockerFixture):
+        _ = mocker.patch.object(uuid, "uuid4", return_value=uuid.UUID(int=0))
+        self.plate = Plate(name="BIO-RAD Hard-Shell 96-Well Skirted PCR Plates", display_name="PCR Plate")
+
+    def _create_program(self) -> Program:
+        return Program(
+            deck_layouts=[
+                DeckLayout(
+                    deck=Deck(name=StandardDeckNames.THREE_POSITION.value),
+                    labware={DeckPosition(name="B", orientation=LabwareOrientation.A1_NW_CORNER): self.plate},
+                )
+            ],
+            display_name="arbitrary",
+            description="arbitrary",
+            pipette=Pipette(name="VOYAGER EIGHT 300 µl"),  # arbitrary
+            tip=Tip(name="300 µl GripTip Sterile Filter Low retention"),  # arbitrary
+        )
+
+    def _create_steps(self):
+        yield SetInitialVolume(labware=self.plate, column_index=0, volume=100)
+        for column_index in range(1, 4):
+            yield Transfer(
+                source=self.plate,
+                source_column_index=0,
+                destination=self.plate,
+                destination_column_index=column_index,
+                volume=10,
+            )
+
+    def test_Given_no_steps__Then_empty_steps_element(self):
+        actual = self._create_program().generate_xml()
+
+        assert "\n  <Steps/>\n" in actual
+
+    def test_Given_steps_streamed_from_generator__When_saved__Then_same_as_adding_steps_first(self):
+        streamed_program = self._create_program()
+        expected_program = self._create_program()
+        for step in self._create_steps():
+            expected_program.add_step(step)
+
+        with TemporaryDirectory() as temp_dir:
+            file_path = Path(temp_dir) / "program.iaa"
+            _ = streamed_program.save_program(file_path, steps=self._create_steps())
+
+            actual = file_path.read_text(encoding="utf-8")
+
+        assert actual == expected_program.generate_xml()
+        assert streamed_program.steps == []
+
+
+class TestXmlCache:
+    @pytest.fixture(autouse=True)
+    def _setup(self, mocker: MockerFixture):
+        _ = mocker.patch.object(uuid, "uuid4", return_value=uuid.UUID(int=0))
+        self.plate = Plate(name="BIO-RAD Hard-Shell 96-Well Skirted PCR Plates", display_name="PCR Plate")
+        self.program = Program(
+            deck_layouts=[
+                DeckLayout(
+                    deck=Deck(name=StandardDeckNames.THREE_POSITION.value),
+                    labware={DeckPosition(name="B", orientation=LabwareOrientation.A1_NW_CORNER): self.plate},
+                )
+            ],
+            display_name="arbitrary",
+            description="arbitrary",
+            pipette=Pipette(name="VOYAGER EIGHT 300 µl"),  # arbitrary
+            tip=Tip(name="300 µl GripTip Sterile Filter Low retention"),  # arbitrary
+        )
+        for column_index in range(3):
+            self.program.add_step(SetVolume(labware=self.plate, column_index=column_index, volume=100))
+        _ = self.program.collapse_set_volume_steps()
+        for column_index in range(1, 4):
+            self.program.add_step(
+                Transfer(
+                    source=self.plate,
+                    source_column_index=0,
+                    destination=self.plate,
+                    destination_column_index=column_index,
+                    volume=10,
+                )
+            )
+        self.initial_xml = self.program.generate_xml()
+        self.spied_step_xml = mocker.spy(Step, "create_xml_for_program")
+        self.spied_pipette_xml = mocker.spy(Pipette, "create_xml_for_program")
+
+    def _location(self, column_index: int) -> PipettingLocation:
+        return PipettingLocation(
+            labware=self.plate,
+            deck_section_index=self.program.get_section_index_for_labware(self.plate),
+            column_index=column_index,
+            upper_left_row_index=0,
+        )
+
+    def _regenerated_from_scratch(self) -> str:
+        self.program.clear_xml_cache()
+        return self.program.generate_xml()
+
+    def test_Given_nothing_changed__Then_nothing_rebuilt(self):
+        actual = self.program.generate_xml()
+
+        assert actual == self.initial_xml
+        self.spied_step_xml.assert_not_called()
+        self.spied_pipette_xml.assert_not_called()
+
+    def test_Given_step_field_assigned__Then_only_that_step_rebuilt(self):
+        step = self.program.steps[2]
+        assert isinstance(step, Transfer)
+        step.volume = 25
+
+        actual = self.program.generate_xml()
+
+        assert [call.args[0] for call in self.spied_step_xml.call_args_list] == [step]
+        assert actual != self.initial_xml
+        assert actual == self._regenerated_from_scratch()
+
+    def test_Given_merged_step_field_assigned__Then_step_rebuilt(self):
+        step = self.program.steps[0]
+        assert isinstance(step, SetVolume)
+        step.merged_steps[1].volume = 50
+
+        actual = self.program.generate_xml()
+
+        assert [call.args[0] for call in self.spied_step_xml.call_args_list] == [step]
+        assert actual == self._regenerated_from_scratch()
+
+    def test_Given_step_added__Then_only_new_step_built(self):
+        new_step = SetVolume(labware=self.plate, column_index=5, volume=20)
+        self.program.add_step(new_step)
+
+        actual = self.program.generate_xml()
+
+        assert [call.args[0] for call in self.spied_step_xml.call_args_list] == [new_step]
+        assert actual == self._regenerated_from_scratch()
+
+    def test_Given_steps_reordered__Then_nothing_rebuilt(self):
+        self.program.steps = [self.program.steps[0], *reversed(self.program.steps[1:])]
+
+        actual = self.program.generate_xml()
+
+        self.spied_step_xml.assert_not_called()
+        assert actual == self._regenerated_from_scratch()
+
+    def test_Given_display_name_assigned__Then_header_rebuilt(self):
+        self.program.display_name = "renamed"
+
+        actual = self.program.generate_xml()
+
+        assert "<DisplayNameOnPipette>renamed</DisplayNameOnPipette>" in actual
+        self.spied_pipette_xml.assert_called_once()
+        self.spied_step_xml.assert_not_called()
+
+    def test_Given_list_field_appended_to_in_place__Then_step_rebuilt(self):
+        step = Transfer(
+            source=self.plate,
+            destination=self.plate,
+            well_pairs=[TransferWellPair(source_column_index=0, destination_column_index=4)],
+            volume=10,
+        )
+        self.program.add_step(step)
+        previous_xml = self.program.generate_xml()
+        self.spied_step_xml.reset_mock()
+        step.well_pairs.append(TransferWellPair(source_column_index=0, destination_column_index=5))
+
+        actual = self.program.generate_xml()
+
+        assert [call.args[0] for call in self.spied_step_xml.call_args_list] == [step]
+        assert actual != previous_xml
+        assert actual == self._regenerated_from_scratch()
+
+    def test_Given_list_item_replaced_in_place__Then_step_rebuilt(self):
+        step = MultiDispense(
+            source=self._location(0),
+            destinations=[(self._location(4), 10), (self._location(5), 10)],
+        )
+        self.program.add_step(step)
+        previous_xml = self.program.generate_xml()
+        step.destinations[1] = (self._location(5), 20)
+
+        actual = self.program.generate_xml()
+
+        assert actual != previous_xml
+        assert actual == self._regenerated_from_scratch()
+
+    def test_Given_merged_step_added_in_place__Then_step_rebuilt(self):
+        step = self.program.steps[0]
+        assert isinstance(step, SetVolume)
+        step.merged_steps.append(
+            SetVolume(
+                labware=self.plate,
+                section_index=self.program.get_section_index_for_labware(self.plate),
+                column_index=5,
+                volume=20,
+            )
+        )
+
+        actual = self.program.generate_xml()
+
+        assert [call.args[0] for call in self.spied_step_xml.call_args_list] == [step]
+        assert actual != self.initial_xml
+        assert actual == self._regenerated_from_scratch()
+
+    def test_When_pickled__Then_cached_xml_left_out(self):
+        unpickled = pickle.loads(pickle.dumps(self.program))  # noqa: S301 # the data was just pickled by the test
+
+        actual = unpickled.generate_xml()
+
+        assert actual == self.initial_xml
+        assert self.spied_step_xml.call_count == len(self.program.steps)
@@ -0,0 +1,73 @@
+import re
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import pytest
+from pytest_mock import MockerFixture
+
+from pyalab import Program
+from pyalab import SetInitialVolume
+from pyalab import generate_many
+
+from .fixtures import arbitrary_d_one_program_framework
+from .fixtures import generate_xml_str
+
+UUID_REGEX = re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}")
+
+
+def _create_program(volume: float) -> Program:
+    program = arbitrary_d_one_program_framework()
+    plate = next(iter(program.deck_layouts[0].labware.values()))
+    program.add_step(SetInitialVolume(labware=plate, column_index=0, volume=volume))
+    return program
+
+
+class TestGenerateMany:
+    @pytest.fixture(autouse=True)
+    def _setup(self):
+        with TemporaryDirectory() as temp_dir:
+            self.out_dir = Path(temp_dir) / "programs"
+            yield
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_Given_programs__Then_each_written_to_out_dir(self, workers: int):
+        programs = {f"plate-{idx}": _create_program(volume=10 + idx) for idx in range(4)}
+
+        actual = generate_many(programs, self.out_dir, workers=workers)
+
+        assert [report.name for report in actual] == list(programs)
+        for report in actual:
+            assert report.succeeded
+            assert report.file_path == self.out_dir / f"{report.name}.iaa"
+            assert report.duration > 0
+            # the unique identifiers differ between each generation, but everything else should match
+            expected = UUID_REGEX.sub("", generate_xml_str(programs[report.name]))
+            assert UUID_REGEX.sub("", report.file_path.read_text(encoding="utf-8")) == expected
+
+    def test_Given_program_that_fails__Then_reported_and_rest_of_batch_written(self):
+        broken_program = _create_program(volume=10)
+        broken_program.deck_layouts = []
+        programs = {
+            "good-1": _create_program(volume=10),
+            "broken": broken_program,
+            "good-2": _create_program(volume=20),
+        }
+
+        actual = generate_many(programs, self.out_dir, workers=1)
+
+        assert [report.succeeded for report in actual] == [True, False, True]
+        assert actual[1].error is not None
+        assert actual[1].error.startswith("LabwareNotInDeckLayoutError")
+        assert not actual[1].file_path.exists()
+        assert actual[2].file_path.exists()
+
+    def test_Given_program_that_cannot_be_sent_to_worker__Then_reported(self, mocker: MockerFixture):
+        unpicklable_program = mocker.MagicMock(spec=Program)
+        programs = {"good": _create_program(volume=10), "unpicklable": unpicklable_program}
+
+        actual = generate_many(programs, self.out_dir, workers=2)
+
+        assert actual[0].succeeded
+        assert actual[1].name == "unpicklable"
+        assert not actual[1].succeeded
+        assert not actual[1].file_path.exists()
@@ -1,12 +1,22 @@
+import os
+import shutil
+from pathlib import Path
+
 import pytest
+from pytest_mock import MockerFixture
 
+from pyalab import LIBRARY_XML_CACHE
 from pyalab import Deck
 from pyalab import DeckPosition
 from pyalab import DeckPositionNotFoundError
+from pyalab import DeckSectionInfo
 from pyalab import Labware
 from pyalab import LabwareOrientation
+from pyalab import LibraryXmlCache
 from pyalab import Plate
 from pyalab import StandardDeckNames
+from pyalab import deck as deck_module
+from pyalab import integra_xml
 
 from .constants import GENERIC_96_WELL_PLATE
 from .constants import GENERIC_RESERVOIR
@@ -73,3 +83,78 @@ class TestDeckPositionSectionIndex:
             match=rf"{deck.name}.*{deck_position.name}.*{arbitrary_incompatible_labware.xml_width}.*{arbitrary_incompatible_labware.xml_length}",
         ):
             _ = deck_position.section_index(deck=deck, labware=arbitrary_incompatible_labware)
+
+
+class TestDeckSections:
+    @pytest.fixture(autouse=True)
+    def _setup(self, mocker: MockerFixture):
+        _ = mocker.patch.dict(deck_module._deck_sections, clear=True)  # noqa: SLF001 # start from an empty registry
+        _ = mocker.patch.dict(deck_module._section_indexes, clear=True)  # noqa: SLF001 # start from an empty registry
+        self.spied_get_root = mocker.spy(LIBRARY_XML_CACHE, "get_root")
+
+    def test_sections_grouped_by_position_name(self):
+        deck = Deck(name=StandardDeckNames.THREE_POSITION.value)
+
+        actual = deck.sections["B"][1]
+
+        assert actual == DeckSectionInfo(index=6, name="B", width=86, length=128.2, orientation="Landscape")
+
+    def test_Given_repeated_lookups_across_deck_instances__Then_deck_xml_only_read_once(self):
+        deck_position = DeckPosition(name="B", orientation=LabwareOrientation.A1_NE_CORNER)
+
+        actual = [
+            deck_position.section_index(
+                deck=Deck(name=StandardDeckNames.THREE_POSITION.value), labware=GENERIC_96_WELL_PLATE
+            )
+            for _ in range(3)
+        ]
+
+        assert actual == [7, 7, 7]
+        assert self.spied_get_root.call_count == 1
+
+    def _copy_deck_file(self, tmp_path: Path, mocker: MockerFixture) -> Path:
+        xml_file = tmp_path / "deck.xml"
+        _ = shutil.copy(Deck(name=StandardDeckNames.THREE_POSITION.value).find_xml_file(), xml_file)
+        _ = mocker.patch.object(Deck, "find_xml_file", autospec=True, return_value=xml_file)
+        _ = mocker.patch.object(
+            integra_xml, "LIBRARY_XML_CACHE", LibraryXmlCache()
+        )  # keep the copied file out of the shared cache
+        _ = mocker.patch.object(deck_module, "LIBRARY_XML_CACHE", integra_xml.LIBRARY_XML_CACHE)
+        return xml_file
+
+    def _widen_landscape_plate_section(self, xml_file: Path):
+        _ = xml_file.write_text(
+            xml_file.read_text().replace(
+                "<Location_Y>4370</Location_Y>\n      <Width>8600</Width>",
+                "<Location_Y>4370</Location_Y>\n      <Width>9000</Width>",
+            )
+        )
+        bumped_mtime_ns = (
+            xml_file.stat().st_mtime_ns + 1_000_000_000
+        )  # make sure the edit is seen even on coarse filesystem timestamps
+        os.utime(xml_file, ns=(bumped_mtime_ns, bumped_mtime_ns))
+
+    def test_Given_library_file_edited__Then_sections_parsed_again(self, tmp_path: Path, mocker: MockerFixture):
+        xml_file = self._copy_deck_file(tmp_path, mocker)
+        original = Deck(name=StandardDeckNames.THREE_POSITION.value).sections["B"][1]
+        self._widen_landscape_plate_section(xml_file)
+
+        actual = Deck(name=StandardDeckNames.THREE_POSITION.value).sections["B"][1]
+
+        assert original.width == 86  # noqa: PLR2004 # the value in the library file
+        assert actual.width == 90  # noqa: PLR2004 # the edited value
+
+    def test_Given_library_file_edited__Then_section_index_resolved_again(self, tmp_path: Path, mocker: MockerFixture):
+        xml_file = self._copy_deck_file(tmp_path, mocker)
+        deck_position = DeckPosition(name="B", orientation=LabwareOrientation.A1_NW_CORNER)
+        original = deck_position.section_index(
+            deck=Deck(name=StandardDeckNames.THREE_POSITION.value), labware=GENERIC_96_WELL_PLATE
+        )
+        self._widen_landscape_plate_section(xml_file)
+
+        with pytest.raises(DeckPositionNotFoundError, match=deck_position.name):
+            _ = deck_position.section_index(
+                deck=Deck(name=StandardDeckNames.THREE_POSITION.value), labware=GENERIC_96_WELL_PLATE
+            )
+
+        assert original == 6  # noqa: PLR2004 # the landscape plate section before the edit
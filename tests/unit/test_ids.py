@@ -0,0 +1,127 @@
+import datetime as dt
+import io
+
+import pytest
+from lxml import etree
+from lxml.etree import _Element
+from pytest_mock import MockerFixture
+
+from pyalab import ContentDerivedIds
+from pyalab import IdProvider
+from pyalab import Plate
+from pyalab import Program
+from pyalab import RandomIds
+from pyalab import SeededIds
+from pyalab import SetInitialVolume
+from pyalab import Step
+from pyalab import Transfer
+
+from .fixtures import arbitrary_eight_channel_program_framework
+
+
+def _create_program(id_provider: IdProvider) -> Program:
+    program = arbitrary_eight_channel_program_framework(id_provider)
+    plate = program.the_labware
+    assert isinstance(plate, Plate)
+    program.add_step(SetInitialVolume(labware=plate, column_index=0, volume=100))
+    for destination_column_index in (1, 2):
+        program.add_step(
+            Transfer(
+                source=plate,
+                source_column_index=0,
+                destination=plate,
+                destination_column_index=destination_column_index,
+                volume=10,
+            )
+        )
+    return program
+
+
+def _ids(xml: str) -> tuple[str | None, str | None, list[str | None]]:
+    root = etree.fromstring(xml.encode())
+    return (
+        root.get("UniqueIdentifier"),
+        root.findtext("MigrationIdentifier"),
+        [step.findtext("ID") for step in root.iterfind("./Steps/Step")],
+    )
+
+
+def test_Given_random_ids__When_written_twice__Then_new_ids_each_time():
+    program = _create_program(RandomIds())
+
+    first_ids = _ids(program.generate_xml())
+    second_ids = _ids(program.generate_xml())
+
+    assert first_ids[0] != second_ids[0]
+    assert set(first_ids[2]).isdisjoint(second_ids[2])
+
+
+@pytest.mark.parametrize(
+    "id_provider",
+    [
+        pytest.param(SeededIds(seed=42), id="seeded"),
+        pytest.param(ContentDerivedIds(), id="content-derived"),
+    ],
+)
+def test_Given_deterministic_ids__When_identical_programs_written__Then_byte_identical(id_provider: IdProvider):
+    actual = _create_program(id_provider).generate_xml()
+
+    assert actual == _create_program(id_provider).generate_xml()
+    unique_identifier, migration_identifier, step_ids = _ids(actual)
+    assert len({unique_identifier, migration_identifier, *step_ids}) == 2 + len(step_ids)
+
+
+def test_Given_different_seeds__Then_different_ids():
+    actual = _ids(_create_program(SeededIds(seed=1)).generate_xml())
+
+    assert actual != _ids(_create_program(SeededIds(seed=2)).generate_xml())
+
+
+def test_Given_content_derived_ids__When_step_changed__Then_only_its_id_and_the_program_ids_change():
+    program = _create_program(ContentDerivedIds())
+    unique_identifier, migration_identifier, step_ids = _ids(program.generate_xml())
+    step = program.steps[2]
+    assert isinstance(step, Transfer)
+
+    step.volume = 20
+    actual = _ids(program.generate_xml())
+
+    assert actual[0] != unique_identifier
+    assert actual[1] != migration_identifier
+    assert actual[2][:2] == step_ids[:2]
+    assert actual[2][2] != step_ids[2]
+
+
+def test_Given_changed_date__Then_written_like_vialab():
+    changed_date = dt.datetime(2025, 3, 4, 5, 6, 7, 891234, tzinfo=dt.timezone(dt.timedelta(hours=-5)))
+    program = _create_program(SeededIds(seed=0, changed_date=changed_date))
+
+    actual = etree.fromstring(program.generate_xml().encode()).findtext("ChangedDate")
+
+    assert actual == "2025-03-04T05:06:07.8912340-05:00"
+
+
+@pytest.mark.parametrize(
+    ("id_provider", "expected_steps_written"),
+    [
+        pytest.param(SeededIds(seed=42), 2, id="seeded"),
+        pytest.param(ContentDerivedIds(), 0, id="content-derived"),
+    ],
+)
+def test_When_written__Then_steps_only_all_serialized_up_front_if_ids_need_their_content(
+    mocker: MockerFixture, id_provider: IdProvider, expected_steps_written: int
+):
+    program = _create_program(id_provider)
+    stream = io.BytesIO()
+    steps_written_when_serialized: list[int] = []
+    original_create_xml = Step.create_xml_for_program
+
+    def create_xml(step: Step, *, step_id: str | None = None) -> _Element:
+        steps_written_when_serialized.append(stream.getvalue().count(b"<Step>"))
+        return original_create_xml(step, step_id=step_id)
+
+    _ = mocker.patch.object(Step, "create_xml_for_program", autospec=True, side_effect=create_xml)
+
+    _ = program.write_program(stream)
+
+    assert steps_written_when_serialized[-1] == expected_steps_written
@@ -0,0 +1,121 @@
+import json
+import uuid
+
+import pytest
+from pytest_mock import MockerFixture
+
+from pyalab import IncompatibleJsonBackendError
+from pyalab import ModuleJsonBackend
+from pyalab import Plate
+from pyalab import Program
+from pyalab import SetInitialVolume
+from pyalab import StdlibJsonBackend
+from pyalab import Transfer
+from pyalab import get_json_backend
+from pyalab import json_backend
+from pyalab import set_json_backend
+from pyalab.steps.base import DeckSection
+from pyalab.steps.base import WellRowCol
+
+from .fixtures import arbitrary_eight_channel_program_framework
+
+
+class CountingJsonBackend:
+    def __init__(self):
+        super().__init__()
+        self.call_count = 0
+
+    def dumps(self, obj: object) -> str:
+        self.call_count += 1
+        return json.dumps(obj)
+
+
+class CompactJsonBackend:
+    def dumps(self, obj: object) -> str:
+        return json.dumps(obj, separators=(",", ":"))
+
+
+def _create_program() -> Program:
+    program = arbitrary_eight_channel_program_framework()
+    plate = program.the_labware
+    assert isinstance(plate, Plate)
+    program.add_step(SetInitialVolume(labware=plate, column_index=0, volume=100))
+    program.add_step(
+        Transfer(source=plate, source_column_index=0, destination=plate, destination_column_index=1, volume=10)
+    )
+    return program
+
+
+class TestFindJsonBackend:
+    def test_Given_optional_module_not_installed__Then_stdlib(self, mocker: MockerFixture):
+        _ = mocker.patch.object(
+            json_backend, "OPTIONAL_JSON_BACKENDS", [("not_an_installed_module", {"ensure_ascii": True})]
+        )
+
+        assert isinstance(json_backend.find_json_backend(), StdlibJsonBackend)
+
+    def test_Given_optional_module_with_different_output__Then_stdlib(self, mocker: MockerFixture):
+        _ = mocker.patch.object(json_backend, "OPTIONAL_JSON_BACKENDS", [("json", {"separators": (",", ":")})])
+
+        assert isinstance(json_backend.find_json_backend(), StdlibJsonBackend)
+
+    def test_Given_compatible_optional_module__Then_used(self, mocker: MockerFixture):
+        _ = mocker.patch.object(
+            json_backend,
+            "OPTIONAL_JSON_BACKENDS",
+            [("not_an_installed_module", {"ensure_ascii": True}), ("json", {"ensure_ascii": True})],
+        )
+
+        actual = json_backend.find_json_backend()
+
+        assert isinstance(actual, ModuleJsonBackend)
+        assert repr(actual) == "ModuleJsonBackend('json')"
+
+    def test_Given_backend_that_errors__Then_not_compatible(self):
+        assert json_backend.is_compatible(ModuleJsonBackend("json", default=None, cls=None, indent=object())) is False
+
+
+class TestSetJsonBackend:
+    @pytest.fixture(autouse=True)
+    def _setup(self, mocker: MockerFixture):
+        _ = mocker.patch.object(uuid, "uuid4", return_value=uuid.UUID(int=0))
+        original_backend = get_json_backend()
+        yield
+        set_json_backend(original_backend)
+
+    def test_Given_custom_backend__Then_used_and_output_unchanged(self):
+        expected = _create_program().generate_xml()
+        backend = CountingJsonBackend()
+
+        set_json_backend(backend)
+        actual = _create_program().generate_xml()
+
+        assert actual == expected
+        assert backend.call_count > 0
+        assert get_json_backend() is backend
+
+    def test_Given_incompatible_backend__Then_error(self):
+        with pytest.raises(IncompatibleJsonBackendError, match="CompactJsonBackend"):
+            set_json_backend(CompactJsonBackend())
+
+    def test_Given_none__Then_default_restored(self):
+        set_json_backend(CountingJsonBackend())
+
+        set_json_backend(None)
+
+        assert not isinstance(get_json_backend(), CountingJsonBackend)
+
+
+class TestDumpByAlias:
+    def test_Given_equal_models__Then_same_dump_as_pydantic(self):
+        for model in (WellRowCol(column_index=3, row_index=1), DeckSection(deck_section=6, sub_section=-1)):
+            assert model.dump_by_alias() == model.model_dump(by_alias=True)
+            assert model.model_copy().dump_by_alias() == model.model_dump(by_alias=True)
+
+    def test_When_dump_modified__Then_later_dumps_unaffected(self):
+        well = WellRowCol(column_index=3, row_index=1)
+        first_dump = well.dump_by_alias()
+
+        first_dump["Item1"] = 99
+
+        assert WellRowCol(column_index=3, row_index=1).dump_by_alias() == {"Item1": 3, "Item2": 1}
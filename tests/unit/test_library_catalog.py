@@ -0,0 +1,122 @@
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+from pytest_mock import MockerFixture
+
+from pyalab import LIBRARY_XML_CACHE
+from pyalab import PATH_TO_INCLUDED_XML_FILES
+from pyalab import LibraryCatalog
+from pyalab import Pipette
+from pyalab import Plate
+from pyalab import Tip
+from pyalab import integra_xml
+from pyalab.library_catalog import get_library_catalog
+from pyalab.library_catalog import library_file_digest
+
+
+def test_shipped_catalog_is_up_to_date_with_library():
+    # if this fails, regenerate the catalog with `python -m pyalab.library_catalog`
+    expected = LibraryCatalog.compile()
+
+    actual = LibraryCatalog.load()
+
+    assert actual == expected
+
+
+def test_Given_catalog_available__When_metadata_read__Then_no_xml_parsed(mocker: MockerFixture):
+    spied_get_root = mocker.spy(LIBRARY_XML_CACHE, "get_root")
+
+    actual = (
+        Tip(name="300 µl GripTip Sterile Filter Low retention").tip_id,
+        Pipette(name="VOYAGER EIGHT 300 µl").num_channels,
+        Plate(name="BIO-RAD Hard-Shell 96-Well Skirted PCR Plates").row_spacing_in_xml,
+    )
+
+    assert actual == (23, 8, 9)
+    spied_get_root.assert_not_called()
+
+
+def test_Given_catalog_unavailable__When_metadata_read__Then_parsed_from_xml(mocker: MockerFixture):
+    _ = mocker.patch.object(integra_xml, "get_library_catalog", autospec=True, return_value=LibraryCatalog(entries={}))
+
+    actual = Tip(name="1250 µl GripTip Sterile Filter").tip_id
+
+    assert actual == 30  # noqa: PLR2004 # the value from the vendor library
+
+
+class TestLookup:
+    @pytest.fixture(autouse=True)
+    def _setup(self, tmp_path: Path):
+        self.library_path = tmp_path / "library"
+        plate_directory = self.library_path / "Plate"
+        plate_directory.mkdir(parents=True)
+        self.xml_file = plate_directory / "Foo V01.xml"
+        _ = self.xml_file.write_text("<Plate><Wells><RowGap>900</RowGap></Wells></Plate>")
+        self.catalog = LibraryCatalog.compile(library_path=self.library_path)
+
+    def test_Given_file_in_catalog__Then_value(self):
+        actual = self.catalog.lookup(file=self.xml_file, field="RowGap", library_path=self.library_path)
+
+        assert actual == "900"
+
+    def test_Given_field_not_in_file__Then_none(self):
+        actual = self.catalog.lookup(file=self.xml_file, field="TipID", library_path=self.library_path)
+
+        assert actual is None
+
+    def test_Given_file_changed_since_compiled__Then_none(self):
+        _ = self.xml_file.write_text("<Plate><Wells><RowGap>450</RowGap></Wells></Plate>  ")
+
+        actual = self.catalog.lookup(file=self.xml_file, field="RowGap", library_path=self.library_path)
+
+        assert actual is None
+
+    def test_Given_file_edited_without_changing_its_size__Then_none(self):
+        original_mtime_ns = self.xml_file.stat().st_mtime_ns
+        _ = self.xml_file.write_text("<Plate><Wells><RowGap>450</RowGap></Wells></Plate>")
+        os.utime(self.xml_file, ns=(original_mtime_ns + 1_000_000_000, original_mtime_ns + 1_000_000_000))
+
+        actual = self.catalog.lookup(file=self.xml_file, field="RowGap", library_path=self.library_path)
+
+        assert actual is None
+
+    def test_Given_file_not_in_catalog__Then_none(self):
+        other_file = self.xml_file.with_name("Bar V01.xml")
+        _ = shutil.copy(self.xml_file, other_file)
+
+        actual = self.catalog.lookup(file=other_file, field="RowGap", library_path=self.library_path)
+
+        assert actual is None
+
+    def test_Given_file_outside_library__Then_none(self):
+        actual = self.catalog.lookup(file=self.xml_file, field="RowGap", library_path=PATH_TO_INCLUDED_XML_FILES)
+
+        assert actual is None
+
+    def test_When_saved_and_loaded__Then_round_trips(self, tmp_path: Path):
+        file_path = tmp_path / "catalog.json"
+        self.catalog.save(file_path)
+
+        actual = LibraryCatalog.load(file_path)
+
+        assert actual == self.catalog
+
+    def test_Given_no_sidecar_file__When_loaded__Then_empty(self, tmp_path: Path):
+        actual = LibraryCatalog.load(tmp_path / "does-not-exist.json")
+
+        assert actual.entries == {}
+
+
+def test_Given_file_contents_changed__Then_different_digest(tmp_path: Path):
+    file = tmp_path / "Plate V01.xml"
+    _ = file.write_text("<Plate/>")
+    original_digest = library_file_digest(file)
+    _ = file.write_text("<Plate><Name>updated</Name></Plate>")
+
+    assert library_file_digest(file) != original_digest
+
+
+def test_When_catalog_requested_twice__Then_same_instance():
+    assert get_library_catalog() is get_library_catalog()
@@ -1,8 +1,25 @@
+import os
+import shutil
+from pathlib import Path
+
 import pytest
+from lxml import etree
+from pytest_mock import MockerFixture
 
+from pyalab import LIBRARY_INDEX
+from pyalab import LIBRARY_XML_CACHE
 from pyalab import Deck
 from pyalab import IntegraLibraryObjectNotFoundError
+from pyalab import LibraryComponent
+from pyalab import LibraryComponentIdentity
+from pyalab import LibraryComponentNotIdentifiedError
+from pyalab import LibraryComponentType
+from pyalab import LibraryIndex
+from pyalab import LibraryXmlCache
+from pyalab import LibraryXmlCacheInfo
 from pyalab import Plate
+from pyalab import Tip
+from pyalab import integra_xml
 
 
 class TestLoadXmlFromStandardLibrary:
@@ -11,6 +28,7 @@ class TestLoadXmlFromStandardLibrary:
         [
             pytest.param(Deck, "3 Position Universal Deck", id="a deck"),
             pytest.param(Plate, "BIO-RAD Hard-Shell 96-Well Skirted PCR Plates", id="a plate"),
+            pytest.param(Tip, "300 µl GripTip Sterile Filter", id="a tip"),
         ],
     )
     def test_Given_no_version_specified_and_file_exists__Then_success(self, component_class: type, component_name: str):
@@ -36,3 +54,205 @@ class TestLoadXmlFromStandardLibrary:
             IntegraLibraryObjectNotFoundError, match=rf"{component.type.value}.*{component_name}.*integra_library"
         ):
             component.load_xml()
+
+
+class TestLibraryIndex:
+    @pytest.fixture(autouse=True)
+    def _setup(self, tmp_path: Path):
+        self.plate_directory = tmp_path / LibraryComponentType.PLATE.value
+        self.plate_directory.mkdir()
+        for file_name in ("Foo V02.xml", "Foo V01.xml", "Foo V03 .xml", "FooBar.xml", "Foo (+24 mm) V00.xml"):
+            _ = (self.plate_directory / file_name).write_text("<Plate/>")
+        self.index = LibraryIndex(library_path=tmp_path)
+
+    def test_When_versions__Then_all_found_sorted(self):
+        actual = self.index.versions(component_type=LibraryComponentType.PLATE, name="Foo")
+
+        assert list(actual.keys()) == [1, 2]
+
+    def test_Given_name_with_regex_characters__Then_found(self):
+        actual = self.index.find(component_type=LibraryComponentType.PLATE, name="Foo (+24 mm)")
+
+        assert actual == self.plate_directory / "Foo (+24 mm) V00.xml"
+
+    def test_Given_no_version__When_find__Then_newest(self):
+        actual = self.index.find(component_type=LibraryComponentType.PLATE, name="Foo")
+
+        assert actual == self.plate_directory / "Foo V02.xml"
+
+    @pytest.mark.parametrize("version", ["1", "01", "V01"])
+    def test_Given_version__When_find__Then_that_version(self, version: str):
+        actual = self.index.find(component_type=LibraryComponentType.PLATE, name="Foo", version=version)
+
+        assert actual == self.plate_directory / "Foo V01.xml"
+
+    def test_Given_version_not_in_library__When_find__Then_error(self):
+        with pytest.raises(IntegraLibraryObjectNotFoundError, match=r"Foo.*version 7.*Foo V01\.xml.*Foo V02\.xml"):
+            _ = self.index.find(component_type=LibraryComponentType.PLATE, name="Foo", version="7")
+
+    def test_Given_file_added_after_index_built__When_cleared__Then_found(self):
+        _ = self.index.find(component_type=LibraryComponentType.PLATE, name="Foo")
+        _ = (self.plate_directory / "Foo V04.xml").write_text("<Plate/>")
+
+        self.index.clear()
+
+        assert self.index.find(component_type=LibraryComponentType.PLATE, name="Foo").name == "Foo V04.xml"
+
+
+class TestLibraryXmlCache:
+    @pytest.fixture(autouse=True)
+    def _setup(self, tmp_path: Path, mocker: MockerFixture):
+        self.cache = LibraryXmlCache(max_size=2)
+        self.plate = Plate(name="BIO-RAD Hard-Shell 96-Well Skirted PCR Plates")
+        self.xml_file = tmp_path / "plate.xml"
+        _ = shutil.copy(self.plate.find_xml_file(), self.xml_file)
+        self.mock_find_xml_file = mocker.patch.object(Plate, "find_xml_file", autospec=True, return_value=self.xml_file)
+
+    def test_When_loaded_twice__Then_second_is_hit(self):
+        first = self.cache.get_root(self.plate)
+
+        second = self.cache.get_root(self.plate)
+
+        assert second is first
+        assert self.cache.info() == LibraryXmlCacheInfo(hits=1, misses=1, max_size=2, current_size=1)
+
+    def test_Given_file_modified__When_loaded__Then_reparsed(self):
+        first = self.cache.get_root(self.plate)
+        original_mtime_ns = self.xml_file.stat().st_mtime_ns
+        os.utime(self.xml_file, ns=(original_mtime_ns + 1_000_000_000, original_mtime_ns + 1_000_000_000))
+
+        second = self.cache.get_root(self.plate)
+
+        assert second is not first
+        assert self.cache.info().hits == 0
+
+    def test_Given_file_deleted__When_loaded__Then_file_found_again(self):
+        _ = self.cache.get_root(self.plate)
+        moved_file = self.xml_file.rename(self.xml_file.with_name("moved.xml"))
+        self.mock_find_xml_file.return_value = moved_file
+
+        _ = self.cache.get_root(self.plate)
+
+        assert self.cache.info().hits == 0
+
+    def test_When_more_components_than_max_size__Then_least_recently_used_evicted(self):
+        other_plates = [
+            Plate(name="BIO-RAD Hard-Shell 96-Well Skirted PCR Plates", xml_file_version=str(version))
+            for version in range(2)
+        ]
+        _ = self.cache.get_root(self.plate)
+        for plate in other_plates:
+            _ = self.cache.get_root(plate)
+
+        _ = self.cache.get_root(self.plate)
+
+        assert self.cache.info() == LibraryXmlCacheInfo(hits=0, misses=4, max_size=2, current_size=2)
+
+    def test_When_cleared__Then_empty(self):
+        _ = self.cache.get_root(self.plate)
+        _ = self.cache.get_root(self.plate)
+
+        self.cache.clear()
+
+        assert self.cache.info() == LibraryXmlCacheInfo(hits=0, misses=0, max_size=2, current_size=0)
+
+
+def test_When_load_xml_result_modified__Then_cached_tree_unchanged():
+    plate = Plate(name="BIO-RAD Hard-Shell 96-Well Skirted PCR Plates")
+    root = plate.load_xml()
+    original_child_count = len(root)
+
+    root.clear()
+
+    assert len(plate.load_xml()) == original_child_count
+
+
+class TestCreateXmlForProgram:
+    @pytest.fixture(autouse=True)
+    def _setup(self, mocker: MockerFixture):
+        LIBRARY_XML_CACHE.clear()  # start from an empty cache
+        self.spied_build = mocker.spy(LibraryComponent, "_build_xml_for_program")
+        self.plate = Plate(name="BIO-RAD Hard-Shell 96-Well Skirted PCR Plates")
+
+    def test_When_created_twice__Then_fragment_only_built_once(self):
+        first = self.plate.create_xml_for_program()
+
+        second = self.plate.create_xml_for_program()
+
+        assert second is not first
+        assert etree.tostring(second) == etree.tostring(first)
+        assert self.spied_build.call_count == 1
+
+    def test_When_result_modified__Then_next_result_unchanged(self):
+        first = self.plate.create_xml_for_program()
+        expected = etree.tostring(first)
+        first.clear()
+
+        actual = self.plate.create_xml_for_program()
+
+        assert etree.tostring(actual) == expected
+
+    def test_Given_library_file_reparsed__Then_fragment_rebuilt(self):
+        _ = self.plate.create_xml_for_program()
+        LIBRARY_XML_CACHE.clear()
+
+        _ = self.plate.create_xml_for_program()
+
+        assert self.spied_build.call_count == 2  # noqa: PLR2004 # once for each parse of the library file
+
+    def test_Given_library_file_evicted__Then_fragment_evicted_with_it(self, mocker: MockerFixture):
+        cache = LibraryXmlCache(max_size=1)
+        _ = mocker.patch.object(integra_xml, "LIBRARY_XML_CACHE", cache)
+        _ = self.plate.create_xml_for_program()
+        _ = Plate(name="BIO-RAD Hard-Shell 96-Well Skirted PCR Plates", xml_file_version="0").create_xml_for_program()
+
+        _ = self.plate.create_xml_for_program()
+
+        assert self.spied_build.call_count == 3  # noqa: PLR2004 # the first plate's fragment was evicted with its tree
+        assert cache.info().current_size == 1
+
+
+class TestIdentify:
+    @pytest.fixture(autouse=True)
+    def _setup(self, tmp_path: Path):
+        plate_directory = tmp_path / LibraryComponentType.PLATE.value
+        plate_directory.mkdir()
+        for version in (1, 2):
+            _ = (plate_directory / f"Foo V0{version}.xml").write_text(
+                f"<Plate><DataVersion>{version}</DataVersion><Name>Foo plate</Name><PartNumber>123</PartNumber></Plate>"
+            )
+        self.index = LibraryIndex(library_path=tmp_path)
+
+    def _identity(self, data_version: str) -> LibraryComponentIdentity:
+        return LibraryComponentIdentity(
+            type=LibraryComponentType.PLATE, name="Foo plate", part_number="123", data_version=data_version
+        )
+
+    @pytest.mark.parametrize(
+        ("data_version", "expected"),
+        [
+            pytest.param("2", ("Foo", None), id="newest version"),
+            pytest.param("1", ("Foo", "V01"), id="older version"),
+        ],
+    )
+    def test_Given_identity_in_library__Then_name_and_version(
+        self, data_version: str, expected: tuple[str, str | None]
+    ):
+        actual = self.index.identify(self._identity(data_version))
+
+        assert actual == expected
+
+    def test_Given_identity_not_in_library__Then_error(self):
+        with pytest.raises(LibraryComponentNotIdentifiedError, match=r"Plate.*Foo plate.*part number 123.*version 3"):
+            _ = self.index.identify(self._identity("3"))
+
+    def test_Given_component_in_standard_library__Then_identified_from_catalog(self, mocker: MockerFixture):
+        tip = Tip(name="300 µl GripTip Sterile Filter Low retention")
+        identity = LibraryComponentIdentity.from_xml(component_type=LibraryComponentType.TIP, element=tip.load_xml())
+        LIBRARY_INDEX.clear()
+        spied_parse = mocker.spy(etree, "parse")
+
+        actual = LIBRARY_INDEX.identify(identity)
+
+        assert actual == (tip.name, None)
+        spied_parse.assert_not_called()
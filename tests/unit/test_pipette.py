@@ -17,6 +17,17 @@ class TestTip:
 
         assert actual == expected
 
+    @pytest.mark.parametrize(
+        ("name", "expected"),
+        [("300 µl GripTip Sterile Filter Low retention", 300), ("1250 µl GripTip Sterile Filter", 1250)],
+    )
+    def test_max_volume(self, name: str, expected: float):
+        tip = Tip(name=name)
+
+        actual = tip.max_volume
+
+        assert actual == expected
+
 
 class TestPipette:
     @pytest.mark.parametrize(
@@ -61,3 +72,30 @@ class TestPipette:
         actual = pipette.num_channels
 
         assert actual is expected
+
+    @pytest.mark.parametrize(
+        ("name", "expected"),
+        [("VOYAGER EIGHT 300 µl", 300), ("VIAFLO EIGHT 12,5 µl", 12.5)],
+    )
+    def test_max_volume(self, name: str, expected: float):
+        pipette = Pipette(name=name)
+
+        actual = pipette.max_volume
+
+        assert actual == expected
+
+    @pytest.mark.parametrize(
+        ("name", "tip_name", "expected"),
+        [
+            pytest.param(
+                "VIAFLO EIGHT 12,5 µl", "12.5 µl GripTip LONG Sterile", 12.5, id="tip holds more than pipette"
+            ),
+            pytest.param("VOYAGER EIGHT 300 µl", "12.5 µl GripTip Sterile", 12.5, id="pipette holds more than tip"),
+        ],
+    )
+    def test_liquid_capacity(self, name: str, tip_name: str, expected: float):
+        pipette = Pipette(name=name)
+
+        actual = pipette.liquid_capacity(Tip(name=tip_name))
+
+        assert actual == expected
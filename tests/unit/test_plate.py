@@ -1,10 +1,19 @@
+import os
+import shutil
+from pathlib import Path
+
 import pytest
+from pytest_mock import MockerFixture
 
 from pyalab import Labware
+from pyalab import LabwareGeometry
+from pyalab import LibraryXmlCache
 from pyalab import Plate
 from pyalab import Reservoir
 from pyalab import RowSpacingAboveLimitError
 from pyalab import Tubeholder
+from pyalab import integra_xml
+from pyalab import plate
 
 from .constants import GENERIC_RESERVOIR
 
@@ -23,6 +32,16 @@ class TestSpacing:
 
         assert actual == expected
 
+    @pytest.mark.parametrize(
+        ("labware", "expected"),
+        [
+            (Plate(name="BIO-RAD Hard-Shell 96-Well Skirted PCR Plates"), 9),
+            (Plate(name="4TITUDE 384 Well Skirted PCR Plate 55 µl"), 4.5),
+        ],
+    )
+    def test_column_spacing(self, labware: Labware, expected: float):
+        assert labware.column_spacing == expected
+
     def test_Given_single_well_reservoir_and_no_explicit_spacing_provided__Then_error(self):
         with pytest.raises(RowSpacingAboveLimitError, match=str(GENERIC_RESERVOIR.row_spacing_in_xml)):
             _ = GENERIC_RESERVOIR.row_spacing()
@@ -60,3 +79,68 @@ class TestFootprint:
 
         assert actual == expected
         assert actual_xml == expected_xml
+
+
+class TestWellLayout:
+    @pytest.mark.parametrize(
+        ("labware", "expected_row_count", "expected_column_count", "expected_well_volume"),
+        [
+            (Plate(name="BIO-RAD Hard-Shell 96-Well Skirted PCR Plates"), 8, 12, 200),
+            (Plate(name="4TITUDE 384 Well Skirted PCR Plate 55 µl"), 16, 24, 55),
+            (Tubeholder(name="Rack for 1.5 ml microcentrifuge tubes"), 8, 6, 1500),
+            (Reservoir(name="INTEGRA 10 ml Multichannel Reservoir"), 1, 1, 10000),
+        ],
+    )
+    def test_well_layout(
+        self, labware: Labware, expected_row_count: int, expected_column_count: int, expected_well_volume: float
+    ):
+        assert labware.row_count == expected_row_count
+        assert labware.column_count == expected_column_count
+        assert labware.well_volume == expected_well_volume
+
+
+class TestGeometry:
+    @pytest.fixture(autouse=True)
+    def _setup(self, mocker: MockerFixture):
+        _ = mocker.patch.dict(plate._labware_geometries, clear=True)  # noqa: SLF001 # start from an empty registry
+        self.spied_extract = mocker.spy(Labware, "_extract_xml_node_text")
+
+    def test_Given_two_instances_of_same_labware__Then_metadata_only_resolved_once(self):
+        plates = [
+            Plate(name="BIO-RAD Hard-Shell 96-Well Skirted PCR Plates", display_name=str(idx)) for idx in range(2)
+        ]
+
+        geometries = [
+            (labware.row_spacing_in_xml, labware.length, labware.width, labware.xml_width, labware.xml_length)
+            for labware in plates
+        ]
+
+        assert geometries[0] == geometries[1]
+        assert plates[0].geometry is plates[1].geometry
+        assert self.spied_extract.call_count == len(LabwareGeometry.model_fields)
+
+    def test_Given_different_labware__Then_separate_geometry(self):
+        first = Plate(name="BIO-RAD Hard-Shell 96-Well Skirted PCR Plates")
+        second = Plate(name="4TITUDE 384 Well Skirted PCR Plate 55 µl")
+
+        assert first.geometry.row_spacing != second.geometry.row_spacing
+
+    def test_Given_library_file_edited__Then_geometry_read_again(self, tmp_path: Path, mocker: MockerFixture):
+        name = "BIO-RAD Hard-Shell 96-Well Skirted PCR Plates"
+        xml_file = tmp_path / "plate.xml"
+        _ = shutil.copy(Plate(name=name).find_xml_file(), xml_file)
+        _ = mocker.patch.object(Plate, "find_xml_file", autospec=True, return_value=xml_file)
+        _ = mocker.patch.object(
+            integra_xml, "LIBRARY_XML_CACHE", LibraryXmlCache()
+        )  # keep the copied file out of the shared cache
+        original = Plate(name=name).geometry
+        _ = xml_file.write_text(xml_file.read_text().replace("<RowGap>900</RowGap>", "<RowGap>450</RowGap>"))
+        bumped_mtime_ns = (
+            xml_file.stat().st_mtime_ns + 1_000_000_000
+        )  # make sure the edit is seen even on coarse filesystem timestamps
+        os.utime(xml_file, ns=(bumped_mtime_ns, bumped_mtime_ns))
+
+        actual = Plate(name=name).geometry
+
+        assert original.row_spacing == 9  # noqa: PLR2004 # the value in the library file
+        assert actual.row_spacing == 4.5  # noqa: PLR2004 # the edited value
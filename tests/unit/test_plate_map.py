@@ -0,0 +1,204 @@
+from collections.abc import Sequence
+
+import pytest
+
+from pyalab import Deck
+from pyalab import DeckLayout
+from pyalab import DeckPosition
+from pyalab import LabwareOrientation
+from pyalab import NonUniformChannelVolumesError
+from pyalab import Pipette
+from pyalab import PipettingLocation
+from pyalab import Plate
+from pyalab import PlateMapShapeError
+from pyalab import Program
+from pyalab import StandardDeckNames
+from pyalab import Tip
+from pyalab import VolumeAboveTipCapacityError
+from pyalab import create_plate_map_steps
+
+from .constants import GENERIC_RESERVOIR
+from .fixtures import ProgramSnapshot
+from .fixtures import arbitrary_d_one_program_framework
+from .fixtures import generate_xml_str
+
+
+class VolumeArray:
+    """Stands in for a NumPy array, which only needs to be convertible to nested lists."""
+
+    def __init__(self, rows: list[list[float]]):
+        super().__init__()
+        self._rows = rows
+
+    def tolist(self) -> list[list[float]]:
+        return self._rows
+
+
+def _column_volumes_to_matrix(column_volumes: Sequence[float], *, num_rows: int = 8) -> list[list[float]]:
+    return [list(column_volumes) for _ in range(num_rows)]
+
+
+class TestEightChannelPlateMap(ProgramSnapshot):
+    @pytest.fixture(autouse=True)
+    def _setup_program(self):
+        self.plate = Plate(name="BIO-RAD Hard-Shell 96-Well Skirted PCR Plates", display_name="PCR Plate")
+        self.program = Program(
+            deck_layouts=[
+                DeckLayout(
+                    deck=Deck(name=StandardDeckNames.THREE_POSITION.value),
+                    labware={
+                        DeckPosition(name="A", orientation=LabwareOrientation.A1_NW_CORNER): GENERIC_RESERVOIR,
+                        DeckPosition(name="B", orientation=LabwareOrientation.A1_NW_CORNER): self.plate,
+                    },
+                )
+            ],
+            display_name="plate-map",
+            description="Fill a plate from a volume matrix",
+            pipette=Pipette(name="VOYAGER EIGHT 300 µl"),
+            tip=Tip(name="300 µl GripTip Sterile Filter Low retention"),
+        )
+        self.source = PipettingLocation(
+            labware=GENERIC_RESERVOIR,
+            deck_section_index=self.program.get_section_index_for_labware(GENERIC_RESERVOIR),
+            column_index=0,
+            upper_left_row_index=0,
+        )
+
+    def _destination_columns(self, steps_volumes: list[list[float]]) -> list[list[int]]:
+        steps = create_plate_map_steps(self.program, source=self.source, destination=self.plate, volumes=steps_volumes)
+        return [[location.column_index for location, _ in step.destinations] for step in steps]
+
+    def test_Given_volume_matrix__Then_snapshot_matches(self):
+        volumes = _column_volumes_to_matrix([50] * 6 + [0] + [100] * 5)
+
+        steps = create_plate_map_steps(
+            self.program,
+            source=self.source,
+            destination=self.plate,
+            volumes=volumes,
+            pipette_span=9,  # the reservoir needs an explicit span
+        )
+        for step in steps:
+            self.program.add_step(step)
+
+        assert generate_xml_str(self.program) == self.snapshot_xml
+
+    def test_Given_volume_matrix__Then_fewest_steps_that_fit_in_tip(self):
+        actual = self._destination_columns(_column_volumes_to_matrix([50] * 6 + [0] + [100] * 5))
+
+        assert actual == [[0, 1, 2, 3, 4, 5], [7, 8, 9], [10, 11]]
+
+    def test_Given_array_like__Then_same_steps_as_lists(self):
+        volumes = _column_volumes_to_matrix([120, 90, 0, 40.5, 0, 0, 280, 10, 10, 10, 10, 10])
+
+        actual = create_plate_map_steps(
+            self.program, source=self.source, destination=self.plate, volumes=VolumeArray(volumes)
+        )
+
+        assert actual == create_plate_map_steps(
+            self.program, source=self.source, destination=self.plate, volumes=volumes
+        )
+
+    def test_Given_extra_volumes__Then_fewer_dispenses_per_aspiration(self):
+        steps = create_plate_map_steps(
+            self.program,
+            source=self.source,
+            destination=self.plate,
+            volumes=_column_volumes_to_matrix([100] * 12),
+            reverse_pipetting_volume=10,
+            pre_dispense_volume=5,
+        )
+
+        assert [len(step.destinations) for step in steps] == [2] * 6
+        assert {step.reverse_pipetting_volume for step in steps} == {10}
+
+    def test_Given_all_zero__Then_no_steps(self):
+        assert self._destination_columns(_column_volumes_to_matrix([0] * 12)) == []
+
+    def test_Given_different_volumes_within_column__Then_error(self):
+        volumes = _column_volumes_to_matrix([10] * 12)
+        volumes[3][4] = 20
+
+        with pytest.raises(NonUniformChannelVolumesError, match="column 4 from row 0"):
+            _ = create_plate_map_steps(self.program, source=self.source, destination=self.plate, volumes=volumes)
+
+    def test_Given_volume_too_large_for_tip__Then_error(self):
+        with pytest.raises(VolumeAboveTipCapacityError, match="300 µl GripTip"):
+            _ = create_plate_map_steps(
+                self.program,
+                source=self.source,
+                destination=self.plate,
+                volumes=_column_volumes_to_matrix([295] * 12),
+                pre_dispense_volume=10,
+            )
+
+    @pytest.mark.parametrize(
+        "volumes",
+        [
+            pytest.param(_column_volumes_to_matrix([10] * 12, num_rows=7), id="rows not a multiple of channels"),
+            pytest.param([[10] * 12] * 7 + [[10] * 11], id="ragged"),
+        ],
+    )
+    def test_Given_wrong_shape__Then_error(self, volumes: list[list[float]]):
+        with pytest.raises(PlateMapShapeError, match="rectangular"):
+            _ = create_plate_map_steps(self.program, source=self.source, destination=self.plate, volumes=volumes)
+
+
+class TestPipetteSmallerThanTip:
+    @pytest.fixture(autouse=True)
+    def _setup(self):
+        self.plate = Plate(name="BIO-RAD Hard-Shell 96-Well Skirted PCR Plates", display_name="PCR Plate")
+        self.program = Program(
+            deck_layouts=[
+                DeckLayout(
+                    deck=Deck(name=StandardDeckNames.THREE_POSITION.value),
+                    labware={DeckPosition(name="B", orientation=LabwareOrientation.A1_NW_CORNER): self.plate},
+                )
+            ],
+            display_name="arbitrary",
+            description="arbitrary",
+            pipette=Pipette(name="VIAFLO EIGHT 12,5 µl"),
+            tip=Tip(name="12.5 µl GripTip LONG Sterile"),  # holds 20 µl, more than the pipette
+        )
+        self.source = PipettingLocation(
+            labware=self.plate,
+            deck_section_index=self.program.get_section_index_for_labware(self.plate),
+            column_index=0,
+            upper_left_row_index=0,
+        )
+
+    def test_Given_volumes__Then_dispenses_per_aspiration_limited_by_pipette(self):
+        steps = create_plate_map_steps(
+            self.program, source=self.source, destination=self.plate, volumes=_column_volumes_to_matrix([5] * 4)
+        )
+
+        assert [len(step.destinations) for step in steps] == [2, 2]
+
+    def test_Given_volume_too_large_for_pipette__Then_error(self):
+        with pytest.raises(VolumeAboveTipCapacityError, match="VIAFLO EIGHT 12,5 µl"):
+            _ = create_plate_map_steps(
+                self.program, source=self.source, destination=self.plate, volumes=_column_volumes_to_matrix([18])
+            )
+
+
+class TestDOnePlateMap:
+    def test_Given_d_one__Then_each_well_dispensed_on_its_own(self):
+        program = arbitrary_d_one_program_framework()
+        plate = program.the_labware
+        source = PipettingLocation(
+            labware=plate,
+            deck_section_index=program.get_section_index_for_labware(plate),
+            column_index=0,
+            upper_left_row_index=0,
+        )
+        volumes = [[0.0] * 12 for _ in range(8)]
+        volumes[2][3] = 25
+        volumes[5][3] = 25
+        volumes[0][7] = 100
+
+        steps = create_plate_map_steps(program, source=source, destination=plate, volumes=volumes)
+
+        assert [
+            [(location.column_index, location.upper_left_row_index, volume) for location, volume in step.destinations]
+            for step in steps
+        ] == [[(3, 2, 25), (3, 5, 25), (7, 0, 100)]]
@@ -0,0 +1,177 @@
+import pickle
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import pytest
+from pytest_mock import MockerFixture
+
+from pyalab import ContentDerivedIds
+from pyalab import IdProvider
+from pyalab import Program
+from pyalab import ProgramCache
+from pyalab import ProgramCacheInfo
+from pyalab import RandomIds
+from pyalab import SeededIds
+from pyalab import SetInitialVolume
+from pyalab import SetVolume
+from pyalab import generate_many
+from pyalab import program as program_module
+
+from .fixtures import arbitrary_eight_channel_program_framework
+
+
+def _create_program(
+    id_provider: IdProvider | None = None, *, volume: float = 100, set_volume_type: type[SetVolume] = SetInitialVolume
+) -> Program:
+    program = arbitrary_eight_channel_program_framework(SeededIds(seed=0) if id_provider is None else id_provider)
+    plate = program.the_labware
+    program.add_step(set_volume_type(labware=plate, column_index=0, volume=volume))
+    return program
+
+
+class TestFingerprint:
+    def test_Given_identical_programs_with_different_labware_instances__Then_same_fingerprint(self):
+        first_program = _create_program()
+        second_program = _create_program()
+        assert first_program.the_labware.id != second_program.the_labware.id
+
+        assert first_program.fingerprint == second_program.fingerprint
+
+    @pytest.mark.parametrize(
+        "other_program",
+        [
+            pytest.param(_create_program(volume=50), id="step field"),
+            pytest.param(_create_program(set_volume_type=SetVolume), id="step type"),
+            pytest.param(_create_program(SeededIds(seed=1)), id="seed"),
+            pytest.param(_create_program(ContentDerivedIds()), id="id provider"),
+        ],
+    )
+    def test_Given_difference__Then_different_fingerprint(self, other_program: Program):
+        assert other_program.fingerprint != _create_program().fingerprint
+
+    def test_Given_library_file_changed__Then_different_fingerprint(self, mocker: MockerFixture):
+        program = _create_program()
+        original_fingerprint = program.fingerprint
+
+        def changed_digest(file: Path) -> str:
+            return f"changed {file.name}"
+
+        _ = mocker.patch.object(program_module, "library_file_digest", side_effect=changed_digest)
+
+        assert program.fingerprint != original_fingerprint
+
+    def test_Given_pyalab_not_installed__Then_fingerprint_still_created(self, mocker: MockerFixture):
+        installed_fingerprint = _create_program().fingerprint
+        program_module._pyalab_version.cache_clear()  # noqa: SLF001 # the version is looked up once per process
+        _ = mocker.patch.object(
+            program_module.importlib.metadata,
+            "version",
+            autospec=True,
+            side_effect=program_module.importlib.metadata.PackageNotFoundError("pyalab"),
+        )
+
+        try:
+            actual = _create_program().fingerprint
+        finally:
+            program_module._pyalab_version.cache_clear()  # noqa: SLF001 # look up the real version again afterwards
+
+        assert actual != installed_fingerprint  # the installed version is part of the usual fingerprint
+
+
+class TestProgramCache:
+    @pytest.fixture(autouse=True)
+    def _setup(self):
+        with TemporaryDirectory() as temp_dir:
+            self.cache_dir = Path(temp_dir) / "cache"
+            self.cache = ProgramCache(self.cache_dir)
+            yield
+
+    def test_Given_program_written_before__Then_copied_from_cache(self, mocker: MockerFixture):
+        expected = _create_program().generate_xml()
+        assert _create_program().generate_xml(cache=self.cache) == expected
+        spied_write = mocker.spy(Program, "_write_program")
+
+        actual = _create_program().generate_xml(cache=self.cache)
+
+        assert actual == expected
+        spied_write.assert_not_called()
+        assert self.cache.info() == ProgramCacheInfo(hits=1, misses=1, evictions=0, max_bytes=self.cache.max_bytes)
+
+    def test_Given_saved_program__Then_whether_copied_from_cache_returned(self):
+        with TemporaryDirectory() as temp_dir:
+            file_path = Path(temp_dir) / "program.iaa"
+
+            actual = [_create_program().save_program(file_path, cache=self.cache) for _ in range(2)]
+
+            assert actual == [False, True]
+            assert file_path.read_text() == _create_program().generate_xml()
+
+    def test_Given_random_ids__Then_cache_not_used(self):
+        program = _create_program(RandomIds())
+
+        actual = [program.generate_xml(cache=self.cache) for _ in range(2)]
+
+        assert actual[0] != actual[1]
+        assert self.cache.info().misses == 0
+        assert not self.cache_dir.exists()
+
+    def test_Given_extra_steps__Then_cache_not_used(self):
+        program = _create_program()
+        extra_step = SetInitialVolume(labware=program.the_labware, column_index=1, volume=20)
+
+        with TemporaryDirectory() as temp_dir:
+            actual = program.save_program(Path(temp_dir) / "program.iaa", steps=[extra_step], cache=self.cache)
+
+        assert actual is False
+        assert not self.cache_dir.exists()
+
+    def test_Given_cache_full__Then_least_recently_used_entry_evicted(self):
+        self.cache.put("a", b"1234")
+        self.cache.put("b", b"1234")
+        _ = self.cache.get("a")
+        self.cache.max_bytes = 8
+
+        self.cache.put("c", b"1234")
+
+        assert [self.cache.get(key) for key in ("a", "b", "c")] == [b"1234", None, b"1234"]
+        assert self.cache.info().evictions == 1
+
+    def test_Given_entry_removed_by_another_process_during_eviction__Then_skipped(self, mocker: MockerFixture):
+        self.cache.max_bytes = 0
+        _ = mocker.patch.object(Path, "glob", return_value=iter([self.cache_dir / "gone.iaa"]))
+
+        self.cache.put("a", b"1234")
+
+        assert self.cache.info().evictions == 0
+
+    def test_Given_cleared__Then_entries_and_counts_removed(self):
+        self.cache.put("a", b"1234")
+        _ = self.cache.get("a")
+
+        self.cache.clear()
+
+        assert self.cache.get("a") is None
+        assert (self.cache.info().hits, self.cache.info().misses) == (0, 1)
+
+    def test_Given_pickled__Then_same_directory_and_size(self):
+        self.cache.max_bytes = 123
+        _ = self.cache.get("a")
+
+        actual = pickle.loads(pickle.dumps(self.cache))  # noqa: S301 # pickled in this test
+
+        assert (actual.directory, actual.max_bytes) == (self.cache_dir, 123)
+        assert actual.info().misses == 0
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_Given_batch_generated_twice__Then_second_batch_copied_from_cache(self, workers: int):
+        programs = {f"plate-{idx}": _create_program(volume=10 + idx) for idx in range(3)}
+        with TemporaryDirectory() as temp_dir:
+            out_dir = Path(temp_dir)
+            first_reports = generate_many(programs, out_dir / "first", workers=workers, cache=self.cache)
+
+            actual = generate_many(programs, out_dir / "second", workers=workers, cache=self.cache)
+
+            assert [report.from_cache for report in first_reports] == [False] * 3
+            assert [report.from_cache for report in actual] == [True] * 3
+            for report in actual:
+                assert report.file_path.read_bytes() == (out_dir / "first" / report.file_path.name).read_bytes()
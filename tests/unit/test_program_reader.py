@@ -0,0 +1,211 @@
+import io
+import json
+import re
+from collections.abc import Callable
+from pathlib import Path
+
+import pytest
+from lxml import etree
+from lxml.etree import _Element
+
+from pyalab import Deck
+from pyalab import DeckLayout
+from pyalab import DeckPosition
+from pyalab import DispenseParameters
+from pyalab import LabwareOrientation
+from pyalab import LibraryComponentNotIdentifiedError
+from pyalab import MissingProgramElementError
+from pyalab import MultiDispense
+from pyalab import MultiSectionTransferError
+from pyalab import NoLabwareInDeckSectionError
+from pyalab import Pipette
+from pyalab import PipettingLocation
+from pyalab import Plate
+from pyalab import Program
+from pyalab import Reservoir
+from pyalab import SetInitialVolume
+from pyalab import StandardDeckNames
+from pyalab import Tip
+from pyalab import TipChangeMode
+from pyalab import Transfer
+from pyalab import UnsupportedLabwareTypeError
+from pyalab import UnsupportedProgramContentError
+from pyalab import UnsupportedStepTypeError
+from pyalab import read_program
+
+from .constants import GENERIC_RESERVOIR
+from .fixtures import NonLiquidStep
+
+SNAPSHOT_FILES = sorted(Path(__file__).parent.glob("**/__snapshots__/**/*.xml"))
+UUID_REGEX = re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}")
+
+
+def _without_uuids(xml: str) -> str:
+    return UUID_REGEX.sub("<uuid>", xml)
+
+
+@pytest.mark.parametrize("file_path", [pytest.param(file_path, id=file_path.stem) for file_path in SNAPSHOT_FILES])
+def test_Given_generated_program__When_read_and_regenerated__Then_xml_matches(file_path: Path):
+    program = read_program(file_path)
+
+    assert _without_uuids(program.generate_xml()) == _without_uuids(file_path.read_text())
+
+
+class TestReadProgram:
+    @pytest.fixture(autouse=True)
+    def _setup(self):
+        self.plate = Plate(name="BIO-RAD Hard-Shell 96-Well Skirted PCR Plates", display_name="PCR Plate")
+        self.program = Program(
+            deck_layouts=[
+                DeckLayout(
+                    deck=Deck(name=StandardDeckNames.THREE_POSITION.value),
+                    labware={
+                        DeckPosition(name="A", orientation=LabwareOrientation.A1_NW_CORNER): GENERIC_RESERVOIR,
+                        DeckPosition(name="B", orientation=LabwareOrientation.A1_NW_CORNER): self.plate,
+                    },
+                    name="Setup",
+                )
+            ],
+            display_name="audit me",
+            description="hand-edited in Vialab",
+            pipette=Pipette(name="VOYAGER EIGHT 300 µl"),
+            tip=Tip(name="300 µl GripTip Sterile Filter Low retention"),
+        )
+        self.reservoir_section_index = self.program.get_section_index_for_labware(GENERIC_RESERVOIR)
+        self.plate_section_index = self.program.get_section_index_for_labware(self.plate)
+
+    def _plate_location(self, column_index: int) -> PipettingLocation:
+        return PipettingLocation(
+            labware=self.plate,
+            deck_section_index=self.plate_section_index,
+            column_index=column_index,
+            upper_left_row_index=0,
+        )
+
+    def _read_edited(self, edit: Callable[[_Element], None]) -> Program:
+        root = etree.fromstring(self.program.generate_xml().encode())
+        edit(root)
+        return read_program(io.BytesIO(etree.tostring(root)))
+
+    def test_Given_stream__Then_header_hardware_and_deck_layout_read(self):
+        actual = read_program(io.BytesIO(self.program.generate_xml().encode()))
+
+        assert (actual.display_name, actual.description) == ("audit me", "hand-edited in Vialab")
+        assert actual.pipette == self.program.pipette
+        assert actual.tip == self.program.tip
+        deck_layout = actual.deck_layouts[0]
+        assert (deck_layout.deck, deck_layout.name) == (self.program.deck_layouts[0].deck, "Setup")
+        assert {
+            position: (type(labware), labware.name, labware.display_name)
+            for position, labware in deck_layout.labware.items()
+        } == {
+            DeckPosition(name="A", orientation=LabwareOrientation.A1_NW_CORNER): (
+                Reservoir,
+                GENERIC_RESERVOIR.name,
+                "",
+            ),
+            DeckPosition(name="B", orientation=LabwareOrientation.A1_NW_CORNER): (Plate, self.plate.name, "PCR Plate"),
+        }
+
+    def test_Given_steps__Then_steps_use_the_labware_in_the_deck_layout(self):
+        self.program.add_step(SetInitialVolume(labware=self.plate, column_index=0, volume=100))
+        self.program.add_step(
+            MultiDispense(
+                source=self._plate_location(0),
+                destinations=[(self._plate_location(1), 10), (self._plate_location(2), 20.5)],
+                dispense_parameters=DispenseParameters(start_height=5, liquid_speed=3, post_delay=2),
+                tip_change_mode=TipChangeMode.NO_CHANGE,
+            )
+        )
+
+        actual = read_program(io.BytesIO(self.program.generate_xml().encode()))
+
+        set_volume_step, multi_dispense_step = actual.steps
+        read_plate = actual.deck_layouts[0].labware[DeckPosition(name="B", orientation=LabwareOrientation.A1_NW_CORNER)]
+        assert isinstance(set_volume_step, SetInitialVolume)
+        assert set_volume_step.labware is read_plate
+        assert (set_volume_step.column_index, set_volume_step.volume) == (0, 100)
+        assert isinstance(multi_dispense_step, MultiDispense)
+        assert [(destination.labware, volume) for destination, volume in multi_dispense_step.destinations] == [
+            (read_plate, 10),
+            (read_plate, 20.5),
+        ]
+        assert multi_dispense_step.dispense_parameters == DispenseParameters(
+            start_height=5, liquid_speed=3, post_delay=2
+        )
+        assert multi_dispense_step.tip_change_mode == TipChangeMode.NO_CHANGE
+        assert actual.calculate_tip_usage() == self.program.calculate_tip_usage()
+
+    def test_Given_unsupported_step_type__Then_error(self):
+        self.program.add_step(NonLiquidStep())
+
+        with pytest.raises(UnsupportedStepTypeError, match="step of type 'NonLiquid'"):
+            _ = read_program(io.BytesIO(self.program.generate_xml().encode()))
+
+    def test_Given_transfer_between_more_than_one_pair_of_sections__Then_error(self):
+        self.program.add_step(
+            Transfer(
+                source=self.plate, destination=self.plate, source_column_index=0, destination_column_index=1, volume=5
+            )
+        )
+
+        def add_source_section(root: _Element) -> None:
+            value = root.find("./Steps/Step/ValueGroups/ValueGroup[@Key='Source']/Values/Value[@Key='MultiSelection']")
+            assert value is not None
+            assert value.text is not None
+            source_info = json.loads(value.text)
+            value.text = json.dumps([*source_info, source_info[0]])
+
+        with pytest.raises(MultiSectionTransferError, match="more than one pair of deck sections"):
+            _ = self._read_edited(add_source_section)
+
+    def test_Given_step_using_an_empty_section__Then_error(self):
+        self.program.add_step(SetInitialVolume(labware=self.plate, column_index=0, section_index=0, volume=100))
+
+        with pytest.raises(NoLabwareInDeckSectionError, match="deck section 0"):
+            _ = read_program(io.BytesIO(self.program.generate_xml().encode()))
+
+    @pytest.mark.parametrize("element_name", ["Pipette", "Tips", "AllDecks"])
+    def test_Given_missing_element__Then_error(self, element_name: str):
+        def remove_element(root: _Element) -> None:
+            element = root.find(element_name)
+            assert element is not None
+            root.remove(element)
+
+        with pytest.raises(MissingProgramElementError, match=f"<{element_name}>"):
+            _ = self._read_edited(remove_element)
+
+    def test_Given_component_not_in_library__Then_error(self):
+        def rename_pipette(root: _Element) -> None:
+            name = root.find("./Pipette/Name")
+            assert name is not None
+            name.text = "Not a pipette"
+
+        with pytest.raises(LibraryComponentNotIdentifiedError, match=r"Pipette.*Not a pipette"):
+            _ = self._read_edited(rename_pipette)
+
+    def test_Given_unknown_type_of_labware__Then_error(self):
+        def change_labware_type(root: _Element) -> None:
+            for content in root.iterfind("./AllDecks/Deck/Sections/Section/Content"):
+                content.set("{http://www.w3.org/2001/XMLSchema-instance}type", "Centrifuge")
+
+        with pytest.raises(UnsupportedLabwareTypeError, match="labware of type 'Centrifuge'"):
+            _ = self._read_edited(change_labware_type)
+
+    def test_Given_two_labware_in_the_same_deck_position__Then_error(self):
+        def add_second_plate(root: _Element) -> None:
+            sections = root.findall("./AllDecks/Deck/Sections/Section")
+            plate_section = sections[self.plate_section_index]
+            other_section = next(
+                section
+                for section in sections
+                if section is not plate_section
+                and section.findtext("Name") == "B"
+                and section.findtext("OrientationExtended") == "Landscape"
+            )
+            content = plate_section.find("Content")
+            assert content is not None
+            other_section.append(etree.fromstring(etree.tostring(content)))
+
+        with pytest.raises(UnsupportedProgramContentError, match="deck position B with orientation Landscape"):
+            _ = self._read_edited(add_second_plate)
@@ -0,0 +1,197 @@
+import pytest
+from pytest_mock import MockerFixture
+
+from pyalab import AspirateParameters
+from pyalab import DispenseParameters
+from pyalab import MultiDispense
+from pyalab import NoRunTimeToCalibrateError
+from pyalab import Pipette
+from pyalab import PipettingLocation
+from pyalab import Plate
+from pyalab import RunTimeEstimate
+from pyalab import RunTimeEstimator
+from pyalab import RunTimeParameters
+from pyalab import SetInitialVolume
+from pyalab import StepRunTime
+from pyalab import Tip
+from pyalab import TipChangeMode
+from pyalab import Transfer
+from pyalab import TransferWellPair
+from pyalab import run_time
+
+from .fixtures import NonLiquidStep
+from .fixtures import arbitrary_eight_channel_program_framework
+
+# the default parameters, for a 300 µl tip
+TIP_CHANGE_SECONDS = 8 + 150 / 250  # the change itself, and the trip to the tip box
+SECTION_MOVE_SECONDS = 150 / 250 + 2 * 30 / 100  # across the deck, and down into the well and back up
+COLUMN_MOVE_SECONDS = 9 / 250 + 2 * 30 / 100  # to the neighbouring column of a 96-well plate
+SECONDS_PER_UL = 2 / 300 * 10 / 8  # at the default liquid speed
+
+
+class TestRunTimeEstimate:
+    @pytest.fixture(autouse=True)
+    def _setup(self):
+        self.program = arbitrary_eight_channel_program_framework()
+        plate = self.program.the_labware
+        assert isinstance(plate, Plate)
+        self.plate = plate
+        self.section_index = self.program.get_section_index_for_labware(self.plate)
+
+    def _location(self, column_index: int) -> PipettingLocation:
+        return PipettingLocation(
+            labware=self.plate, deck_section_index=self.section_index, column_index=column_index, upper_left_row_index=0
+        )
+
+    def _add_multi_dispense(self, tip_change_mode: TipChangeMode) -> None:
+        self.program.add_step(
+            MultiDispense(
+                source=self._location(0),
+                destinations=[(self._location(1), 10), (self._location(2), 20)],
+                tip_change_mode=tip_change_mode,
+            )
+        )
+
+    def test_Given_no_steps__Then_zero(self):
+        actual = self.program.estimate_run_time()
+
+        assert actual == RunTimeEstimate(steps=[])
+        assert actual.total == 0
+
+    def test_Given_set_volume__Then_manual_time(self):
+        self.program.add_step(SetInitialVolume(labware=self.plate, column_index=0, volume=100))
+
+        actual = self.program.estimate_run_time(RunTimeParameters(manual_step_seconds=30))
+
+        assert actual.steps == [StepRunTime(step_index=0, step_type="ManualFilling_First", manual=30)]
+        assert actual.total == 30  # noqa: PLR2004 # the manual step time
+
+    def test_Given_transfer_with_tip_change_for_every_pair__Then_breakdown(self):
+        self.program.add_step(
+            Transfer(
+                source=self.plate,
+                destination=self.plate,
+                well_pairs=[
+                    TransferWellPair(source_column_index=0, destination_column_index=1),
+                    TransferWellPair(source_column_index=0, destination_column_index=2),
+                ],
+                volume=30,
+                aspirate_parameters=AspirateParameters(post_delay=1),
+                dispense_parameters=DispenseParameters(liquid_speed=4, post_delay=2),
+            )
+        )
+
+        actual = self.program.estimate_run_time().steps[0]
+
+        assert actual.tip_changes == pytest.approx(2 * TIP_CHANGE_SECONDS)
+        assert actual.movement == pytest.approx(
+            2 * SECTION_MOVE_SECONDS + COLUMN_MOVE_SECONDS + (2 * 9 / 250 + 2 * 30 / 100)
+        )
+        assert actual.liquid_handling == pytest.approx(2 * (30 * SECONDS_PER_UL + 30 * SECONDS_PER_UL * 8 / 4))
+        assert actual.delays == 2 * (1 + 2)
+        assert actual.mixing == 0
+
+    def test_Given_pipette_holds_less_than_tip__Then_liquid_handling_scaled_by_pipette_volume(self):
+        self.program.pipette = Pipette(name="VIAFLO EIGHT 12,5 µl")
+        self.program.tip = Tip(name="12.5 µl GripTip LONG Sterile")  # holds 20 µl
+        self.program.add_step(
+            Transfer(
+                source=self.plate, source_column_index=0, destination=self.plate, destination_column_index=1, volume=10
+            )
+        )
+
+        actual = self.program.estimate_run_time().steps[0]
+
+        assert actual.liquid_handling == pytest.approx(2 * 10 * 2 / 12.5 * 10 / 8)
+
+    def test_Given_transfer_changing_tips_after_the_step__Then_tips_only_picked_up_once(self):
+        self.program.add_step(
+            Transfer(
+                source=self.plate,
+                destination=self.plate,
+                well_pairs=[
+                    TransferWellPair(source_column_index=0, destination_column_index=1),
+                    TransferWellPair(source_column_index=0, destination_column_index=2),
+                ],
+                volume=30,
+                tip_change_mode=TipChangeMode.AFTER_STEP,
+            )
+        )
+
+        actual = self.program.estimate_run_time().steps[0]
+
+        assert actual.tip_changes == pytest.approx(TIP_CHANGE_SECONDS)
+
+    def test_Given_multi_dispenses_without_tip_change__Then_tips_only_picked_up_once(self):
+        self._add_multi_dispense(TipChangeMode.NO_CHANGE)
+        self._add_multi_dispense(TipChangeMode.AFTER_STEP)
+
+        first, second = self.program.estimate_run_time().steps
+
+        assert first.tip_changes == pytest.approx(TIP_CHANGE_SECONDS)
+        assert second.tip_changes == 0
+        # back two columns to the source, then one column to each destination
+        assert second.movement == pytest.approx(3 * 2 * 30 / 100 + (2 + 1 + 1) * 9 / 250)
+        assert first.liquid_handling == pytest.approx(2 * 30 * SECONDS_PER_UL)
+
+    def test_Given_pre_dispense_and_reverse_pipetting__Then_extra_liquid_handling(self):
+        self.program.add_step(
+            MultiDispense(
+                source=self._location(0),
+                destinations=[(self._location(1), 10)],
+                pre_dispense_volume=5,
+                reverse_pipetting_volume=3,
+            )
+        )
+
+        actual = self.program.estimate_run_time().steps[0]
+
+        assert actual.liquid_handling == pytest.approx((18 + 5 + 10) * SECONDS_PER_UL)
+
+    def test_Given_mixing__Then_mix_cycles_included(self, mocker: MockerFixture):
+        _ = mocker.patch.object(run_time, "MIX_ACTIVE", new=True)
+        self._add_multi_dispense(TipChangeMode.AFTER_STEP)
+
+        actual = self.program.estimate_run_time().steps[0]
+
+        # a source and two destination wells, each aspirating and dispensing the mix volume each cycle
+        assert actual.mixing == pytest.approx(3 * 3 * 2 * 50 * 2 / 300 * 10 / 8)
+
+    def test_Given_step_that_moves_no_liquid__Then_zero_but_included_in_breakdown(self):
+        estimator = RunTimeEstimator(pipette=self.program.pipette)
+        estimator.add_steps([NonLiquidStep()])
+
+        assert estimator.estimate.steps == [StepRunTime(step_index=0, step_type="NonLiquid")]
+
+    def test_Given_scale__Then_every_time_scaled(self):
+        self._add_multi_dispense(TipChangeMode.AFTER_STEP)
+        unscaled = self.program.estimate_run_time()
+
+        actual = self.program.estimate_run_time(RunTimeParameters(scale=2))
+
+        assert actual.total == pytest.approx(2 * unscaled.total)
+        assert actual.steps[0].movement == pytest.approx(2 * unscaled.steps[0].movement)
+
+
+class TestCalibration:
+    def _estimate(self, total: float) -> RunTimeEstimate:
+        return RunTimeEstimate(steps=[StepRunTime(step_index=0, step_type="arbitrary", movement=total)])
+
+    def test_Given_proportional_measured_runs__Then_scale_fitted(self):
+        parameters = RunTimeParameters(scale=2)
+
+        actual = parameters.calibrated([(self._estimate(10), 15), (self._estimate(20), 30)])
+
+        assert actual.scale == pytest.approx(3)
+        assert actual.tip_change_seconds == parameters.tip_change_seconds
+
+    @pytest.mark.parametrize(
+        "totals",
+        [
+            pytest.param([], id="no runs"),
+            pytest.param([0.0], id="zero estimate"),
+        ],
+    )
+    def test_Given_no_estimated_time__Then_error(self, totals: list[float]):
+        with pytest.raises(NoRunTimeToCalibrateError, match="non-zero estimated run time"):
+            _ = RunTimeParameters().calibrated([(self._estimate(total), 10) for total in totals])
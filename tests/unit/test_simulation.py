@@ -0,0 +1,263 @@
+import pytest
+
+from pyalab import Deck
+from pyalab import DeckLayout
+from pyalab import DeckPosition
+from pyalab import LabwareOrientation
+from pyalab import MultiDispense
+from pyalab import Pipette
+from pyalab import PipettingLocation
+from pyalab import Plate
+from pyalab import Program
+from pyalab import SetInitialVolume
+from pyalab import SetVolume
+from pyalab import StandardDeckNames
+from pyalab import Tip
+from pyalab import Transfer
+from pyalab import TransferWellPair
+from pyalab import VolumeIssue
+from pyalab import VolumeIssueType
+from pyalab import VolumeSimulator
+
+from .constants import GENERIC_RESERVOIR
+from .fixtures import NonLiquidStep
+from .fixtures import arbitrary_d_one_program_framework
+
+
+class TestEightChannelSimulation:
+    @pytest.fixture(autouse=True)
+    def _setup(self):
+        self.plate = Plate(name="BIO-RAD Hard-Shell 96-Well Skirted PCR Plates", display_name="PCR Plate")
+        self.program = Program(
+            deck_layouts=[
+                DeckLayout(
+                    deck=Deck(name=StandardDeckNames.THREE_POSITION.value),
+                    labware={
+                        DeckPosition(name="A", orientation=LabwareOrientation.A1_NW_CORNER): GENERIC_RESERVOIR,
+                        DeckPosition(name="B", orientation=LabwareOrientation.A1_NW_CORNER): self.plate,
+                    },
+                )
+            ],
+            display_name="arbitrary",
+            description="arbitrary",
+            pipette=Pipette(name="VOYAGER EIGHT 300 µl"),
+            tip=Tip(name="300 µl GripTip Sterile Filter Low retention"),
+        )
+        self.reservoir_section_index = self.program.get_section_index_for_labware(GENERIC_RESERVOIR)
+        self.plate_section_index = self.program.get_section_index_for_labware(self.plate)
+
+    def _plate_location(self, column_index: int) -> PipettingLocation:
+        return PipettingLocation(
+            labware=self.plate,
+            deck_section_index=self.plate_section_index,
+            column_index=column_index,
+            upper_left_row_index=0,
+        )
+
+    def test_Given_no_steps__Then_no_volumes_or_issues(self):
+        result = self.program.simulate_volumes()
+
+        assert result.final_volumes == {}
+        assert result.succeeded is True
+
+    def test_Given_initial_volume_and_transfers__Then_volumes_moved_for_every_channel(self):
+        self.program.add_step(SetInitialVolume(labware=self.plate, column_index=0, volume=100))
+        self.program.add_step(
+            Transfer(
+                source=self.plate,
+                destination=self.plate,
+                well_pairs=[
+                    TransferWellPair(source_column_index=0, destination_column_index=1),
+                    TransferWellPair(source_column_index=0, destination_column_index=2),
+                ],
+                volume=20,
+            )
+        )
+
+        result = self.program.simulate_volumes()
+
+        assert result.succeeded is True
+        assert result.final_volumes[self.plate_section_index] == [[60, 20, 20] + [0] * 9 for _ in range(8)]
+
+    def test_Given_aspirating_more_than_the_well_holds__Then_underdraw_flagged_for_each_channel(self):
+        self.program.add_step(SetInitialVolume(labware=self.plate, column_index=0, volume=10))
+        self.program.add_step(
+            Transfer(
+                source=self.plate, destination=self.plate, source_column_index=0, destination_column_index=1, volume=15
+            )
+        )
+
+        result = self.program.simulate_volumes()
+
+        assert result.succeeded is False
+        assert result.issues == [
+            VolumeIssue(
+                step_index=1,
+                issue_type=VolumeIssueType.UNDERDRAW,
+                deck_section_index=self.plate_section_index,
+                row_index=row_index,
+                column_index=0,
+                volume=-5,
+            )
+            for row_index in range(8)
+        ]
+
+    def test_Given_dispensing_above_the_nominal_well_volume__Then_overflow_flagged(self):
+        self.program.add_step(SetInitialVolume(labware=self.plate, column_index=0, volume=150))
+        self.program.add_step(SetVolume(labware=self.plate, column_index=1, volume=150))
+        self.program.add_step(
+            Transfer(
+                source=self.plate, destination=self.plate, source_column_index=0, destination_column_index=1, volume=100
+            )
+        )
+
+        result = self.program.simulate_volumes()
+
+        assert {issue.issue_type for issue in result.issues} == {VolumeIssueType.OVERFLOW}
+        assert [(issue.row_index, issue.column_index, issue.volume) for issue in result.issues] == [
+            (row_index, 1, 250) for row_index in range(8)
+        ]
+
+    def test_Given_volume_set_above_the_nominal_well_volume__Then_overflow_flagged(self):
+        self.program.add_step(SetInitialVolume(labware=self.plate, column_index=0, volume=250))
+
+        result = self.program.simulate_volumes()
+
+        assert len(result.issues) == self.plate.row_count
+        assert result.issues[0].issue_type == VolumeIssueType.OVERFLOW
+
+    def test_Given_channels_beyond_the_last_row__Then_out_of_bounds_flagged(self):
+        self.program.add_step(SetInitialVolume(labware=self.plate, column_index=0, volume=100))
+        self.program.add_step(
+            Transfer(
+                source=self.plate,
+                destination=self.plate,
+                source_column_index=0,
+                source_row_index=1,
+                destination_column_index=1,
+                volume=10,
+            )
+        )
+
+        result = self.program.simulate_volumes()
+
+        assert result.issues == [
+            VolumeIssue(
+                step_index=1,
+                issue_type=VolumeIssueType.OUT_OF_BOUNDS,
+                deck_section_index=self.plate_section_index,
+                row_index=8,
+                column_index=0,
+                volume=-10,
+            )
+        ]
+
+    @pytest.mark.parametrize(
+        ("pre_dispense_volume", "reverse_pipetting_volume", "expected_reservoir_volume"),
+        [
+            pytest.param(0, 0, 10000 - 8 * 30, id="no extra volume"),
+            pytest.param(5, 0, 10000 - 8 * 30, id="pre-dispense returned to source"),
+            pytest.param(0, 5, 10000 - 8 * 35, id="reverse pipetting volume discarded"),
+        ],
+    )
+    def test_Given_multi_dispense_from_reservoir__Then_every_channel_draws_from_the_single_well(
+        self, pre_dispense_volume: float, reverse_pipetting_volume: float, expected_reservoir_volume: float
+    ):
+        self.program.add_step(SetInitialVolume(labware=GENERIC_RESERVOIR, column_index=0, volume=10000))
+        self.program.add_step(
+            MultiDispense(
+                source=PipettingLocation(
+                    labware=GENERIC_RESERVOIR,
+                    deck_section_index=self.reservoir_section_index,
+                    column_index=0,
+                    upper_left_row_index=0,
+                ),
+                destinations=[(self._plate_location(0), 10), (self._plate_location(1), 20)],
+                pre_dispense_volume=pre_dispense_volume,
+                reverse_pipetting_volume=reverse_pipetting_volume,
+                pipette_span=9,
+            )
+        )
+
+        result = self.program.simulate_volumes()
+
+        assert result.succeeded is True
+        assert result.final_volumes[self.reservoir_section_index] == [[expected_reservoir_volume]]
+        assert result.final_volumes[self.plate_section_index] == [[10, 20] + [0] * 10 for _ in range(8)]
+
+    def test_Given_multi_dispense_from_an_empty_reservoir__Then_underdraw_flagged(self):
+        self.program.add_step(
+            MultiDispense(
+                source=PipettingLocation(
+                    labware=GENERIC_RESERVOIR,
+                    deck_section_index=self.reservoir_section_index,
+                    column_index=0,
+                    upper_left_row_index=0,
+                ),
+                destinations=[(self._plate_location(0), 10)],
+                pipette_span=9,
+            )
+        )
+
+        result = self.program.simulate_volumes()
+
+        assert result.issues[-1].volume == -80  # noqa: PLR2004 # 8 channels of 10 µl each
+        assert result.issues[0].issue_type == VolumeIssueType.UNDERDRAW
+
+    def test_Given_merged_set_volume_steps__Then_every_merged_volume_set(self):
+        for column_index in range(3):
+            self.program.add_step(SetVolume(labware=self.plate, column_index=column_index, volume=column_index + 1))
+        _ = self.program.collapse_set_volume_steps()
+
+        result = self.program.simulate_volumes()
+
+        assert result.final_volumes[self.plate_section_index][7][:4] == [1, 2, 3, 0]
+
+    def test_Given_step_that_moves_no_liquid__Then_only_counted_in_step_index(self):
+        self.program.add_step(SetInitialVolume(labware=self.plate, column_index=0, volume=250))
+        simulator = VolumeSimulator(pipette=self.program.pipette)
+        simulator.add_steps([NonLiquidStep(), *self.program.steps])
+
+        result = simulator.result
+
+        assert result.final_volumes[self.plate_section_index][0][0] == 250  # noqa: PLR2004 # the volume that was set
+        assert result.issues[0].step_index == 1
+
+
+class TestDOneSimulation:
+    @pytest.fixture(autouse=True)
+    def _setup(self):
+        self.program = arbitrary_d_one_program_framework()
+        plate = next(iter(self.program.deck_layouts[0].labware.values()))
+        assert isinstance(plate, Plate)
+        self.plate = plate
+        self.section_index = self.program.get_section_index_for_labware(self.plate)
+
+    def test_Given_row_index__Then_only_that_well_set_and_transferred(self):
+        self.program.add_step(SetInitialVolume(labware=self.plate, column_index=0, row_index=3, volume=50))
+        self.program.add_step(SetVolume(labware=self.plate, column_index=2, volume=5))
+        self.program.add_step(
+            Transfer(
+                source=self.plate,
+                destination=self.plate,
+                source_column_index=0,
+                source_row_index=3,
+                destination_column_index=1,
+                destination_row_index=4,
+                volume=20,
+            )
+        )
+
+        result = self.program.simulate_volumes()
+
+        assert result.succeeded is True
+        volumes = result.final_volumes[self.section_index]
+        assert (volumes[3][0], volumes[4][1], volumes[0][2]) == (30, 20, 5)
+        assert sum(sum(row) for row in volumes) == 55  # noqa: PLR2004 # no other wells changed
+
+    def test_Given_well_outside_the_plate__Then_out_of_bounds_flagged(self):
+        self.program.add_step(SetInitialVolume(labware=self.plate, column_index=12, volume=50))
+
+        result = self.program.simulate_volumes()
+
+        assert [issue.issue_type for issue in result.issues] == [VolumeIssueType.OUT_OF_BOUNDS]
@@ -0,0 +1,210 @@
+from collections.abc import Sequence
+
+import pytest
+from pytest_mock import MockerFixture
+
+from pyalab import DeckPosition
+from pyalab import LabwareOrientation
+from pyalab import MultiDispense
+from pyalab import PipettingLocation
+from pyalab import Plate
+from pyalab import SetVolume
+from pyalab import StepWells
+from pyalab import TipChangeMode
+from pyalab import Transfer
+from pyalab import TransferWellPair
+from pyalab import get_step_wells
+from pyalab import step_order
+
+from .fixtures import arbitrary_eight_channel_program_framework
+
+
+class TestStepWells:
+    @pytest.mark.parametrize(
+        ("other_reads", "other_writes", "expected"),
+        [
+            pytest.param({(1, 0)}, {(2, 5)}, False, id="same source"),
+            pytest.param({(1, 1)}, {(2, 0)}, True, id="same destination"),
+            pytest.param({(2, 0)}, {(2, 5)}, True, id="reads the destination"),
+            pytest.param({(1, 1)}, {(1, 0)}, True, id="writes the source"),
+        ],
+    )
+    def test_conflicts(self, other_reads: set[tuple[int, int]], other_writes: set[tuple[int, int]], expected: bool):
+        wells = StepWells(reads=frozenset({(1, 0)}), writes=frozenset({(2, 0)}), source=(1, 0), last_location=(2, 0))
+        other = StepWells(
+            reads=frozenset(other_reads),
+            writes=frozenset(other_writes),
+            source=next(iter(other_reads)),
+            last_location=next(iter(other_writes)),
+        )
+
+        assert wells.conflicts_with(other) is expected
+        assert other.conflicts_with(wells) is expected
+
+
+class TestReorderSteps:
+    @pytest.fixture(autouse=True)
+    def _setup(self):
+        self.program = arbitrary_eight_channel_program_framework()
+        source_plate = self.program.the_labware
+        assert isinstance(source_plate, Plate)
+        self.source_plate = source_plate
+        self.destination_plate = Plate(
+            name="BIO-RAD Hard-Shell 96-Well Skirted PCR Plates", display_name="Destination Plate"
+        )
+        self.program.deck_layouts[0].labware[DeckPosition(name="C", orientation=LabwareOrientation.A1_NW_CORNER)] = (
+            self.destination_plate
+        )
+
+    def _location(self, plate: Plate, column_index: int) -> PipettingLocation:
+        return PipettingLocation(
+            labware=plate,
+            deck_section_index=self.program.get_section_index_for_labware(plate),
+            column_index=column_index,
+            upper_left_row_index=0,
+        )
+
+    def _add_multi_dispense(
+        self,
+        *,
+        source_column_index: int,
+        destination_column_indexes: Sequence[int],
+        tip_change_mode: TipChangeMode = TipChangeMode.AFTER_STEP,
+        source_plate: Plate | None = None,
+    ) -> None:
+        self.program.add_step(
+            MultiDispense(
+                source=self._location(self.source_plate if source_plate is None else source_plate, source_column_index),
+                destinations=[
+                    (self._location(self.destination_plate, column_index), 10)
+                    for column_index in destination_column_indexes
+                ],
+                tip_change_mode=tip_change_mode,
+            )
+        )
+
+    def _add_interleaved_no_change_steps(self) -> None:
+        self._add_multi_dispense(
+            source_column_index=0, destination_column_indexes=[0], tip_change_mode=TipChangeMode.NO_CHANGE
+        )
+        self._add_multi_dispense(source_column_index=1, destination_column_indexes=[5])
+        self._add_multi_dispense(
+            source_column_index=0, destination_column_indexes=[1], tip_change_mode=TipChangeMode.NO_CHANGE
+        )
+
+    def test_Given_no_change_steps_split_up__Then_kept_together_and_tips_saved(self):
+        self._add_interleaved_no_change_steps()
+        original_steps = list(self.program.steps)
+
+        report = self.program.optimize_step_order()
+
+        assert report.new_order == [0, 2, 1]
+        assert self.program.steps == [original_steps[0], original_steps[2], original_steps[1]]
+        assert (report.tips_before, report.tips_after, report.tips_saved) == (16, 8, 8)
+        assert report.run_time_saved > 0
+        assert report.run_time_saved == pytest.approx(report.run_time_before - report.run_time_after)
+        assert self.program.calculate_tip_usage().tips == {self.program.steps[0].tip_id: 8}
+
+    def test_Given_no_change_step_with_a_different_source__Then_its_tips_not_passed_to_another_source(self):
+        self._add_multi_dispense(source_column_index=0, destination_column_indexes=[0])
+        self._add_multi_dispense(source_column_index=5, destination_column_indexes=[5])
+        self._add_multi_dispense(
+            source_column_index=0, destination_column_indexes=[1], tip_change_mode=TipChangeMode.NO_CHANGE
+        )
+
+        report = self.program.optimize_step_order()
+
+        assert report.new_order == [0, 1, 2]
+        assert report.tips_saved == 0
+
+    def test_Given_steps_from_alternating_sources__Then_grouped_by_source(self):
+        for source_column_index, destination_column_index in [(0, 0), (1, 1), (0, 2), (1, 3)]:
+            self._add_multi_dispense(
+                source_column_index=source_column_index, destination_column_indexes=[destination_column_index]
+            )
+
+        report = self.program.optimize_step_order()
+
+        assert report.new_order == [0, 2, 1, 3]
+
+    def test_Given_step_dispensing_into_the_same_column__Then_not_moved_ahead(self):
+        self._add_multi_dispense(
+            source_column_index=0, destination_column_indexes=[0], tip_change_mode=TipChangeMode.NO_CHANGE
+        )
+        self._add_multi_dispense(source_column_index=1, destination_column_indexes=[1])
+        self._add_multi_dispense(
+            source_column_index=0, destination_column_indexes=[1], tip_change_mode=TipChangeMode.NO_CHANGE
+        )
+
+        report = self.program.optimize_step_order()
+
+        assert report.new_order == [0, 1, 2]
+
+    def test_Given_step_aspirating_from_an_earlier_destination__Then_not_moved_ahead(self):
+        self._add_multi_dispense(source_column_index=0, destination_column_indexes=[0])
+        self._add_multi_dispense(source_column_index=1, destination_column_indexes=[1])
+        self._add_multi_dispense(
+            source_column_index=0, destination_column_indexes=[2], source_plate=self.destination_plate
+        )
+
+        report = self.program.optimize_step_order()
+
+        assert report.new_order.index(2) > report.new_order.index(0)
+
+    def test_Given_set_volume_between_steps__Then_no_step_moved_past_it(self):
+        self._add_multi_dispense(
+            source_column_index=0, destination_column_indexes=[0], tip_change_mode=TipChangeMode.NO_CHANGE
+        )
+        self._add_multi_dispense(source_column_index=1, destination_column_indexes=[5])
+        self.program.add_step(SetVolume(labware=self.source_plate, column_index=3, volume=100))
+        self._add_interleaved_no_change_steps()
+
+        report = self.program.optimize_step_order()
+
+        assert report.new_order == [0, 1, 2, 3, 5, 4]
+
+    def test_Given_transfers__Then_wells_of_every_pair_checked(self):
+        self.program.add_step(
+            Transfer(
+                source=self.source_plate,
+                destination=self.destination_plate,
+                well_pairs=[
+                    TransferWellPair(source_column_index=0, destination_column_index=0),
+                    TransferWellPair(source_column_index=1, destination_column_index=1),
+                ],
+                volume=10,
+            )
+        )
+        source_section_index = self.program.get_section_index_for_labware(self.source_plate)
+        destination_section_index = self.program.get_section_index_for_labware(self.destination_plate)
+
+        actual = get_step_wells(self.program.steps[0])
+
+        assert actual == StepWells(
+            reads=frozenset({(source_section_index, 0), (source_section_index, 1)}),
+            writes=frozenset({(destination_section_index, 0), (destination_section_index, 1)}),
+            source=(source_section_index, 0),
+            last_location=(destination_section_index, 1),
+        )
+
+    def test_Given_new_order_estimated_to_be_worse__Then_original_order_kept(self, mocker: MockerFixture):
+        def reverse(segment: Sequence[object], **_: object) -> list[object]:
+            return list(reversed(segment))
+
+        _ = mocker.patch.object(
+            step_order, "_schedule_segment", side_effect=reverse
+        )  # force a worse order than the scheduler would pick
+        for destination_column_index in range(2):
+            self._add_multi_dispense(
+                source_column_index=0,
+                destination_column_indexes=[destination_column_index],
+                tip_change_mode=TipChangeMode.NO_CHANGE,
+            )
+        self._add_multi_dispense(source_column_index=1, destination_column_indexes=[5])
+        original_steps = list(self.program.steps)
+
+        report = self.program.optimize_step_order()
+
+        assert report.new_order == [0, 1, 2]
+        assert self.program.steps == original_steps
+        assert (report.tips_saved, report.run_time_saved) == (0, 0)
@@ -0,0 +1,138 @@
+import io
+import json
+
+import pytest
+from lxml import etree
+
+from pyalab import MultiDispense
+from pyalab import PipettingLocation
+from pyalab import Plate
+from pyalab import Program
+from pyalab import SetInitialVolume
+from pyalab import TipChangeMode
+from pyalab import TipUsage
+from pyalab import Transfer
+from pyalab import TransferWellPair
+
+from .fixtures import arbitrary_d_one_program_framework
+from .fixtures import arbitrary_eight_channel_program_framework
+
+
+def _required_tips_in_xml(program: Program) -> dict[str, int]:
+    root = etree.fromstring(program.generate_xml().encode("utf-8"))
+    text = root.findtext("./GlobalParameters/Values/Value[@Key='TipTypeRequiredTips']")
+    assert text is not None
+    return json.loads(text)
+
+
+class TestTipUsage:
+    @pytest.fixture(autouse=True)
+    def _setup(self):
+        self.program = arbitrary_eight_channel_program_framework()
+        plate = self.program.the_labware
+        assert isinstance(plate, Plate)
+        self.plate = plate
+        self.tip_id = 23
+        self.section_index = self.program.get_section_index_for_labware(self.plate)
+        self.program.add_step(SetInitialVolume(labware=self.plate, column_index=0, volume=200))
+
+    def _add_multi_dispense(self, tip_change_mode: TipChangeMode) -> None:
+        def location(column_index: int) -> PipettingLocation:
+            return PipettingLocation(
+                labware=self.plate,
+                deck_section_index=self.section_index,
+                column_index=column_index,
+                upper_left_row_index=0,
+            )
+
+        self.program.add_step(
+            MultiDispense(
+                source=location(0), destinations=[(location(1), 10), (location(2), 10)], tip_change_mode=tip_change_mode
+            )
+        )
+
+    def _add_transfer(self, num_pairs: int) -> None:
+        self.program.add_step(
+            Transfer(
+                source=self.plate,
+                destination=self.plate,
+                well_pairs=[
+                    TransferWellPair(source_column_index=0, destination_column_index=column_index)
+                    for column_index in range(1, num_pairs + 1)
+                ],
+                volume=5,
+            )
+        )
+
+    def test_Given_no_liquid_transfers__Then_no_tips(self):
+        assert self.program.calculate_tip_usage() == TipUsage(tips={})
+        assert _required_tips_in_xml(self.program) == {str(self.tip_id): 0}
+
+    def test_Given_new_tips_after_each_step__Then_tips_for_each_channel_per_step(self):
+        for _ in range(3):
+            self._add_multi_dispense(TipChangeMode.AFTER_STEP)
+
+        assert self.program.calculate_tip_usage().tips == {self.tip_id: 3 * 8}
+
+    def test_Given_tips_never_changed__Then_tips_reused_by_following_step(self):
+        self._add_multi_dispense(TipChangeMode.NO_CHANGE)
+        self._add_multi_dispense(TipChangeMode.NO_CHANGE)
+        self._add_multi_dispense(TipChangeMode.AFTER_STEP)  # uses the tips already loaded, then ejects them
+        self._add_multi_dispense(TipChangeMode.AFTER_STEP)
+
+        assert self.program.calculate_tip_usage().tips == {self.tip_id: 2 * 8}
+
+    def test_Given_transfer__Then_new_tips_for_each_well_pair(self):
+        self._add_multi_dispense(TipChangeMode.NO_CHANGE)
+        self._add_transfer(num_pairs=3)  # the first pair uses the tips already loaded
+        self._add_transfer(num_pairs=2)
+
+        actual = self.program.calculate_tip_usage().tips
+
+        assert actual == {self.tip_id: (1 + 2 + 2) * 8}
+        assert _required_tips_in_xml(self.program) == {str(self.tip_id): actual[self.tip_id]}
+
+    def test_Given_multi_dispense_changing_tips_per_reaction__Then_one_set_of_tips(self):
+        self._add_multi_dispense(TipChangeMode.MODE_A)
+
+        assert self.program.calculate_tip_usage().tips == {self.tip_id: 8}
+
+    def test_Given_steps_streamed__Then_counted_in_xml(self):
+        self._add_transfer(num_pairs=1)
+        stream = io.BytesIO()
+
+        _ = self.program.write_program(
+            stream,
+            steps=[
+                Transfer(
+                    source=self.plate,
+                    source_column_index=0,
+                    destination=self.plate,
+                    destination_column_index=5,
+                    volume=5,
+                )
+            ],
+        )
+
+        root = etree.fromstring(stream.getvalue())
+        actual = root.findtext("./GlobalParameters/Values/Value[@Key='TipTypeRequiredTips']")
+        assert actual is not None
+        assert json.loads(actual) == {str(self.tip_id): 2 * 8}
+
+
+def test_Given_d_one__Then_one_tip_per_pick_up():
+    program = arbitrary_d_one_program_framework()
+    plate = program.the_labware
+    assert isinstance(plate, Plate)
+    program.add_step(
+        Transfer(source=plate, source_column_index=0, destination=plate, destination_column_index=1, volume=5)
+    )
+
+    actual = program.calculate_tip_usage()
+
+    assert sum(actual.tips.values()) == 1
+
+
+@pytest.mark.parametrize(("num_tips", "expected"), [(1, 1), (96, 1), (97, 2), (300, 4)])
+def test_tip_boxes(num_tips: int, expected: int):
+    assert TipUsage(tips={23: num_tips}).tip_boxes == {23: expected}